@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""Long-running query server for the File System Agent.
+
+Every CLI run pays interpreter startup, the openai import, client
+construction and a full scan before it can answer. The server keeps one
+FileSystemAgent and the scanned file_info of every root warm in memory,
+kept current by scan_watch.FileInfoWatcher, and answers questions over a
+small JSON API on localhost:
+
+    GET  /health
+    GET  /roots
+    POST /ask      {"folder": ..., "question": ...} or {"folder": ..., "questions": [...]}
+    POST /summary  {"folder": ...}
+    POST /rescan   {"folder": ...}
+
+Roots given with --root are scanned at startup, others on their first
+request. ``file_agent.py FOLDER QUESTION --server`` is the thin client.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlparse
+
+from file_agent import DEFAULT_CONCURRENCY, DEFAULT_SERVER_URL, FileSystemAgent
+from prompt_context import DEFAULT_MAX_PROMPT_TOKENS
+from scan_filter import add_filter_arguments, filter_from_args
+
+
+class WarmRoot:
+    """The scan of one root, and the watcher that keeps it current."""
+
+    def __init__(self, path: str, file_info: Dict[str, Any], watcher=None, scan_seconds: float = 0.0):
+        self.path = path
+        self.file_info = file_info
+        self.watcher = watcher
+        self.scan_seconds = scan_seconds
+        self.scanned_at = time.time()
+        self.questions = 0
+
+    @property
+    def lock(self):
+        """The watcher's lock, which guards file_info while it is used (None without a watcher)."""
+        return self.watcher.lock if self.watcher is not None else None
+
+    def reading(self):
+        """Hold this while using file_info, so the watcher does not change it underneath."""
+        return self.lock if self.watcher is not None else nullcontext()
+
+    def close(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "folder": self.path,
+            "total_files": self.file_info["total_files"],
+            "total_directories": self.file_info["total_directories"],
+            "scan_seconds": self.scan_seconds,
+            "scanned_at": self.scanned_at,
+            "watch": self.watcher.stats["mode"] if self.watcher is not None else None,
+            "questions": self.questions,
+        }
+
+
+class AgentServer:
+    """Answer questions about warm roots over HTTP."""
+
+    def __init__(self, agent: FileSystemAgent, scan_options: Optional[Dict[str, Any]] = None,
+                 watch: bool = True, host: str = "127.0.0.1", port: int = 8765,
+                 concurrency: int = DEFAULT_CONCURRENCY):
+        self.agent = agent
+        self.scan_options = scan_options or {}
+        self.watch = watch
+        self.concurrency = concurrency
+        self._roots: Dict[str, WarmRoot] = {}
+        self._loading: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.app = self
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def root(self, folder: str) -> WarmRoot:
+        """Return the warm scan of a folder, scanning it on first use (once, however many ask)."""
+        path = os.path.abspath(folder)
+        with self._lock:
+            warm = self._roots.get(path)
+            if warm is not None:
+                return warm
+            loading = self._loading.setdefault(path, threading.Lock())
+        with loading:
+            with self._lock:
+                warm = self._roots.get(path)
+            if warm is None:
+                try:
+                    warm = self._scan(path)
+                    with self._lock:
+                        self._roots[path] = warm
+                finally:
+                    with self._lock:
+                        self._loading.pop(path, None)
+        return warm
+
+    def rescan(self, folder: str) -> WarmRoot:
+        """Scan a folder again from scratch and replace its warm scan."""
+        path = os.path.abspath(folder)
+        warm = self._scan(path)
+        with self._lock:
+            old = self._roots.get(path)
+            self._roots[path] = warm
+        if old is not None:
+            old.close()
+        return warm
+
+    def _scan(self, path: str) -> WarmRoot:
+        if not os.path.isdir(path):
+            raise ValueError(f"Directory '{path}' does not exist")
+        start = time.perf_counter()
+        watcher = None
+        if self.watch:
+            # Watching starts before the scan, so changes made while it runs are not missed
+            from scan_watch import scan_and_watch
+            watcher = scan_and_watch(path, lambda: self.agent.scan_directory(path, **self.scan_options),
+                                     top_n=self.agent.top_n, sample_size=self.agent.sample_size,
+                                     scan_filter=self.scan_options.get("scan_filter"))
+            file_info = watcher.file_info
+        else:
+            file_info = self.agent.scan_directory(path, **self.scan_options)
+        scan_seconds = time.perf_counter() - start
+        print(f"Warm: {path} ({file_info['total_files']:,} files in {scan_seconds:.2f}s)", file=sys.stderr)
+        return WarmRoot(path, file_info, watcher, scan_seconds)
+
+    def ask(self, folder: str, question: str) -> Dict[str, Any]:
+        warm = self.root(folder)
+        # The agent holds the lock only while it uses file_info, not during LLM calls
+        answer, trace = self.agent.ask(question, warm.file_info, warm.path, lock=warm.lock)
+        with self._lock:
+            warm.questions += 1
+        return {"answer": answer, "trace": trace.to_dict()}
+
+    def ask_many(self, folder: str, questions: List[str]) -> Dict[str, Any]:
+        warm = self.root(folder)
+        answers = self.agent.answer_questions(questions, warm.file_info, warm.path, self.concurrency,
+                                              lock=warm.lock)
+        with self._lock:
+            warm.questions += len(questions)
+        return {"answers": answers}
+
+    def summary(self, folder: str) -> Dict[str, Any]:
+        warm = self.root(folder)
+        with warm.reading():
+            return {"summary": self.agent.create_summary(warm.file_info, warm.path)}
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def start(self) -> "AgentServer":
+        """Serve from a background thread."""
+        threading.Thread(target=self.serve_forever, name="agent-server", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        with self._lock:
+            roots = list(self._roots.values())
+            self._roots.clear()
+        for warm in roots:
+            warm.close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        app = self.server.app
+        path = urlparse(self.path).path
+        if path == "/health":
+            self._reply(200, {"status": "ok"})
+        elif path == "/roots":
+            with app._lock:
+                roots = list(app._roots.values())
+            self._reply(200, {"roots": [warm.describe() for warm in roots], "llm": dict(app.agent.llm_stats)})
+        else:
+            self._reply(404, {"error": f"Unknown endpoint {path}"})
+
+    def do_POST(self):
+        app = self.server.app
+        path = urlparse(self.path).path
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            folder = request.get("folder")
+            if not isinstance(folder, str):
+                raise ValueError('the request needs a "folder"')
+            if path == "/ask":
+                if isinstance(request.get("questions"), list):
+                    result = app.ask_many(folder, [str(question) for question in request["questions"]])
+                elif isinstance(request.get("question"), str):
+                    result = app.ask(folder, request["question"])
+                else:
+                    raise ValueError('the request needs a "question" or "questions"')
+            elif path == "/summary":
+                result = app.summary(folder)
+            elif path == "/rescan":
+                result = app.rescan(folder).describe()
+            else:
+                self._reply(404, {"error": f"Unknown endpoint {path}"})
+                return
+        except ValueError as e:
+            self._reply(400, {"error": str(e)})
+            return
+        except Exception as e:
+            self._reply(500, {"error": str(e)})
+            return
+        self._reply(200, result)
+
+    def _reply(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    default_host, default_port = urlparse(DEFAULT_SERVER_URL).hostname, urlparse(DEFAULT_SERVER_URL).port
+    parser = argparse.ArgumentParser(description="Serve File System Agent questions with warm scans")
+    parser.add_argument("--root", action="append", default=[],
+                        help="Folder to scan at startup and keep warm (repeatable; others are scanned on first use)")
+    parser.add_argument("--host", default=default_host, help=f"Address to listen on (default: {default_host})")
+    parser.add_argument("--port", type=int, default=default_port, help=f"Port to listen on (default: {default_port})")
+    parser.add_argument("--api-key", help="OpenAI API key (or set OPENAI_API_KEY env var)")
+    parser.add_argument("--no-watch", action="store_true",
+                        help="Do not watch the roots for changes (use POST /rescan to refresh)")
+    parser.add_argument("--workers", type=int, default=None, help="Number of threads used to scan directories")
+    parser.add_argument("--processes", type=int, default=1, help="Scan subtrees in this many worker processes")
+    parser.add_argument("--index", action="store_true", help="Use the persistent scan index")
+    parser.add_argument("--compact", action="store_true", help="Keep scan results in compact columnar storage")
+    parser.add_argument("--cache-dir", help="Directory for the scan index and answer cache")
+    parser.add_argument("--no-local", action="store_true", help="Send every question to the LLM")
+    parser.add_argument("--no-answer-cache", action="store_true", help="Do not reuse expressions from earlier answers")
+    parser.add_argument("--max-prompt-tokens", type=int, default=DEFAULT_MAX_PROMPT_TOKENS,
+                        help=f"Token budget for the scan context sent to the LLM (default: {DEFAULT_MAX_PROMPT_TOKENS})")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Questions of one batch answered at a time (default: {DEFAULT_CONCURRENCY})")
+    add_filter_arguments(parser.add_argument_group("scan filters"))
+    args = parser.parse_args()
+
+    api_key = args.api_key or os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        print("Error: Please provide OpenAI API key via --api-key or OPENAI_API_KEY environment variable")
+        return 1
+
+    agent = FileSystemAgent(api_key, local_answers=not args.no_local, answer_cache=not args.no_answer_cache,
+                            cache_dir=args.cache_dir, max_prompt_tokens=args.max_prompt_tokens)
+    # The watcher keeps plain dicts current; compact views are read-only
+    watch = not args.no_watch and not args.compact
+    scan_options = {"workers": args.workers, "use_index": args.index, "cache_dir": args.cache_dir,
+                    "compact": args.compact, "processes": args.processes, "scan_filter": filter_from_args(args)}
+    server = AgentServer(agent, scan_options, watch=watch, host=args.host, port=args.port,
+                         concurrency=args.concurrency)
+    for root in args.root:
+        try:
+            server.root(root)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return 1
+
+    print(f"Serving on {server.url}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
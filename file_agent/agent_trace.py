@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Per-request timing and counters for the File System Agent.
+
+A Trace collects how long each phase of a request took (scan, context
+building, LLM calls, validation, evaluation, ...) and counters such as
+entries scanned, LLM retries, validation failures and tokens. The agent
+reports into whichever trace is active in the current context, so tracing
+needs no extra arguments and costs one ContextVar lookup per phase when it is
+off:
+
+    with Trace() as trace:
+        answer = agent.answer_question(question, file_info, root_path)
+    print(trace.to_dict())
+
+Phase times are inclusive: an LLM retry inside "evaluate" counts towards both.
+"""
+
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Dict, Any, Optional
+
+_active: ContextVar[Optional["Trace"]] = ContextVar("file_agent_trace", default=None)
+_NO_PHASE = nullcontext()
+
+
+class Trace:
+    """Phase timings and counters of one request."""
+
+    def __init__(self):
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.total = 0.0
+        self._lock = threading.Lock()
+        self._start = None
+        self._token = None
+
+    def __enter__(self) -> "Trace":
+        self._token = _active.set(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.total += time.perf_counter() - self._start
+        _active.reset(self._token)
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time a block and add it to the phase ``name``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                entry = self.phases.setdefault(name, {"seconds": 0.0, "calls": 0})
+                entry["seconds"] += elapsed
+                entry["calls"] += 1
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "total_seconds": self.total,
+                "phases": {name: dict(entry) for name, entry in self.phases.items()},
+                "counters": dict(self.counters),
+            }
+
+
+def current_trace() -> Optional[Trace]:
+    return _active.get()
+
+
+def trace_phase(name: str):
+    """Time a block in the active trace (a no-op without one)."""
+    trace = _active.get()
+    return trace.phase(name) if trace is not None else _NO_PHASE
+
+
+def trace_count(name: str, n: int = 1):
+    """Add to a counter of the active trace (a no-op without one)."""
+    trace = _active.get()
+    if trace is not None:
+        trace.count(name, n)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Two-level cache for LLM answers to file system questions.
+
+Level 1 maps a normalized question to the expression the LLM produced for it
+(a CALCULATE expression or a file_info expression for counts). It is LRU
+bounded and persisted as JSON, so a repeat question never needs the network,
+even after a restart or on a different tree.
+
+Level 2 maps an expression plus a scan fingerprint to the formatted result,
+so re-asking on an unchanged tree does not even re-evaluate. Fingerprints use
+Python's per-process string hashing, so level 2 lives in memory only.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+FINGERPRINT_KEY = "fingerprint"
+# Bump when the prompts change in a way that makes stored expressions stale
+CACHE_VERSION = 1
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase a question and collapse whitespace and trailing punctuation."""
+    return re.sub(r"\s+", " ", question.lower()).strip(" ?!.")
+
+
+def scan_fingerprint(file_info: Dict[str, Any]) -> int:
+    """Return a fingerprint of the scan data that expressions can depend on.
+
+    Combines an order-independent hash of every (path, size) pair with the
+    totals and file types. Computed once per file_info and cached in it.
+    """
+    fingerprint = file_info.get(FINGERPRINT_KEY)
+    if fingerprint is None:
+        items_hash = sum(map(hash, file_info["file_sizes"].items())) & 0xFFFFFFFFFFFFFFFF
+        fingerprint = hash((items_hash, file_info["total_files"], file_info["total_directories"],
+                            frozenset(file_info["file_types"].items())))
+        file_info[FINGERPRINT_KEY] = fingerprint
+    return fingerprint
+
+
+class AnswerCache:
+    """LRU caches of question -> expression and (expression, fingerprint) -> result."""
+
+    def __init__(self, path: Optional[str] = None, max_expressions: int = 1000, max_results: int = 1000):
+        self.path = path
+        self.max_expressions = max_expressions
+        self.max_results = max_results
+        self._expressions: "OrderedDict[str, str]" = OrderedDict()
+        self._results: "OrderedDict[Tuple[str, int], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"expression_hits": 0, "expression_misses": 0, "expression_drops": 0,
+                      "result_hits": 0, "result_misses": 0}
+        if path:
+            self._load()
+
+    def get_expression(self, question: str) -> Optional[str]:
+        key = normalize_question(question)
+        with self._lock:
+            expression = self._expressions.get(key)
+            if expression is None:
+                self.stats["expression_misses"] += 1
+                return None
+            self._expressions.move_to_end(key)
+            self.stats["expression_hits"] += 1
+            return expression
+
+    def put_expression(self, question: str, expression: str):
+        key = normalize_question(question)
+        with self._lock:
+            if self._expressions.get(key) == expression:
+                return
+            self._expressions[key] = expression
+            self._expressions.move_to_end(key)
+            while len(self._expressions) > self.max_expressions:
+                self._expressions.popitem(last=False)
+            entries = list(self._expressions.items())
+        self._save(entries)
+
+    def drop_expression(self, question: str):
+        """Forget the expression of a question, e.g. when it fails on the current scan."""
+        key = normalize_question(question)
+        with self._lock:
+            if self._expressions.pop(key, None) is None:
+                return
+            self.stats["expression_drops"] += 1
+            entries = list(self._expressions.items())
+        self._save(entries)
+
+    def get_result(self, expression: str, fingerprint: int) -> Optional[str]:
+        key = (expression, fingerprint)
+        with self._lock:
+            result = self._results.get(key)
+            if result is None:
+                self.stats["result_misses"] += 1
+                return None
+            self._results.move_to_end(key)
+            self.stats["result_hits"] += 1
+            return result
+
+    def put_result(self, expression: str, fingerprint: int, result: str):
+        with self._lock:
+            self._results[(expression, fingerprint)] = result
+            self._results.move_to_end((expression, fingerprint))
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == CACHE_VERSION:
+            for question, expression in data.get("expressions", [])[-self.max_expressions:]:
+                self._expressions[question] = expression
+
+    def _save(self, entries):
+        """Write the expressions atomically, oldest first."""
+        if not self.path:
+            return
+        import tempfile
+        try:
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "expressions": entries}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Warning: could not save answer cache: {e}", file=sys.stderr)
@@ -0,0 +1,4 @@
+"""Benchmarks for the File System Agent.
+
+Run from the ``file_agent`` directory, e.g. ``python -m benchmarks.bench_scan``.
+"""
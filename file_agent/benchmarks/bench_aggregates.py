@@ -0,0 +1,67 @@
+"""Compare streaming scan aggregates with append-then-sort.
+
+The original scan appended a (path, size) tuple per file and sorted the whole
+list to keep the top 10, and create_summary sorted every directory and file
+path to print the first 20. StreamingAggregates keeps bounded heaps instead.
+Both keep the file list, as the scan does for file_info; the peak memory
+(tracemalloc, separate run) shows what the aggregates cost on top of it.
+Usage: python -m benchmarks.bench_aggregates [--files N] [--top-n N] [--sample-size K]
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from file_agent import StreamingAggregates
+from benchmarks.synthetic_tree import synthetic_listings
+
+
+def append_then_sort(listings, top_n: int, sample_size: int):
+    largest, file_list, directories = [], [], []
+    for files, dirs in listings:
+        for rel_path, _, size in files:
+            largest.append((rel_path, size))
+            file_list.append(rel_path)
+        directories.extend(dirs)
+    largest.sort(key=lambda x: x[1], reverse=True)
+    return largest[:top_n], sorted(file_list)[:sample_size], sorted(directories)[:sample_size]
+
+
+def streaming(listings, top_n: int, sample_size: int):
+    aggregates = StreamingAggregates(top_n, sample_size)
+    file_list = []
+    for files, dirs in listings:
+        file_list.extend([f[0] for f in files])
+        aggregates.add_listing(files, dirs)
+    return aggregates.largest_files(), aggregates.file_sample, aggregates.directory_sample
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming top-N and sample aggregates")
+    parser.add_argument("--files", type=int, default=1_000_000)
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--sample-size", type=int, default=20)
+    args = parser.parse_args()
+    
+    # Directories arrive in no particular order during a threaded scan
+    listings = list(synthetic_listings(args.files))
+    random.Random(0).shuffle(listings)
+    results = []
+    for label, func in (("append-then-sort", append_then_sort), ("streaming", streaming)):
+        start = time.perf_counter()
+        results.append(func(listings, args.top_n, args.sample_size))
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()
+        func(listings, args.top_n, args.sample_size)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{label:<18} {elapsed:8.3f}s  {args.files / elapsed:12,.0f} entries/s   peak {peak / 2**20:8.2f} MiB")
+    
+    (old_largest, old_files, old_dirs), (new_largest, new_files, new_dirs) = results
+    assert [size for _, size in old_largest] == [size for _, size in new_largest]
+    assert old_files == new_files and old_dirs == new_dirs
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Measure repeat questions with and without the answer cache.
+
+Asks a few LLM-bound questions three times against a stubbed LLM: cold, again
+on the same scan, and again after the tree changed. Reports latency and the
+number of LLM calls per round; with the cache only the cold round calls it.
+Usage: python -m benchmarks.bench_answer_cache [--files N] [--latency S]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from file_agent import FileSystemAgent, ScanAccumulator
+from benchmarks.stub_llm import StubClient
+from benchmarks.synthetic_tree import synthetic_listings
+
+QUESTIONS = [
+    "What is the combined size of files whose names end in .log or .csv?",
+    "How much space do the markdown files under every folder take?",
+    "What is the mean size of python sources, rounded?",
+]
+
+
+def build_file_info(files: int, extra: int = 0):
+    accumulator = ScanAccumulator()
+    for listing, directories in synthetic_listings(files + extra):
+        accumulator.add_listing(listing, directories)
+    return accumulator.result()
+
+
+def run(agent, file_info, client, label):
+    calls = client.calls
+    start = time.perf_counter()
+    answers = [agent.answer_question(question, file_info, "/bench") for question in QUESTIONS]
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<14} {elapsed * 1000:9.1f} ms  {client.calls - calls} LLM calls")
+    return answers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the two-level answer cache")
+    parser.add_argument("--files", type=int, default=200_000)
+    parser.add_argument("--latency", type=float, default=0.5, help="Simulated LLM latency in seconds")
+    args = parser.parse_args()
+
+    file_info = build_file_info(args.files)
+    changed = build_file_info(args.files, extra=1000)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for use_cache in (False, True):
+            print(f"answer cache {'on' if use_cache else 'off'}:")
+            agent = FileSystemAgent("stub", local_answers=False, answer_cache=use_cache, cache_dir=cache_dir)
+            agent.client = client = StubClient(args.latency)
+            cold = run(agent, file_info, client, "cold")
+            assert run(agent, file_info, client, "same tree") == cold
+            run(agent, changed, client, "changed tree")
+            if use_cache:
+                print(f"  stats: {agent.answer_cache.stats}")
+                print(f"  persisted to {os.path.join(cache_dir, 'answers.json')}")
+
+
+if __name__ == "__main__":
+    main()
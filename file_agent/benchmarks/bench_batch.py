@@ -0,0 +1,50 @@
+"""Wall-clock scaling of batch question answering with concurrency.
+
+Answers the same batch of LLM-bound questions against a local
+OpenAI-compatible stub server at several concurrency limits, through the real
+openai client. With an LLM latency of L seconds, Q questions take about
+Q * L / concurrency seconds until the limit reaches Q.
+Usage: python -m benchmarks.bench_batch [--questions 32] [--latency 0.5] [--concurrency 1 4 16]
+"""
+
+import argparse
+import time
+
+from openai import OpenAI
+
+from file_agent import FileSystemAgent, ScanAccumulator
+from benchmarks.stub_server import StubServer
+from benchmarks.synthetic_tree import synthetic_listings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent batch answers")
+    parser.add_argument("--questions", type=int, default=32)
+    parser.add_argument("--files", type=int, default=50_000)
+    parser.add_argument("--latency", type=float, default=0.5, help="Simulated LLM latency in seconds")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    accumulator = ScanAccumulator()
+    for listing, directories in synthetic_listings(args.files):
+        accumulator.add_listing(listing, directories)
+    file_info = accumulator.result()
+    questions = [f"Report item {i}: what is the combined size of everything?" for i in range(args.questions)]
+
+    with StubServer(args.latency) as server:
+        agent = FileSystemAgent("stub", local_answers=False, answer_cache=False)
+        agent.client = OpenAI(api_key="stub", base_url=server.base_url, max_retries=0)
+        baseline = None
+        print(f"{'concurrency':>11} {'wall s':>8} {'speedup':>8} {'max in flight':>14}")
+        for concurrency in args.concurrency:
+            server.max_in_flight = 0
+            start = time.perf_counter()
+            answers = agent.answer_questions(questions, file_info, "/bench", concurrency=concurrency)
+            elapsed = time.perf_counter() - start
+            assert all(answer.startswith("Result:") for answer in answers), answers[0]
+            baseline = baseline or elapsed
+            print(f"{concurrency:>11} {elapsed:>8.2f} {baseline / elapsed:>7.1f}x {server.max_in_flight:>14}")
+
+
+if __name__ == "__main__":
+    main()
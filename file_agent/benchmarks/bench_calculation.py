@@ -0,0 +1,63 @@
+"""Compare eval of CALCULATE expressions with compiled query plans.
+
+Builds an in-memory file_info with N entries and evaluates typical LLM
+expressions both ways, checking that the results are identical.
+Usage: python -m benchmarks.bench_calculation [--files N] [--compact]
+"""
+
+import argparse
+import time
+
+from file_agent import ScanAccumulator
+from compact_store import CompactAccumulator
+from expression_plan import SUFFIX_STATS_KEY, compile_plan
+from benchmarks.synthetic_tree import synthetic_listings
+
+IMAGES = " or ".join(f"file.lower().endswith('{ext}')"
+                     for ext in ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.svg', '.webp', '.tiff'))
+EXPRESSIONS = [
+    f"sum(size for file, size in file_info['file_sizes'].items() if {IMAGES})",
+    "sum(size for file, size in file_info['file_sizes'].items() if file.lower().endswith('.py'))",
+    "sum(file_info['file_sizes'].values()) / len(file_info['file_sizes']) if file_info['file_sizes'] else 0",
+    "max(size for file, size in file_info['file_sizes'].items() if file.lower().endswith(('.log', '.csv')))",
+    "sum(1 for file in file_info['file_sizes'] if file.lower().endswith('.md'))",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark eval vs. compiled CALCULATE plans")
+    parser.add_argument("--files", type=int, default=1_000_000)
+    parser.add_argument("--compact", action="store_true", help="Use the compact columnar file_info")
+    args = parser.parse_args()
+    
+    accumulator = CompactAccumulator() if args.compact else ScanAccumulator()
+    for listing, directories in synthetic_listings(args.files):
+        accumulator.add_listing(listing, directories)
+    file_info = accumulator.result()
+    
+    for expression in EXPRESSIONS:
+        start = time.perf_counter()
+        expected = eval(expression, {"__builtins__": {}}, {"file_info": file_info, "sum": sum, "len": len, "max": max})
+        eval_time = time.perf_counter() - start
+        
+        plan = compile_plan(expression)
+        start = time.perf_counter()
+        result = plan.execute(file_info)
+        plan_time = time.perf_counter() - start
+        
+        # Without scan-time statistics (e.g. after watched changes) they are rebuilt once
+        scan_stats = file_info.pop(SUFFIX_STATS_KEY)
+        start = time.perf_counter()
+        rebuilt = plan.execute(file_info)
+        rebuild_time = time.perf_counter() - start
+        assert file_info.get(SUFFIX_STATS_KEY, scan_stats) == scan_stats
+        file_info[SUFFIX_STATS_KEY] = scan_stats
+        
+        for value in (result, rebuilt):
+            assert value == expected and type(value) is type(expected), (expression, value, expected)
+        print(f"eval {eval_time * 1000:9.1f} ms   plan {plan_time * 1000:7.3f} ms   "
+              f"plan with rebuild {rebuild_time * 1000:9.1f} ms   {expression[:50]}...")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Comparing two scans: streaming snapshot diff vs. diffing two loaded JSON scans.
+
+Builds a file_info from synthetic listings and a later version of it with
+about 1% of the files removed, 1% added and 2% resized, and stores both as
+binary snapshots and as JSON. Then reports, for the merge pass of
+snapshot_diff.diff_snapshots over the two mapped snapshots and for the naive
+diff (load both JSON scans, compare their file_sizes dicts with set
+operations), the time (best of --repeat) and the peak Python memory measured
+by tracemalloc in a separate run. Both must find the same changes.
+Usage: python -m benchmarks.bench_diff [--files N] [--repeat N]
+"""
+
+import argparse
+import heapq
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from file_agent import ScanAccumulator, _file_extension
+from scan_snapshot import Snapshot, write_snapshot
+from snapshot_diff import diff_snapshots
+from benchmarks.synthetic_tree import synthetic_listings
+
+
+def changed_scan(file_info, seed: int = 0):
+    """A later version of a scan: some files removed, added and resized."""
+    rng = random.Random(seed)
+    files = len(file_info["file_list"])
+    sizes = dict(file_info["file_sizes"])
+    paths = file_info["file_list"]
+    for path in rng.sample(paths, files // 100):
+        del sizes[path]
+    for path in rng.sample(paths, files // 50):
+        if path in sizes:
+            sizes[path] = max(0, sizes[path] + rng.randint(-5000, 50000))
+    directories = list(file_info["directory_structure"]) + ["incoming"]
+    for i in range(files // 100):
+        directory = os.path.join("incoming", f"batch{i // 1000}")
+        if i % 1000 == 0:
+            directories.append(directory)
+        sizes[os.path.join(directory, f"upload_{i:07d}.log")] = rng.randint(0, 10**6)
+    file_types = {}
+    for path in sizes:
+        extension = _file_extension(os.path.basename(path))
+        file_types[extension] = file_types.get(extension, 0) + 1
+    return {"total_files": len(sizes), "total_directories": len(directories), "file_types": file_types,
+            "file_sizes": sizes, "file_list": list(sizes), "directory_structure": directories,
+            "largest_files": [(path, size) for size, path in heapq.nlargest(10, ((s, p) for p, s in sizes.items()))]}
+
+
+def snapshot_diff(old_path: str, new_path: str):
+    with Snapshot(old_path) as old, Snapshot(new_path) as new:
+        diff = diff_snapshots(old, new)
+    return diff.added_files, diff.removed_files, diff.resized_files, diff.net_bytes
+
+
+def naive_diff(old_path: str, new_path: str):
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)["file_sizes"]
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)["file_sizes"]
+    added = new.keys() - old.keys()
+    removed = old.keys() - new.keys()
+    resized = {path for path in old.keys() & new.keys() if old[path] != new[path]}
+    net = sum(new.values()) - sum(old.values())
+    return len(added), len(removed), len(resized), net
+
+
+def timed(func, repeat: int):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def peak_memory(func) -> int:
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the streaming snapshot diff against a naive dict diff")
+    parser.add_argument("--files", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    accumulator = ScanAccumulator()
+    for files, directories in synthetic_listings(args.files):
+        accumulator.add_listing(files, directories)
+    old = accumulator.result()
+    new = changed_scan(old)
+    keys = ("total_files", "total_directories", "file_types", "file_sizes", "directory_structure", "largest_files")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {}
+        for label, file_info in (("old", old), ("new", new)):
+            paths[label, "snapshot"] = write_snapshot(file_info, os.path.join(tmp, f"{label}.snap"))
+            paths[label, "json"] = os.path.join(tmp, f"{label}.json")
+            with open(paths[label, "json"], "w", encoding="utf-8") as f:
+                json.dump({key: file_info[key] for key in keys}, f)
+        del old, new
+
+        print(f"{args.files:,} files")
+        expected = None
+        for kind, func in (("snapshot", snapshot_diff), ("json", naive_diff)):
+            run = lambda: func(paths["old", kind], paths["new", kind])
+            result, elapsed = timed(run, args.repeat)
+            assert expected is None or result == expected, (kind, result, expected)
+            expected = result
+            peak = peak_memory(run)
+            added, removed, resized, net = result
+            print(f"{kind:<10} {elapsed:8.3f}s   peak {peak / 2**20:9.2f} MiB   "
+                  f"+{added:,} -{removed:,} ~{resized:,} files, net {net:+,} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Scan-time filters on a repository-shaped tree: entries visited and time saved.
+
+Generates a checkout where most entries are not source: a .git object store,
+node_modules, a virtualenv, build output and __pycache__ folders, with a
+.gitignore listing them. Scans it unfiltered, with --gitignore and with
+equivalent --exclude globs, and reports the directories listed and entries
+visited (from the scan's Trace counters) and the scan time of each.
+Usage: python -m benchmarks.bench_filters [--files N] [--vendored N] [--workers N] [--repeat N] [--root PATH]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from agent_trace import Trace
+from file_agent import FileSystemAgent
+from scan_filter import ScanFilter
+from benchmarks.synthetic_tree import generate_tree
+
+GITIGNORE = "node_modules/\n.venv/\nbuild/\n__pycache__/\n*.pyc\n"
+
+
+def _write_files(directory: str, names, size: int = 64):
+    os.makedirs(directory, exist_ok=True)
+    for name in names:
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(b"x" * size)
+
+
+def generate_repository(root: str, files: int, vendored: int):
+    """Create a repository with ``files`` source files and about ``vendored`` ignored files."""
+    generate_tree(os.path.join(root, "src"), files=files, depth=3, fanout=5,
+                  extensions=(".py", ".md", ".json", ".txt"))
+    with open(os.path.join(root, ".gitignore"), "w") as f:
+        f.write(GITIGNORE)
+
+    share = vendored // 5
+    # Loose git objects fan out over 256 directories
+    for i in range(share):
+        _write_files(os.path.join(root, ".git", "objects", f"{i % 256:02x}"), [f"{i:038x}"])
+    # Packages of a few dozen files, some nested
+    for i in range(0, share, 40):
+        package = os.path.join(root, "node_modules", f"pkg{i // 40}")
+        _write_files(os.path.join(package, "lib"), [f"m{j}.js" for j in range(30)])
+        _write_files(os.path.join(package, "node_modules", "dep"), [f"d{j}.js" for j in range(10)])
+    for i in range(0, share, 50):
+        _write_files(os.path.join(root, ".venv", "lib", "python3", "site-packages", f"dist{i // 50}"),
+                     [f"mod{j}.py" for j in range(50)])
+    for i in range(0, share, 100):
+        _write_files(os.path.join(root, "build", f"target{i // 100}"), [f"obj{j}.o" for j in range(100)])
+    # A __pycache__ next to every source package
+    pycache = [os.path.join(dirpath, "__pycache__") for dirpath, _, _ in os.walk(os.path.join(root, "src"))]
+    for i in range(share):
+        _write_files(pycache[i % len(pycache)], [f"mod{i}.cpython-312.pyc"])
+
+
+def run(agent: FileSystemAgent, root: str, scan_filter, workers, repeat: int):
+    best = None
+    for _ in range(repeat):
+        with Trace() as trace:
+            start = time.perf_counter()
+            file_info = agent.scan_directory(root, workers=workers, scan_filter=scan_filter)
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    counters = trace.counters
+    if scan_filter is None:
+        # Every directory is listed and every file and directory visited
+        listed = file_info["total_directories"] + 1
+        seen = file_info["total_files"] + file_info["total_directories"]
+    else:
+        listed = counters["directories_listed"]
+        seen = counters["entries_seen"]
+    return file_info, listed, seen, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scan-time pruning filters on a repository-shaped tree")
+    parser.add_argument("--files", type=int, default=20000, help="Source files under src/")
+    parser.add_argument("--vendored", type=int, default=100000,
+                        help="Files in .git, node_modules, .venv, build and __pycache__ (ignored)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3, help="Best of this many scans")
+    parser.add_argument("--root", help="Scan an existing checkout instead of a synthetic one")
+    args = parser.parse_args()
+
+    agent = FileSystemAgent(api_key="benchmark")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = args.root
+        if root is None:
+            root = tmp
+            print(f"Generating {args.files:,} source and {args.vendored:,} ignored files ...")
+            generate_repository(root, args.files, args.vendored)
+
+        filters = [
+            ("unfiltered", None),
+            ("--gitignore", ScanFilter(ignore_files=True)),
+            ("--exclude globs", ScanFilter(exclude=[".git", "node_modules", ".venv", "build", "__pycache__",
+                                                    "*.pyc"])),
+        ]
+        baseline = filtered = None
+        for label, scan_filter in filters:
+            file_info, listed, seen, elapsed = run(agent, root, scan_filter, args.workers, args.repeat)
+            if baseline is None:
+                baseline = (seen, elapsed)
+                saved = ""
+            else:
+                # Both filters exclude the same paths
+                assert filtered is None or file_info["file_sizes"] == filtered, label
+                filtered = file_info["file_sizes"]
+                saved = f"   {1 - seen / baseline[0]:6.1%} fewer entries, {baseline[1] / elapsed:5.1f}x faster"
+            print(f"{label:<16} {file_info['total_files']:>9,} files  {listed:>8,} dirs listed  "
+                  f"{seen:>9,} entries visited  {elapsed:7.3f}s{saved}")
+
+
+if __name__ == "__main__":
+    main()
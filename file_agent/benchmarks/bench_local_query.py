@@ -0,0 +1,62 @@
+"""Latency and hit rate of local answers vs. the LLM round-trip.
+
+Answers a mix of common dashboard questions with the local query engine
+enabled and disabled, against a stub LLM client with a fixed latency.
+Usage: python -m benchmarks.bench_local_query [--latency 0.8] [--files N]
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+
+from file_agent import FileSystemAgent
+from benchmarks.stub_llm import StubClient
+from benchmarks.synthetic_tree import generate_tree
+
+QUESTIONS = [
+    "What is the total size of all files?",
+    "How many Python files are there?",
+    "What's the average file size?",
+    "Show me the largest 5 files",
+    "What file types are most common?",
+    "How many image files are in the directory?",
+    "What is the total size of all image files?",
+    "How many directories are there?",
+    "How much space do the log files take up?",
+    "Which files under dir1 were modified most recently?",
+]
+
+
+def run(agent: FileSystemAgent, file_info: dict, root: str):
+    latencies = []
+    for question in QUESTIONS:
+        start = time.perf_counter()
+        agent.answer_question(question, file_info, root)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark local answers against a stub LLM")
+    parser.add_argument("--latency", type=float, default=0.8, help="Stub LLM latency in seconds")
+    parser.add_argument("--files", type=int, default=20000)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as root:
+        generate_tree(root, files=args.files)
+        for local_answers in (False, True):
+            agent = FileSystemAgent(api_key="benchmark", local_answers=local_answers)
+            agent.client = StubClient(latency=args.latency)
+            file_info = agent.scan_directory(root)
+            latencies = run(agent, file_info, root)
+            label = "local + LLM fallback" if local_answers else "LLM only"
+            print(f"{label:<22} p50 {statistics.median(latencies) * 1000:9.2f} ms   "
+                  f"max {max(latencies) * 1000:9.2f} ms   LLM calls {agent.client.calls}")
+            if agent.local_engine:
+                print(f"{'':<22} hit rate {agent.local_engine.hit_rate:.0%} "
+                      f"({agent.local_engine.stats['hits']}/{len(QUESTIONS)} questions)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Report memory per file of the dict-based and compact file_info storage.
+
+The listings are synthesized in memory, so no files are created.
+Usage: python -m benchmarks.bench_memory [--files N]
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+from file_agent import ScanAccumulator
+from compact_store import CompactAccumulator
+from benchmarks.synthetic_tree import synthetic_listings
+
+
+def measure(label: str, accumulator_class, files: int):
+    gc.collect()
+    tracemalloc.start()
+    accumulator = accumulator_class()
+    for listing, directories in synthetic_listings(files):
+        accumulator.add_listing(listing, directories)
+    accumulator.result()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<10} retained {current / files:8.1f} B/file   peak {peak / files:8.1f} B/file"
+          f"   ({current / 2**20:,.1f} MiB for {files:,} files)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory per file of file_info storage")
+    parser.add_argument("--files", type=int, default=1_000_000)
+    args = parser.parse_args()
+    
+    measure("dict", ScanAccumulator, args.files)
+    measure("compact", CompactAccumulator, args.files)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Compare threaded scans with process-sharded scans.
+
+Scans the same tree single-process (threads) and with a growing number of
+worker processes, checks that every sharded result is identical to the
+single-process one, and reports the speedup per process count.
+Usage: python -m benchmarks.bench_processes [--files N] [--processes 1 2 4 8] [--compact]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from file_agent import FileSystemAgent
+from benchmarks.synthetic_tree import generate_tree
+
+
+def canonical(file_info: dict) -> dict:
+    """The contents of a file_info that must not depend on how the tree was split."""
+    return {
+        "total_files": file_info["total_files"],
+        "total_directories": file_info["total_directories"],
+        "file_types": dict(file_info["file_types"]),
+        "file_sizes": sorted(file_info["file_sizes"].items()),
+        "file_list": sorted(file_info["file_list"]),
+        "directory_structure": sorted(file_info["directory_structure"]),
+        "largest_files": file_info["largest_files"],
+        "file_sample": file_info["file_sample"],
+        "directory_sample": file_info["directory_sample"],
+        "extension_sizes": dict(file_info["extension_sizes"]),
+        "suffix_stats": dict(file_info["suffix_stats"]),
+    }
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark process-sharded scans")
+    parser.add_argument("--files", type=int, default=200_000)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--fanout", type=int, default=8)
+    parser.add_argument("--processes", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--workers", type=int, default=None, help="Threads for the single-process scan")
+    parser.add_argument("--compact", action="store_true", help="Use the compact columnar file_info")
+    parser.add_argument("--root", help="Scan an existing tree instead of a synthetic one")
+    args = parser.parse_args()
+
+    agent = FileSystemAgent(api_key="benchmark")
+    print(f"{os.cpu_count()} CPUs")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = args.root
+        if root is None:
+            root = tmp
+            print(f"Generating {args.files:,} files ...")
+            generate_tree(root, files=args.files, depth=args.depth, fanout=args.fanout)
+
+        # Warm the OS directory cache so every run measures the same thing
+        agent.scan_directory(root, workers=args.workers, compact=args.compact)
+        baseline, baseline_time = timed(lambda: agent.scan_directory(root, workers=args.workers,
+                                                                     compact=args.compact))
+        expected = canonical(baseline)
+        total_files = baseline["total_files"]
+        print(f"{'threads':<14} {baseline_time:8.3f}s  {total_files / baseline_time:12,.0f} files/s")
+
+        for processes in args.processes:
+            result, elapsed = timed(lambda: agent.scan_directory(root, compact=args.compact,
+                                                                 processes=processes))
+            assert canonical(result) == expected, f"processes={processes} differs from the threaded scan"
+            print(f"{f'processes={processes}':<14} {elapsed:8.3f}s  {total_files / elapsed:12,.0f} files/s"
+                  f"  {baseline_time / elapsed:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Prompt size of answer_question before and after token budgeting.
+
+For trees with more and more distinct extensions, compares the user prompt the
+agent used to send (the full create_summary text plus indented file_types JSON)
+with the token-budgeted context, as estimated tokens and as reported by the
+stub LLM for a real answer_question call.
+Usage: python -m benchmarks.bench_prompt [--files N] [--extensions 10 1000 5000] [--max-prompt-tokens T]
+"""
+
+import argparse
+import json
+import time
+
+from file_agent import FileSystemAgent, ScanAccumulator
+from prompt_context import build_context, estimate_tokens
+from benchmarks.stub_llm import StubClient
+from benchmarks.synthetic_tree import synthetic_listings
+
+QUESTION = "What is the combined size of files whose names end in .log or .csv?"
+
+
+def budgeted_user_prompt(agent: FileSystemAgent, file_info, root_path: str) -> str:
+    context = build_context(file_info, root_path, agent.max_prompt_tokens, agent.format_size, agent.sample_size)
+    return f"""Here is the file system information:
+
+{context}
+Question: {QUESTION}"""
+
+
+def legacy_user_prompt(agent: FileSystemAgent, file_info, root_path: str) -> str:
+    """The user prompt as answer_question built it before the context budget."""
+    return f"""Here is the file system information:
+
+{agent.create_summary(file_info, root_path)}
+
+Raw data for precise calculations:
+- File types: {json.dumps(file_info['file_types'], indent=2)}
+- Total files: {file_info['total_files']}
+- Total directories: {file_info['total_directories']}
+
+Question: {QUESTION}"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark prompt size budgeting")
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--extensions", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--max-prompt-tokens", type=int, default=1500)
+    args = parser.parse_args()
+
+    print(f"{'extensions':>10} {'legacy user':>12} {'budgeted user':>14} {'legacy sent':>12} {'sent':>6} {'ms':>6}")
+    for count in args.extensions:
+        extensions = [f".e{i}" for i in range(count)]
+        accumulator = ScanAccumulator()
+        for listing, directories in synthetic_listings(args.files, extensions=extensions):
+            accumulator.add_listing(listing, directories)
+        file_info = accumulator.result()
+
+        agent = FileSystemAgent("stub", local_answers=False, answer_cache=False,
+                                max_prompt_tokens=args.max_prompt_tokens)
+        agent.client = StubClient(latency=0)
+        legacy = estimate_tokens(legacy_user_prompt(agent, file_info, "/bench"))
+        budgeted = estimate_tokens(budgeted_user_prompt(agent, file_info, "/bench"))
+        start = time.perf_counter()
+        agent.answer_question(QUESTION, file_info, "/bench")
+        elapsed = time.perf_counter() - start
+        # The stub counts the system prompt too, which is the same before and after
+        sent = agent.llm_stats["last_prompt_tokens"]
+        print(f"{count:>10} {legacy:>12} {budgeted:>14} {sent - budgeted + legacy:>12} {sent:>6} "
+              f"{elapsed * 1000:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Subtree questions from the directory rollup vs. a pass over file_sizes.
+
+Without the rollup, "how much space does src/app use" and "which folders are
+the heaviest" are CALCULATE expressions that walk every file_sizes key with a
+prefix check. The rollup is built in one pass on the first such question and
+answers both from per-directory totals. Reports the cost of that first
+build, then the latency of subtree totals and top-N folder queries.
+Usage: python -m benchmarks.bench_rollup [--files N] [--queries N] [--top-n N]
+"""
+
+import argparse
+import os
+import random
+import time
+
+from dir_rollup import directory_rollup
+from file_agent import ScanAccumulator
+from benchmarks.synthetic_tree import synthetic_listings
+
+
+def prefix_total(file_sizes, directory: str):
+    prefix = directory + os.sep
+    count = total = 0
+    for path, size in file_sizes.items():
+        if path.startswith(prefix):
+            count += 1
+            total += size
+    return count, total
+
+
+def heaviest_by_pass(file_sizes, top_n: int):
+    totals = {}
+    for path, size in file_sizes.items():
+        top_level = path.partition(os.sep)[0]
+        if top_level != path:
+            totals[top_level] = totals.get(top_level, 0) + size
+    return sorted(totals.items(), key=lambda x: (-x[1], x[0]))[:top_n]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark directory rollup lookups against prefix scans")
+    parser.add_argument("--files", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--top-n", type=int, default=10)
+    args = parser.parse_args()
+
+    listings = list(synthetic_listings(args.files))
+    start = time.perf_counter()
+    accumulator = ScanAccumulator()
+    for files, directories in listings:
+        accumulator.add_listing(files, directories)
+    file_info = accumulator.result()
+    scan = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rollup = directory_rollup(file_info)
+    nodes = len(rollup.nodes)
+    build = time.perf_counter() - start
+    print(f"scan accumulation  {scan:8.3f}s, then {build:.3f}s to build the rollup of {nodes:,} directories "
+          f"on the first subtree question")
+
+    file_sizes = file_info["file_sizes"]
+    rng = random.Random(0)
+    directories = rng.sample(sorted(rollup.nodes)[1:], min(args.queries, len(rollup.nodes) - 1))
+
+    start = time.perf_counter()
+    expected = [prefix_total(file_sizes, directory) for directory in directories]
+    scanned = (time.perf_counter() - start) / len(directories)
+    start = time.perf_counter()
+    looked_up = [(rollup.get(directory).files, rollup.get(directory).bytes) for directory in directories]
+    lookup = (time.perf_counter() - start) / len(directories)
+    assert looked_up == expected
+    print(f"subtree total      prefix scan {scanned * 1000:10.3f} ms   rollup {lookup * 1000:8.4f} ms   "
+          f"{scanned / lookup:10,.0f}x")
+
+    start = time.perf_counter()
+    expected = heaviest_by_pass(file_sizes, args.top_n)
+    scanned = time.perf_counter() - start
+    start = time.perf_counter()
+    ranked = [(path, stats.bytes) for path, stats in rollup.heaviest(args.top_n)]
+    lookup = time.perf_counter() - start
+    assert ranked == expected
+    print(f"top-{args.top_n:<3} folders     full pass   {scanned * 1000:10.3f} ms   rollup {lookup * 1000:8.4f} ms   "
+          f"{scanned / lookup:10,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Compare the os.scandir walker with the original Path.rglob scan.
+
+Usage: python -m benchmarks.bench_scan [--files N] [--workers 1 4 16]
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from file_agent import FileSystemAgent
+from benchmarks.synthetic_tree import generate_tree
+
+
+def rglob_scan(root_path: str) -> dict:
+    """The original Path.rglob based implementation of scan_directory."""
+    root = Path(root_path)
+    file_info = {"total_files": 0, "total_directories": 0, "file_types": {}, "file_sizes": {}}
+    for item in root.rglob("*"):
+        if item.is_file():
+            file_info["total_files"] += 1
+            extension = item.suffix.lower() or "no_extension"
+            file_info["file_types"][extension] = file_info["file_types"].get(extension, 0) + 1
+            try:
+                file_info["file_sizes"][str(item.relative_to(root))] = item.stat().st_size
+            except OSError:
+                pass
+        elif item.is_dir():
+            file_info["total_directories"] += 1
+    return file_info
+
+
+def timed(label: str, func, total_files: int):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<24} {elapsed:8.3f}s  {total_files / elapsed:12,.0f} files/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scan_directory against Path.rglob")
+    parser.add_argument("--files", type=int, default=50000)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--fanout", type=int, default=6)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--root", help="Scan an existing tree instead of a synthetic one")
+    args = parser.parse_args()
+    
+    agent = FileSystemAgent(api_key="benchmark")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        root = args.root
+        if root is None:
+            root = tmp
+            print(f"Generating {args.files:,} files ...")
+            generate_tree(root, files=args.files, depth=args.depth, fanout=args.fanout)
+        
+        baseline = timed("rglob (original)", lambda: rglob_scan(root), args.files)
+        total_files = baseline["total_files"]
+        for workers in args.workers:
+            result = timed(f"scandir workers={workers}",
+                           lambda: agent.scan_directory(root, workers=workers), total_files)
+            for key in ("total_files", "total_directories", "file_types", "file_sizes"):
+                assert result[key] == baseline[key], f"{key} differs from the rglob scan"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Cold CLI runs vs. questions to a warm agent_server.
+
+Generates a synthetic tree and measures, as the median of ``--repeat`` runs:
+
+- cold: ``python file_agent.py ROOT QUESTION``, which starts Python, imports
+  the agent, builds the client and scans the tree every time,
+- warm CLI: the same command with ``--server``, which only forwards the
+  question to a running agent_server that holds the scan in memory,
+- warm HTTP: the request alone, without starting a Python process.
+
+The default question is answered locally, so no LLM is involved.
+Usage: python -m benchmarks.bench_server [--files N] [--repeat N] [--question Q]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from benchmarks.synthetic_tree import generate_tree
+
+AGENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_cli(args: list) -> str:
+    result = subprocess.run([sys.executable, os.path.join(AGENT_DIR, "file_agent.py"), *args],
+                            capture_output=True, text=True, check=True)
+    return result.stdout
+
+
+def median_seconds(func, repeat: int) -> float:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return statistics.median(runs)
+
+
+def wait_for_server(url: str, process: subprocess.Popen, timeout: float = 600.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("agent_server exited")
+        try:
+            with urllib.request.urlopen(url + "/health", timeout=1):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("agent_server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold CLI runs against a warm agent_server")
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--question", default="How many files are there?")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as cache_dir:
+        print(f"Generating {args.files:,} files ...")
+        generate_tree(root, files=args.files)
+        common = ["--api-key", "benchmark", "--cache-dir", cache_dir]
+
+        cold = median_seconds(lambda: run_cli([root, args.question, *common]), args.repeat)
+        print(f"{'cold CLI':<12} {cold * 1000:10.1f} ms")
+
+        url = f"http://127.0.0.1:{free_port()}"
+        start = time.perf_counter()
+        server = subprocess.Popen([sys.executable, os.path.join(AGENT_DIR, "agent_server.py"), "--root", root,
+                                   "--port", url.rsplit(":", 1)[1], *common],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_server(url, server)
+            print(f"{'server start':<12} {(time.perf_counter() - start) * 1000:10.1f} ms (startup and initial scan)")
+
+            warm_cli = median_seconds(lambda: run_cli([root, args.question, "--server", url]), args.repeat)
+            print(f"{'warm CLI':<12} {warm_cli * 1000:10.1f} ms  {cold / warm_cli:6.1f}x")
+
+            payload = json.dumps({"folder": root, "question": args.question}).encode("utf-8")
+
+            def ask():
+                request = urllib.request.Request(url + "/ask", data=payload,
+                                                 headers={"Content-Type": "application/json"})
+                with urllib.request.urlopen(request) as response:
+                    return json.load(response)
+
+            warm_http = median_seconds(ask, args.repeat)
+            print(f"{'warm HTTP':<12} {warm_http * 1000:10.1f} ms  {cold / warm_http:6.1f}x")
+            print(f"Answer: {ask()['answer']}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
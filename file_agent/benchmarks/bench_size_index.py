@@ -0,0 +1,93 @@
+"""Size range, percentile, histogram and top-N queries: a pass over file_sizes vs. SizeIndex.
+
+Builds a synthetic file_sizes dict with log-normally distributed sizes,
+times building the sorted index (and its per-extension partitions), then
+times each query as the eval-style pass a CALCULATE expression would do and
+as an index lookup, checking both give the same answer.
+Usage: python -m benchmarks.bench_size_index [--files N] [--top-n N] [--repeat N]
+"""
+
+import argparse
+import heapq
+import math
+import os
+import random
+import time
+from operator import itemgetter
+
+from benchmarks.synthetic_tree import DEFAULT_EXTENSIONS
+from size_index import DEFAULT_HISTOGRAM_BASE, SizeIndex
+
+MB = 1024 * 1024
+GB = 1024 * MB
+
+
+def synthetic_sizes(files: int):
+    rng = random.Random(0)
+    return {f"dir{i // 100:06d}{os.sep}file_{i:08d}{DEFAULT_EXTENSIONS[i % len(DEFAULT_EXTENSIONS)]}":
+            min(int(rng.lognormvariate(10, 3)), 64 * GB) for i in range(files)}
+
+
+def pass_histogram(file_sizes, base: int):
+    counts = {}
+    for size in file_sizes.values():
+        bucket = 0 if size == 0 else int(math.log(size, base)) + 1
+        # Float rounding at exact powers
+        while bucket > 0 and base ** (bucket - 1) > size:
+            bucket -= 1
+        while size >= base ** bucket:
+            bucket += 1
+        counts[bucket] = counts.get(bucket, 0) + 1
+    return [counts.get(bucket, 0) for bucket in range(max(counts) + 1)]
+
+
+def timed(func, repeat: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sorted size index against passes over file_sizes")
+    parser.add_argument("--files", type=int, default=5_000_000)
+    parser.add_argument("--top-n", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=100, help="Index queries are averaged over this many runs")
+    args = parser.parse_args()
+
+    print(f"Generating {args.files:,} sizes ...")
+    file_sizes = synthetic_sizes(args.files)
+    index, build = timed(lambda: SizeIndex(file_sizes))
+    _, partitions = timed(lambda: index.partition(".log"))
+    print(f"{'build index':<24} {build:8.3f}s   per-extension partitions {partitions:.3f}s")
+
+    queries = [
+        ("count 10 MB - 1 GB",
+         lambda: sum(1 for size in file_sizes.values() if 10 * MB <= size <= GB),
+         lambda: index.count_between(10 * MB, GB)),
+        ("bytes 10 MB - 1 GB",
+         lambda: sum(size for size in file_sizes.values() if 10 * MB <= size <= GB),
+         lambda: index.total_between(10 * MB, GB)),
+        (".log count >= 1 MB",
+         lambda: sum(1 for path, size in file_sizes.items() if path.lower().endswith(".log") and size >= MB),
+         lambda: index.count_between(MB, None, ".log")),
+        ("90th percentile",
+         lambda: sorted(file_sizes.values())[math.ceil(0.9 * len(file_sizes)) - 1],
+         lambda: index.percentile(90)),
+        (f"top {args.top_n}",
+         lambda: [size for _, size in heapq.nlargest(args.top_n, file_sizes.items(), key=itemgetter(1))],
+         lambda: [size for _, size in index.largest(args.top_n)]),
+        (f"histogram (base {DEFAULT_HISTOGRAM_BASE})",
+         lambda: pass_histogram(file_sizes, DEFAULT_HISTOGRAM_BASE),
+         lambda: [files for _, _, files, _ in index.histogram()]),
+    ]
+    for label, scan, lookup in queries:
+        expected, scanned = timed(scan)
+        result, looked_up = timed(lookup, args.repeat)
+        assert result == expected, label
+        print(f"{label:<24} pass {scanned * 1000:10.1f} ms   index {looked_up * 1000:8.3f} ms   "
+              f"{scanned / looked_up:10,.0f}x   pays off after {math.ceil(build / scanned)} queries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Loading scan results from a memory-mapped snapshot vs. JSON, and memory shared between processes.
+
+Builds a file_info from synthetic listings, writes it as a binary snapshot
+and as JSON, then reports for each: file size, cold load time, a full pass
+(total size) and random path lookups. Then starts --processes workers that
+each load the results and run the full pass, and reports their private
+memory (Private_Clean + Private_Dirty from /proc/self/smaps_rollup, Linux
+only): snapshot readers share the page-cached file instead of each holding
+their own dicts.
+Usage: python -m benchmarks.bench_snapshot [--files N] [--processes N] [--lookups N]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from file_agent import ScanAccumulator
+from scan_snapshot import load_snapshot, write_snapshot
+from benchmarks.synthetic_tree import synthetic_listings
+
+SMAPS = "/proc/self/smaps_rollup"
+
+
+def load_json(path: str):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def private_memory() -> int:
+    """Bytes of memory only this process maps (shared file pages not included)."""
+    private = 0
+    with open(SMAPS) as f:
+        for line in f:
+            if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                private += int(line.split()[1]) * 1024
+    return private
+
+
+def _worker(kind: str, path: str, queue):
+    before = private_memory()
+    file_info = load_snapshot(path) if kind == "snapshot" else load_json(path)
+    total = sum(file_info["file_sizes"].values())
+    queue.put((private_memory() - before, total))
+
+
+def timed(func, repeat: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark memory-mapped scan snapshots against JSON")
+    parser.add_argument("--files", type=int, default=1_000_000)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--lookups", type=int, default=10000)
+    args = parser.parse_args()
+
+    accumulator = ScanAccumulator()
+    for files, directories in synthetic_listings(args.files):
+        accumulator.add_listing(files, directories)
+    file_info = accumulator.result()
+    keys = ("total_files", "total_directories", "file_types", "file_sizes", "directory_structure",
+            "largest_files", "file_list", "file_sample", "directory_sample", "extension_sizes")
+    paths = random.Random(0).sample(file_info["file_list"], min(args.lookups, args.files))
+    expected_total = sum(file_info["file_sizes"].values())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_path = os.path.join(tmp, "scan.snap")
+        json_path = os.path.join(tmp, "scan.json")
+        _, write_time = timed(lambda: write_snapshot(file_info, snapshot_path))
+        _, json_write_time = timed(lambda: json.dump({key: file_info[key] for key in keys},
+                                                     open(json_path, "w", encoding="utf-8")))
+        print(f"{args.files:,} files")
+        print(f"{'write':<10} snapshot {write_time:8.3f}s   json {json_write_time:8.3f}s")
+
+        for label, load, path, write in (("snapshot", load_snapshot, snapshot_path, write_time),
+                                         ("json", load_json, json_path, json_write_time)):
+            loaded, load_time = timed(lambda: load(path))
+            sizes = loaded["file_sizes"]
+            total, pass_time = timed(lambda: sum(sizes.values()))
+            assert total == expected_total
+            found, lookup_time = timed(lambda: [sizes[path] for path in paths])
+            assert found == [file_info["file_sizes"][path] for path in paths]
+            print(f"{label:<10} {os.path.getsize(path) / 2**20:8.1f} MiB   load {load_time * 1000:9.2f} ms   "
+                  f"total size {pass_time * 1000:8.1f} ms   lookup {lookup_time / len(paths) * 1e6:6.2f} us")
+
+        if not os.path.exists(SMAPS):
+            print(f"{SMAPS} not available, skipping the shared memory comparison")
+            return
+        context = multiprocessing.get_context("spawn")
+        for kind, path in (("snapshot", snapshot_path), ("json", json_path)):
+            queue = context.Queue()
+            workers = [context.Process(target=_worker, args=(kind, path, queue)) for _ in range(args.processes)]
+            for worker in workers:
+                worker.start()
+            results = [queue.get() for _ in workers]
+            for worker in workers:
+                worker.join()
+            assert all(total == expected_total for _, total in results)
+            private = sum(memory for memory, _ in results) / len(results)
+            print(f"{kind:<10} {args.processes} processes: {private / 2**20:8.1f} MiB private memory each "
+                  f"({private / args.files:6.1f} B/file)")
+
+
+if __name__ == "__main__":
+    main()
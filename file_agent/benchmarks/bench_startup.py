@@ -0,0 +1,78 @@
+"""Startup time of the CLI paths that need no LLM, measured with ``python -X importtime``.
+
+Runs each command ``--repeat`` times in a fresh interpreter and reports the
+median wall time, the total import time from ``-X importtime``, whether
+openai was imported, and the slowest top-level imports. Importing openai up
+front (what file_agent.py used to do) is included for comparison.
+Usage: python -m benchmarks.bench_startup [--files N] [--repeat N] [--top N]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic_tree import generate_tree
+
+AGENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(stderr: str):
+    """Return the total import time in µs and the (cumulative µs, module) of top-level imports."""
+    total = 0
+    top_level = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        total += int(self_us)
+        if not name[1:].startswith(" "):
+            top_level.append((int(cumulative_us), name.strip()))
+    return total, sorted(top_level, reverse=True)
+
+
+def measure(label: str, args: list, repeat: int, top: int):
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=AGENT_DIR, capture_output=True, text=True, check=True)
+        runs.append(time.perf_counter() - start)
+    result = subprocess.run([sys.executable, "-X", "importtime", *args], cwd=AGENT_DIR,
+                            capture_output=True, text=True, check=True)
+    total, top_level = parse_importtime(result.stderr)
+    imported = {name for _, name in top_level}
+    print(f"{label:<28} {statistics.median(runs) * 1000:8.1f} ms  imports {total / 1000:7.1f} ms  "
+          f"openai {'imported' if 'openai' in imported else 'not imported'}")
+    for cumulative_us, name in top_level[:top]:
+        print(f"    {cumulative_us / 1000:8.1f} ms  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CLI startup and import time")
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=3, help="Slowest top-level imports to show per command")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as cache_dir:
+        generate_tree(root, files=args.files)
+        options = ["--cache-dir", cache_dir]
+        commands = [
+            ("import file_agent", ["-c", "import file_agent"]),
+            ("import openai, file_agent", ["-c", "import openai, file_agent"]),
+            ("CLI --summary-only", ["file_agent.py", root, "--summary-only", *options]),
+            ("CLI local question", ["file_agent.py", root, "How many files are there?", "--api-key", "benchmark",
+                                    *options]),
+        ]
+        for label, command in commands:
+            try:
+                measure(label, command, args.repeat, args.top)
+            except subprocess.CalledProcessError as e:
+                print(f"{label:<28} failed: {e.stderr.strip().splitlines()[-1] if e.stderr else e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Benchmark suite: time every phase of the agent and record the results as JSON.
+
+Generates a deterministic synthetic tree and measures, each as the median of
+``--repeat`` runs:
+
+- scan_directory (files/s),
+- create_summary and the budgeted prompt context,
+- _evaluate_calculation for typical CALCULATE expressions,
+- answer_question end to end against the stub LLM, both a locally answered
+  question and one that goes through the LLM.
+
+Each phase also records the peak RSS of the process after it ran. Results
+go to ``--output`` as JSON together with the git commit, and ``--compare``
+prints the change against an earlier result file, so regressions show up
+between commits.
+Usage: python -m benchmarks.run_suite [--files N] [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from file_agent import FileSystemAgent
+from prompt_context import build_context
+from benchmarks.bench_calculation import EXPRESSIONS
+from benchmarks.stub_llm import StubClient
+from benchmarks.synthetic_tree import DEFAULT_EXTENSIONS, generate_tree, parse_extension_mix
+
+# Phases that slowed down by more than this fraction are flagged by --compare
+REGRESSION_THRESHOLD = 0.10
+
+
+def peak_rss_kb() -> int:
+    """Peak resident set size of this process in KiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def measure(results: dict, name: str, func, repeat: int, items: int = 0):
+    """Run ``func`` ``repeat`` times and record the median time, throughput and peak RSS."""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    seconds = statistics.median(runs)
+    results[name] = {"seconds": seconds, "runs": runs, "peak_rss_kb": peak_rss_kb()}
+    if items:
+        results[name]["items_per_second"] = items / seconds if seconds else None
+    rate = f"  {items / seconds:12,.0f}/s" if items and seconds else ""
+    print(f"{name:<28} {seconds * 1000:10.2f} ms{rate}")
+
+
+def compare(results: dict, baseline_path: str):
+    """Print the change of every phase against an earlier result file."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline['meta']['commit']} ({baseline_path}):")
+    regressions = 0
+    for name, phase in results["phases"].items():
+        before = baseline["phases"].get(name)
+        if before is None:
+            print(f"  {name:<28} (new)")
+            continue
+        change = phase["seconds"] / before["seconds"] - 1 if before["seconds"] else 0.0
+        flag = "  REGRESSION" if change > REGRESSION_THRESHOLD else ""
+        regressions += bool(flag)
+        print(f"  {name:<28} {before['seconds'] * 1000:10.2f} -> {phase['seconds'] * 1000:10.2f} ms "
+              f"({change:+.1%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the file agent benchmark suite")
+    parser.add_argument("--files", type=int, default=50_000)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--fanout", type=int, default=6)
+    parser.add_argument("--extensions", help='Extension mix, e.g. ".py:5,.txt:2,none:1" (default: uniform)')
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub LLM latency in seconds")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare with an earlier results file")
+    args = parser.parse_args()
+
+    if args.extensions:
+        mix = parse_extension_mix(args.extensions)
+        extensions, weights = list(mix), list(mix.values())
+    else:
+        extensions, weights = DEFAULT_EXTENSIONS, None
+
+    phases = {}
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as cache_dir:
+        start = time.perf_counter()
+        generate_tree(root, files=args.files, depth=args.depth, fanout=args.fanout,
+                      extensions=extensions, weights=weights, seed=args.seed)
+        print(f"Generated {args.files:,} files in {time.perf_counter() - start:.1f}s")
+
+        agent = FileSystemAgent("benchmark", answer_cache=False, cache_dir=cache_dir)
+        agent.client = StubClient(args.latency)
+        file_info = agent.scan_directory(root)
+
+        measure(phases, "scan_directory", lambda: agent.scan_directory(root), args.repeat, args.files)
+        measure(phases, "scan_directory (1 thread)", lambda: agent.scan_directory(root, workers=1),
+                args.repeat, args.files)
+        measure(phases, "create_summary", lambda: agent.create_summary(file_info, root), args.repeat)
+        measure(phases, "build_context", lambda: build_context(file_info, root, agent.max_prompt_tokens,
+                                                               agent.format_size, agent.sample_size), args.repeat)
+        for i, expression in enumerate(EXPRESSIONS):
+            measure(phases, f"evaluate_calculation[{i}]",
+                    lambda: agent._evaluate_calculation(f"CALCULATE: {expression}", file_info), args.repeat,
+                    file_info["total_files"])
+        measure(phases, "answer_question (local)",
+                lambda: agent.answer_question("How many Python files are there?", file_info, root), args.repeat)
+        measure(phases, "answer_question (LLM)",
+                lambda: agent.answer_question("What do the log and csv files weigh together?", file_info, root),
+                args.repeat)
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "args": vars(args),
+        },
+        "phases": phases,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.output}")
+    if args.compare:
+        return 1 if compare(results, args.compare) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+"""In-process stand-in for the OpenAI client used by the benchmarks.
+
+StubClient mimics ``client.chat.completions.create`` closely enough for
+FileSystemAgent: it sleeps for a configurable latency and returns a canned
+answer, by default a CALCULATE expression for the total size of all files.
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+DEFAULT_ANSWER = "CALCULATE: sum(file_info['file_sizes'].values())"
+
+
+class _Completions:
+    def __init__(self, client):
+        self._client = client
+
+    def create(self, **kwargs):
+        client = self._client
+        with client._lock:
+            client.calls += 1
+        time.sleep(client.latency)
+        message = SimpleNamespace(content=client.answer_for(kwargs))
+        usage = SimpleNamespace(prompt_tokens=sum(len(m["content"]) for m in kwargs["messages"]) // 4,
+                                completion_tokens=len(message.content) // 4)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+class StubClient:
+    """Fake OpenAI client returning canned answers after ``latency`` seconds."""
+
+    def __init__(self, latency: float = 0.5, answer: str = DEFAULT_ANSWER):
+        self.latency = latency
+        self.answer = answer
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+    def answer_for(self, request: dict) -> str:
+        return self.answer
@@ -0,0 +1,72 @@
+"""Deterministic synthetic directory trees for benchmarks."""
+
+import os
+import random
+from typing import Dict, Optional, Sequence
+
+DEFAULT_EXTENSIONS = (".py", ".txt", ".md", ".json", ".png", ".jpg", ".log", ".csv", "")
+
+
+def generate_tree(root: str, files: int = 20000, depth: int = 4, fanout: int = 6,
+                  extensions: Sequence[str] = DEFAULT_EXTENSIONS, max_size: int = 4096,
+                  seed: int = 0, weights: Optional[Sequence[float]] = None) -> int:
+    """Create ``files`` files spread over a directory tree under ``root``.
+    
+    Every directory down to ``depth`` levels gets ``fanout`` subdirectories and
+    files are distributed round-robin across all of them. Extensions are drawn
+    uniformly, or with the relative ``weights``. Returns the number of
+    directories created.
+    """
+    rng = random.Random(seed)
+    directories = [root]
+    level = [root]
+    for _ in range(depth):
+        next_level = []
+        for parent in level:
+            for i in range(fanout):
+                path = os.path.join(parent, f"dir{i}")
+                next_level.append(path)
+        directories.extend(next_level)
+        level = next_level
+    
+    for path in directories:
+        os.makedirs(path, exist_ok=True)
+    
+    payload = b"x" * max_size
+    for i in range(files):
+        directory = directories[i % len(directories)]
+        extension = rng.choice(extensions) if weights is None else rng.choices(extensions, weights)[0]
+        name = f"file{i}{extension}"
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(payload[:rng.randint(0, max_size)])
+    
+    return len(directories) - 1
+
+
+def parse_extension_mix(mix: str) -> Dict[str, float]:
+    """Parse an extension mix like ".py:5,.txt:2,none:1" into {extension: weight}.
+    
+    "none" stands for files without an extension; a missing weight means 1.
+    """
+    weights = {}
+    for item in mix.split(","):
+        extension, _, weight = item.strip().partition(":")
+        weights["" if extension == "none" else extension] = float(weight or 1)
+    return weights
+
+
+def synthetic_listings(files: int, files_per_dir: int = 50, extensions: Sequence[str] = DEFAULT_EXTENSIONS):
+    """Yield in-memory (files, directories) listings shaped like a real scan.
+    
+    Each listing matches what ScanAccumulator.add_listing receives, so
+    accumulators can be benchmarked at millions of entries without disk I/O.
+    """
+    extensions = [ext or "no_extension" for ext in extensions]
+    for d in range(0, files, files_per_dir):
+        prefix = os.path.join("project", f"module{d // 5000}", f"package{d // 500}", f"dir{d}") + os.sep
+        listing = []
+        for i in range(d, min(d + files_per_dir, files)):
+            extension = extensions[i % len(extensions)]
+            suffix = "" if extension == "no_extension" else extension
+            listing.append((f"{prefix}file_{i:08d}{suffix}", extension, (i * 7919) % 1_000_000))
+        yield listing, [prefix.rstrip(os.sep)]
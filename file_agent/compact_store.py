@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""Compact columnar storage of scan results for very large trees.
+
+Instead of keeping every relative path as a Python str in several places,
+CompactAccumulator stores each file as a few fixed-width columns:
+
+- an index into a table of interned directory prefixes,
+- the end offset of its name in a shared UTF-8 name heap,
+- its size in an ``array('q')`` (-1 when the size is unknown),
+- an extension code into a small extension table.
+
+The resulting file_info exposes the usual keys, with ``file_sizes``,
+``file_list`` and ``directory_structure`` as lazy read-only views that
+rebuild paths on demand, so create_summary, _evaluate_calculation and the
+Streamlit statistics keep working unchanged.
+"""
+
+import os
+from array import array
+from collections.abc import ItemsView, KeysView, Mapping, Sequence, ValuesView
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from file_agent import DEFAULT_SAMPLE_SIZE, DEFAULT_TOP_N, StreamingAggregates
+
+UNKNOWN_SIZE = -1
+
+
+class PathColumn:
+    """Append-only column of relative paths stored as (prefix, name) pairs."""
+
+    def __init__(self):
+        self.prefixes: List[str] = []
+        self._prefix_index: Dict[str, int] = {}
+        self.prefix_codes = array('I')
+        self.name_heap = bytearray()
+        self.name_ends = array('Q')
+
+    def __len__(self) -> int:
+        return len(self.name_ends)
+
+    def append(self, rel_path: str):
+        prefix, sep, name = rel_path.rpartition(os.sep)
+        prefix += sep
+        code = self._prefix_index.get(prefix)
+        if code is None:
+            code = self._prefix_index[prefix] = len(self.prefixes)
+            self.prefixes.append(prefix)
+        self.prefix_codes.append(code)
+        self.name_heap += name.encode("utf-8", "surrogateescape")
+        self.name_ends.append(len(self.name_heap))
+
+    def path(self, i: int) -> str:
+        start = self.name_ends[i - 1] if i else 0
+        name = self.name_heap[start:self.name_ends[i]].decode("utf-8", "surrogateescape")
+        return self.prefixes[self.prefix_codes[i]] + name
+
+    def __iter__(self) -> Iterator[str]:
+        heap = self.name_heap
+        prefixes = self.prefixes
+        start = 0
+        for code, end in zip(self.prefix_codes, self.name_ends):
+            yield prefixes[code] + heap[start:end].decode("utf-8", "surrogateescape")
+            start = end
+
+
+class PathListView(Sequence):
+    """Read-only list view over a PathColumn (file_list, directory_structure)."""
+
+    def __init__(self, column: PathColumn):
+        self._column = column
+
+    def __len__(self) -> int:
+        return len(self._column)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._column.path(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("path index out of range")
+        return self._column.path(i)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._column)
+
+
+class _SizeKeys(KeysView):
+    def __iter__(self):
+        return iter(self._mapping)
+
+
+class _SizeValues(ValuesView):
+    def __iter__(self):
+        return (size for size in self._mapping._sizes if size != UNKNOWN_SIZE)
+
+
+class _SizeItems(ItemsView):
+    def __iter__(self):
+        return ((path, size) for path, size in zip(self._mapping._paths, self._mapping._sizes)
+                if size != UNKNOWN_SIZE)
+
+
+class FileSizesView(Mapping):
+    """Read-only mapping of relative path to size over the compact columns.
+
+    Iteration streams through the columns; the first key lookup builds a
+    path-to-row dictionary, which is only needed for random access.
+    """
+
+    def __init__(self, paths: PathColumn, sizes: array, count: int):
+        self._paths = paths
+        self._sizes = sizes
+        self._count = count
+        self._lookup: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[str]:
+        return (path for path, size in zip(self._paths, self._sizes) if size != UNKNOWN_SIZE)
+
+    def __getitem__(self, path: str) -> int:
+        if self._lookup is None:
+            self._lookup = {p: i for i, p in enumerate(self._paths)}
+        size = self._sizes[self._lookup[path]]
+        if size == UNKNOWN_SIZE:
+            raise KeyError(path)
+        return size
+
+    def keys(self):
+        return _SizeKeys(self)
+
+    def values(self):
+        return _SizeValues(self)
+
+    def items(self):
+        return _SizeItems(self)
+
+
+class CompactAccumulator:
+    """Collect directory listings into compact columns (see ScanAccumulator)."""
+
+    def __init__(self, top_n: int = DEFAULT_TOP_N, sample_size: int = DEFAULT_SAMPLE_SIZE):
+        self.aggregates = StreamingAggregates(top_n, sample_size)
+        self.files = PathColumn()
+        self.directories = PathColumn()
+        self.sizes = array('q')
+        self.extension_codes = array('I')
+        self.extensions: List[str] = []
+        self._extension_index: Dict[str, int] = {}
+        self.sized_files = 0
+
+    def add_listing(self, files: List[Tuple[str, str, Optional[int]]], directories: List[str]):
+        """Add the files and subdirectories found in one directory."""
+        extension_index = self._extension_index
+        for rel_path, extension, size in files:
+            code = extension_index.get(extension)
+            if code is None:
+                code = extension_index[extension] = len(self.extensions)
+                self.extensions.append(extension)
+            self.extension_codes.append(code)
+            self.files.append(rel_path)
+            if size is None:
+                self.sizes.append(UNKNOWN_SIZE)
+            else:
+                self.sizes.append(size)
+                self.sized_files += 1
+
+        for rel_path in directories:
+            self.directories.append(rel_path)
+        self.aggregates.add_listing(files, directories)
+
+    def merge(self, other: "CompactAccumulator"):
+        """Append the columns of another accumulator that scanned a disjoint subtree."""
+        extension_index = self._extension_index
+        codes = []
+        for extension in other.extensions:
+            code = extension_index.get(extension)
+            if code is None:
+                code = extension_index[extension] = len(self.extensions)
+                self.extensions.append(extension)
+            codes.append(code)
+        self.extension_codes.extend(codes[code] for code in other.extension_codes)
+        for rel_path in other.files:
+            self.files.append(rel_path)
+        for rel_path in other.directories:
+            self.directories.append(rel_path)
+        self.sizes.extend(other.sizes)
+        self.sized_files += other.sized_files
+        self.aggregates.merge(other.aggregates)
+
+    def counts(self) -> Tuple[int, int]:
+        """Return the number of files and directories added so far."""
+        return len(self.files), len(self.directories)
+
+    def result(self) -> Dict[str, Any]:
+        """Return a file_info dictionary backed by the compact columns."""
+        counts = [0] * len(self.extensions)
+        for code in self.extension_codes:
+            counts[code] += 1
+
+        file_info = {
+            "total_files": len(self.files),
+            "total_directories": len(self.directories),
+            "file_types": dict(zip(self.extensions, counts)),
+            "file_sizes": FileSizesView(self.files, self.sizes, self.sized_files),
+            "directory_structure": PathListView(self.directories),
+            "largest_files": [],
+            "file_list": PathListView(self.files),
+        }
+        self.aggregates.fill(file_info)
+        return file_info
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""Per-directory totals of a scan, rolled up to every ancestor.
+
+The rollup is built on first use in one pass over the scan: the files of
+each directory are summed once (files, sized files, bytes, per-extension
+breakdown), and the sums are rolled up to every ancestor, so later subtree
+questions are dictionary lookups instead of passes over every file_sizes
+key with prefix checks. Scans do not build it, so only the trees that are
+asked about pay for it:
+
+    rollup = directory_rollup(file_info)
+    logs = rollup.get("logs")            # files, bytes, extensions under logs/
+    rollup.heaviest(5)                   # the five largest top-level folders
+
+Paths are relative to the scanned root, "" being the root itself.
+"""
+
+import heapq
+import os
+from typing import Dict, Any, List, Optional, Tuple
+
+ROLLUP_KEY = "directory_rollup"
+
+
+class DirectoryStats:
+    """Totals of everything below one directory.
+
+    ``extensions`` maps an extension to [files, sized files, bytes];
+    ``directories`` counts the subdirectories at any depth.
+    """
+
+    __slots__ = ("files", "sized_files", "bytes", "directories", "extensions")
+
+    def __init__(self):
+        self.files = 0
+        self.sized_files = 0
+        self.bytes = 0
+        self.directories = 0
+        self.extensions: Dict[str, List[int]] = {}
+
+    def add(self, files: int, sized_files: int, size: int, directories: int, extensions: Dict[str, List[int]]):
+        self.files += files
+        self.sized_files += sized_files
+        self.bytes += size
+        self.directories += directories
+        own = self.extensions
+        for extension, (count, sized, total) in extensions.items():
+            entry = own.get(extension)
+            if entry is None:
+                own[extension] = [count, sized, total]
+            else:
+                entry[0] += count
+                entry[1] += sized
+                entry[2] += total
+
+    def count(self, extensions=None) -> int:
+        """Number of files, optionally only those with one of ``extensions``."""
+        if extensions is None:
+            return self.files
+        return sum(self.extensions[ext][0] for ext in extensions if ext in self.extensions)
+
+    def size(self, extensions=None) -> int:
+        """Total bytes, optionally only of files with one of ``extensions``."""
+        if extensions is None:
+            return self.bytes
+        return sum(self.extensions[ext][2] for ext in extensions if ext in self.extensions)
+
+    def sized_count(self, extensions=None) -> int:
+        """Number of files with a known size, optionally only with one of ``extensions``."""
+        if extensions is None:
+            return self.sized_files
+        return sum(self.extensions[ext][1] for ext in extensions if ext in self.extensions)
+
+
+def normalize_directory(path: str) -> str:
+    """Turn a user-typed directory ("./logs/", "src\\\\app") into a rollup key."""
+    path = path.strip().replace("/", os.sep).replace("\\", os.sep)
+    while path.startswith("." + os.sep):
+        path = path[2:]
+    path = path.strip(os.sep)
+    return "" if path == "." else path
+
+
+def _parent(path: str) -> str:
+    return path.rpartition(os.sep)[0]
+
+
+class DirectoryRollup:
+    """Directory tree index with per-subtree totals.
+
+    ``from_file_info`` gives each directory only the totals of its own
+    files and subdirectories, in one pass over the scan. They are rolled up
+    to the ancestors in one bottom-up pass the first time ``nodes`` is
+    read, so no file is added to every directory above it.
+    """
+
+    def __init__(self):
+        self._own: Dict[str, DirectoryStats] = {"": DirectoryStats()}
+        self.children: Dict[str, List[str]] = {}
+        self._nodes: Optional[Dict[str, DirectoryStats]] = None
+
+    def _node(self, path: str) -> DirectoryStats:
+        node = self._own.get(path)
+        if node is None:
+            node = self._own[path] = DirectoryStats()
+            parent = _parent(path)
+            self._node(parent)
+            self.children.setdefault(parent, []).append(path)
+        return node
+
+    @property
+    def nodes(self) -> Dict[str, DirectoryStats]:
+        """Totals of every scanned directory's subtree, keyed on its relative path."""
+        nodes = self._nodes
+        if nodes is None:
+            nodes = {}
+            children = self.children
+            for path, own in self._own.items():
+                # A leaf's subtree is its own listing; only directories with children need a copy to add to
+                if path in children:
+                    stats = nodes[path] = DirectoryStats()
+                    stats.add(own.files, own.sized_files, own.bytes, own.directories, own.extensions)
+                else:
+                    nodes[path] = own
+            # Deepest first, so every directory is complete before it is added to its parent
+            for path in sorted(nodes, key=lambda path: path.count(os.sep), reverse=True):
+                if path:
+                    stats = nodes[path]
+                    nodes[_parent(path)].add(stats.files, stats.sized_files, stats.bytes, stats.directories,
+                                             stats.extensions)
+            self._nodes = nodes
+        return nodes
+
+    def get(self, path: str) -> Optional[DirectoryStats]:
+        """Return the totals under a directory, or None if it was not scanned."""
+        return self.nodes.get(normalize_directory(path))
+
+    def heaviest(self, n: int = 10, under: str = "", by: str = "bytes",
+                 extensions=None) -> List[Tuple[str, DirectoryStats]]:
+        """Return the ``n`` direct subdirectories of ``under`` with the most bytes (or "files").
+
+        With ``extensions``, only files with one of them are weighed.
+        """
+        children = self.children.get(normalize_directory(under), [])
+        nodes = self.nodes
+        if by == "files":
+            weight = lambda path: nodes[path].count(extensions)
+        else:
+            weight = lambda path: nodes[path].size(extensions)
+        return [(path, nodes[path]) for path in heapq.nsmallest(n, children, key=lambda path: (-weight(path), path))]
+
+    @classmethod
+    def from_file_info(cls, file_info: Dict[str, Any]) -> "DirectoryRollup":
+        """Build the rollup of an existing scan in one pass over its files."""
+        from file_agent import _file_extension
+        # Per directory: extension -> [files, sized files, bytes] of its own files
+        listings: Dict[str, Dict[str, List[int]]] = {}
+        get_size = file_info["file_sizes"].get
+        for path in file_info["file_list"]:
+            directory, _, name = path.rpartition(os.sep)
+            extensions = listings.get(directory)
+            if extensions is None:
+                extensions = listings[directory] = {}
+            extension = _file_extension(name)
+            entry = extensions.get(extension)
+            if entry is None:
+                entry = extensions[extension] = [0, 0, 0]
+            entry[0] += 1
+            size = get_size(path)
+            if size is not None:
+                entry[1] += 1
+                entry[2] += size
+
+        rollup = cls()
+        subdirectories: Dict[str, int] = {}
+        for path in file_info["directory_structure"]:
+            rollup._node(path)
+            parent = _parent(path)
+            subdirectories[parent] = subdirectories.get(parent, 0) + 1
+        for directory, extensions in listings.items():
+            rollup._node(directory).add(sum(entry[0] for entry in extensions.values()),
+                                        sum(entry[1] for entry in extensions.values()),
+                                        sum(entry[2] for entry in extensions.values()),
+                                        subdirectories.pop(directory, 0), extensions)
+        for directory, count in subdirectories.items():
+            rollup._node(directory).add(0, 0, 0, count, {})
+        return rollup
+
+
+def directory_rollup(file_info: Dict[str, Any]) -> DirectoryRollup:
+    """Return the rollup of a scan.
+
+    It is built in a single pass over the scan the first time it is needed
+    (again after a watcher changed file_info) and cached in file_info.
+    """
+    rollup = file_info.get(ROLLUP_KEY)
+    if rollup is None:
+        rollup = file_info[ROLLUP_KEY] = DirectoryRollup.from_file_info(file_info)
+    return rollup
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""Duplicate file detection for the File System Agent.
+
+Only files that share their size with another file can be duplicates, so the
+pipeline starts from file_info["file_sizes"] without touching the disk. Files
+in those size groups get a hash of their first 64 KiB, and only files whose
+size and partial hash both collide are hashed in full. Reads run on a thread
+pool with large buffers.
+
+Symlinks are skipped and hard links to one file count once, so a file is
+never reported as a duplicate of itself. Hashes are stored in a SQLite cache
+per root keyed on (path, size, mtime), so a repeat run only stats the
+candidate files.
+"""
+
+import hashlib
+import os
+import sqlite3
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+from file_agent import DEFAULT_CACHE_DIR, DEFAULT_SCAN_WORKERS
+
+PARTIAL_HASH_BYTES = 64 * 1024
+READ_BUFFER_BYTES = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    partial BLOB,
+    full BLOB
+);
+"""
+
+
+def _hash_file(path: str, limit: Optional[int] = None) -> Optional[bytes]:
+    """Hash the first ``limit`` bytes of a file (all of it without a limit)."""
+    digest = hashlib.blake2b(digest_size=16)
+    buffer = bytearray(min(limit, READ_BUFFER_BYTES) if limit else READ_BUFFER_BYTES)
+    view = memoryview(buffer)
+    remaining = limit
+    try:
+        with open(path, "rb", buffering=0) as f:
+            while remaining is None or remaining > 0:
+                n = f.readinto(view if remaining is None else view[:min(remaining, len(view))])
+                if not n:
+                    break
+                digest.update(view[:n])
+                if remaining is not None:
+                    remaining -= n
+    except OSError:
+        return None
+    return digest.digest()
+
+
+def _group(items: List[Tuple[Any, str]]) -> List[List[str]]:
+    """Return the groups of paths that share a key and have more than one member."""
+    groups: Dict[Any, List[str]] = {}
+    for key, path in items:
+        groups.setdefault(key, []).append(path)
+    return [paths for paths in groups.values() if len(paths) > 1]
+
+
+def _new_stats() -> Dict[str, int]:
+    return {"candidates": 0, "symlinks": 0, "hard_links": 0, "partial_hashes": 0, "full_hashes": 0,
+            "cache_hits": 0, "bytes_read": 0}
+
+
+class DuplicateFinder:
+    """Find groups of identical files in a scanned tree."""
+
+    def __init__(self, root_path: str, cache_dir: Optional[str] = None):
+        self.root_path = os.path.abspath(root_path)
+        cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        os.makedirs(cache_dir, exist_ok=True)
+
+        key = hashlib.sha1(self.root_path.encode("utf-8", "surrogateescape")).hexdigest()[:16]
+        self.db_path = os.path.join(cache_dir, f"hashes-{key}.sqlite")
+        self.stats = _new_stats()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def find(self, file_info: Dict[str, Any], workers: Optional[int] = None) -> Dict[str, Any]:
+        """Return the duplicate groups of a scan and the space they waste.
+
+        Empty files and symlinks are ignored, and of several hard links to
+        one file only the first path is checked. The result has the groups
+        as (size, paths) largest waste first, the number of redundant copies
+        and the bytes they take up.
+        """
+        if workers is None:
+            workers = DEFAULT_SCAN_WORKERS
+        self.stats = _new_stats()
+
+        by_size: Dict[int, List[str]] = {}
+        for path, size in file_info["file_sizes"].items():
+            if size > 0:
+                by_size.setdefault(size, []).append(path)
+        # Sorted, so the first name of a hard-linked file is the one that is kept
+        candidates = sorted((path, size) for size, paths in by_size.items() if len(paths) > 1 for path in paths)
+        self.stats["candidates"] = len(candidates)
+
+        conn = self._connect()
+        try:
+            cached = {path: (size, mtime, partial, full) for path, size, mtime, partial, full
+                      in conn.execute("SELECT path, size, mtime_ns, partial, full FROM hashes")}
+
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                # Stat every candidate; cached hashes are only valid for the same size and mtime
+                lstats = pool.map(self._stat, [path for path, _ in candidates])
+                inodes = set()
+                files: List[Tuple[str, int, int]] = []
+                for (path, size), st in zip(candidates, lstats):
+                    if st is None:
+                        continue
+                    if stat.S_ISLNK(st.st_mode):
+                        self.stats["symlinks"] += 1
+                        continue
+                    inode = (st.st_dev, st.st_ino)
+                    if inode in inodes:
+                        self.stats["hard_links"] += 1
+                        continue
+                    inodes.add(inode)
+                    files.append((path, size, st.st_mtime_ns))
+                # A size that is left with a single file has nothing to compare with
+                sizes: Dict[int, int] = {}
+                for _, size, _ in files:
+                    sizes[size] = sizes.get(size, 0) + 1
+
+                entries: Dict[str, list] = {}
+                for path, size, mtime in files:
+                    if sizes[size] < 2:
+                        continue
+                    entry = cached.get(path)
+                    if entry is not None and entry[0] == size and entry[1] == mtime:
+                        self.stats["cache_hits"] += 1
+                        entries[path] = [size, mtime, entry[2], entry[3]]
+                    else:
+                        entries[path] = [size, mtime, None, None]
+
+                self._fill(pool, entries, [path for path, entry in entries.items() if entry[2] is None],
+                           partial=True)
+                # Small files were read completely for the partial hash
+                for entry in entries.values():
+                    if entry[0] <= PARTIAL_HASH_BYTES:
+                        entry[3] = entry[2]
+                partial_groups = _group([((entry[0], entry[2]), path) for path, entry in entries.items()
+                                         if entry[2] is not None])
+                self._fill(pool, entries, [path for paths in partial_groups for path in paths
+                                           if entries[path][3] is None], partial=False)
+
+            # Keep only the current candidates so the cache does not grow with deleted files
+            conn.execute("DELETE FROM hashes")
+            conn.executemany("INSERT INTO hashes (path, size, mtime_ns, partial, full) VALUES (?, ?, ?, ?, ?)",
+                             ((path, *entry) for path, entry in entries.items()))
+            conn.commit()
+        finally:
+            conn.close()
+
+        groups = []
+        for paths in partial_groups:
+            for same in _group([(entries[path][3], path) for path in paths if entries[path][3] is not None]):
+                groups.append((entries[same[0]][0], sorted(same)))
+        groups.sort(key=lambda group: (-group[0] * (len(group[1]) - 1), group[1][0]))
+        return {
+            "groups": groups,
+            "duplicate_files": sum(len(paths) - 1 for _, paths in groups),
+            "wasted_bytes": sum(size * (len(paths) - 1) for size, paths in groups),
+        }
+
+    def _stat(self, rel_path: str) -> Optional[os.stat_result]:
+        try:
+            return os.lstat(os.path.join(self.root_path, rel_path))
+        except OSError:
+            return None
+
+    def _fill(self, pool: ThreadPoolExecutor, entries: Dict[str, list], paths: List[str], partial: bool):
+        """Hash files on the pool and store the digests in their entries."""
+        limit = PARTIAL_HASH_BYTES if partial else None
+        digests = pool.map(lambda path: _hash_file(os.path.join(self.root_path, path), limit), paths)
+        for path, digest in zip(paths, digests):
+            entry = entries[path]
+            entry[2 if partial else 3] = digest
+            self.stats["partial_hashes" if partial else "full_hashes"] += 1
+            self.stats["bytes_read"] += min(entry[0], PARTIAL_HASH_BYTES) if partial else entry[0]
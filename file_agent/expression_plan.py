@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""Compile CALCULATE expressions into query plans over per-suffix aggregates.
+
+The LLM answers size questions with generator expressions such as::
+
+    sum(size for file, size in file_info['file_sizes'].items()
+        if file.lower().endswith('.png') or file.lower().endswith('.jpg'))
+
+Evaluating these with eval walks every path and calls ``.lower()`` once per
+suffix. compile_plan parses the validated expression with ``ast`` into a small
+plan (a suffix filter plus sum/count/max/min aggregates combined with
+arithmetic), and the plan runs against per-suffix statistics that the scan
+collects in file_info["suffix_stats"] (or that are rebuilt in one pass).
+
+For a suffix ``s`` that starts with the only dot it contains,
+``path.lower().endswith(s)`` holds exactly when the lowercased path from its
+last dot onwards equals ``s``, so grouping by that key gives the same results
+as eval. Expressions outside the supported shapes compile to None and are
+evaluated with eval as before.
+"""
+
+import ast
+import operator
+import os
+from functools import lru_cache
+from typing import Dict, Any, FrozenSet, List, Optional
+
+SUFFIX_STATS_KEY = "suffix_stats"
+
+BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+}
+
+
+def suffix_key(path: str) -> Optional[str]:
+    """Return the lowercased text of a path from its last dot onwards (None without a dot)."""
+    lower = path.lower()
+    i = lower.rfind('.')
+    return lower[i:] if i >= 0 else None
+
+
+def add_suffix_stat(stats: Dict[Optional[str], List[int]], key: Optional[str], size: int):
+    """Add one file size to the [count, total, max, min] entry of a suffix key."""
+    entry = stats.get(key)
+    if entry is None:
+        stats[key] = [1, size, size, size]
+    else:
+        entry[0] += 1
+        entry[1] += size
+        if size > entry[2]:
+            entry[2] = size
+        if size < entry[3]:
+            entry[3] = size
+
+
+def merge_suffix_stats(stats: Dict[Optional[str], List[int]], other: Dict[Optional[str], List[int]]):
+    """Add the per-suffix statistics of another set of files to ``stats``."""
+    for key, (count, total, largest, smallest) in other.items():
+        entry = stats.get(key)
+        if entry is None:
+            stats[key] = [count, total, largest, smallest]
+        else:
+            entry[0] += count
+            entry[1] += total
+            if largest > entry[2]:
+                entry[2] = largest
+            if smallest < entry[3]:
+                entry[3] = smallest
+
+
+def suffix_stats(file_info: Dict[str, Any]) -> Dict[Optional[str], List[int]]:
+    """Return [count, total, max, min] of file sizes per suffix key.
+
+    Scans fill these in as they go; otherwise (e.g. after a watcher changed
+    file_info) they are rebuilt in a single pass and cached in file_info.
+    """
+    stats = file_info.get(SUFFIX_STATS_KEY)
+    if stats is None:
+        stats = {}
+        for path, size in file_info["file_sizes"].items():
+            add_suffix_stat(stats, suffix_key(path), size)
+        file_info[SUFFIX_STATS_KEY] = stats
+    return stats
+
+
+class _Unsupported(Exception):
+    pass
+
+
+class PlanNode:
+    def execute(self, file_info: Dict[str, Any]):
+        raise NotImplementedError
+
+
+class Constant(PlanNode):
+    def __init__(self, value):
+        self.value = value
+
+    def execute(self, file_info):
+        return self.value
+
+
+class Aggregate(PlanNode):
+    """sum/count/max/min of file sizes, optionally filtered by suffixes."""
+
+    def __init__(self, func: str, suffixes: Optional[FrozenSet[str]] = None):
+        self.func = func
+        self.suffixes = suffixes
+
+    def execute(self, file_info):
+        if self.suffixes is None and SUFFIX_STATS_KEY not in file_info:
+            # Unfiltered aggregates don't need the per-suffix statistics
+            sizes = file_info["file_sizes"]
+            if self.func == "count":
+                return len(sizes)
+            return {"sum": sum, "max": max, "min": min}[self.func](sizes.values())
+
+        stats = suffix_stats(file_info)
+        if self.suffixes is None:
+            entries = list(stats.values())
+        else:
+            entries = [stats[s] for s in self.suffixes if s in stats]
+
+        if self.func == "sum":
+            return sum(entry[1] for entry in entries)
+        if self.func == "count":
+            return sum(entry[0] for entry in entries)
+        if not entries:
+            raise ValueError(f"{self.func}() arg is an empty sequence")
+        if self.func == "max":
+            return max(entry[2] for entry in entries)
+        return min(entry[3] for entry in entries)
+
+
+class BinaryOp(PlanNode):
+    def __init__(self, op, left: PlanNode, right: PlanNode):
+        self.op = op
+        self.left = left
+        self.right = right
+
+    def execute(self, file_info):
+        return self.op(self.left.execute(file_info), self.right.execute(file_info))
+
+
+class IfAnyFiles(PlanNode):
+    """``body if file_info['file_sizes'] else orelse``"""
+
+    def __init__(self, body: PlanNode, orelse: PlanNode):
+        self.body = body
+        self.orelse = orelse
+
+    def execute(self, file_info):
+        if file_info["file_sizes"]:
+            return self.body.execute(file_info)
+        return self.orelse.execute(file_info)
+
+
+class Round(PlanNode):
+    def __init__(self, value: PlanNode, ndigits: Optional[int]):
+        self.value = value
+        self.ndigits = ndigits
+
+    def execute(self, file_info):
+        return round(self.value.execute(file_info), self.ndigits)
+
+
+@lru_cache(maxsize=256)
+def compile_plan(expression: str) -> Optional[PlanNode]:
+    """Compile a CALCULATE expression into a plan, or None if unsupported."""
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+        return _compile(tree.body)
+    except (SyntaxError, _Unsupported):
+        return None
+
+
+def _compile(node: ast.AST) -> PlanNode:
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return Constant(node.value)
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+        return BinaryOp(BINARY_OPERATORS[type(node.op)], _compile(node.left), _compile(node.right))
+    if isinstance(node, ast.IfExp) and _is_file_sizes(node.test):
+        return IfAnyFiles(_compile(node.body), _compile(node.orelse))
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and not node.keywords:
+        name = node.func.id
+        args = node.args
+        if name == "round" and len(args) in (1, 2):
+            ndigits = None
+            if len(args) == 2:
+                if not (isinstance(args[1], ast.Constant) and type(args[1].value) is int):
+                    raise _Unsupported()
+                ndigits = args[1].value
+            return Round(_compile(args[0]), ndigits)
+        if len(args) != 1:
+            raise _Unsupported()
+        if name == "len" and _is_file_sizes(args[0]):
+            return Aggregate("count")
+        if name in ("sum", "max", "min"):
+            return _compile_aggregate(name, args[0])
+    raise _Unsupported()
+
+
+def _compile_aggregate(func: str, arg: ast.AST) -> Aggregate:
+    # sum(file_info['file_sizes'].values())
+    if _is_method_call(arg, "values"):
+        return Aggregate(func)
+    if not isinstance(arg, ast.GeneratorExp) or len(arg.generators) != 1:
+        raise _Unsupported()
+
+    comp = arg.generators[0]
+    if comp.is_async or len(comp.ifs) > 1:
+        raise _Unsupported()
+
+    # Work out the name bound to the path and what each item contributes
+    path_name = size_name = None
+    if _is_method_call(comp.iter, "items") and isinstance(comp.target, ast.Tuple) \
+            and len(comp.target.elts) == 2 and all(isinstance(e, ast.Name) for e in comp.target.elts):
+        path_name, size_name = (e.id for e in comp.target.elts)
+    elif (_is_file_sizes(comp.iter) or _is_method_call(comp.iter, "keys")) and isinstance(comp.target, ast.Name):
+        path_name = comp.target.id
+    elif _is_method_call(comp.iter, "values") and isinstance(comp.target, ast.Name):
+        size_name = comp.target.id
+    else:
+        raise _Unsupported()
+
+    if isinstance(arg.elt, ast.Name) and size_name is not None and arg.elt.id == size_name \
+            and path_name != size_name:
+        aggregate = func
+    elif func == "sum" and isinstance(arg.elt, ast.Constant) and type(arg.elt.value) is int \
+            and arg.elt.value == 1:
+        aggregate = "count"
+    else:
+        raise _Unsupported()
+
+    suffixes = None
+    if comp.ifs:
+        if path_name is None:
+            raise _Unsupported()
+        suffixes = frozenset(_suffix_condition(comp.ifs[0], path_name))
+    return Aggregate(aggregate, suffixes)
+
+
+def _suffix_condition(node: ast.AST, path_name: str) -> List[str]:
+    """Return the suffixes of ``p.lower().endswith(...) or ...`` conditions."""
+    if isinstance(node, ast.BoolOp) and isinstance(node.op, ast.Or):
+        suffixes = []
+        for value in node.values:
+            suffixes.extend(_suffix_condition(value, path_name))
+        return suffixes
+
+    if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+            and node.func.attr == "endswith" and len(node.args) == 1 and not node.keywords):
+        raise _Unsupported()
+    lowered = node.func.value
+    if not (isinstance(lowered, ast.Call) and isinstance(lowered.func, ast.Attribute)
+            and lowered.func.attr == "lower" and not lowered.args and not lowered.keywords
+            and isinstance(lowered.func.value, ast.Name) and lowered.func.value.id == path_name):
+        raise _Unsupported()
+
+    arg = node.args[0]
+    values = arg.elts if isinstance(arg, ast.Tuple) else [arg]
+    suffixes = []
+    for value in values:
+        if not (isinstance(value, ast.Constant) and isinstance(value.value, str)
+                and _is_simple_suffix(value.value)):
+            raise _Unsupported()
+        suffixes.append(value.value)
+    return suffixes
+
+
+def _is_simple_suffix(suffix: str) -> bool:
+    """True for suffixes like '.png' whose matches can be grouped by suffix key."""
+    return (len(suffix) > 1 and suffix.startswith('.') and '.' not in suffix[1:]
+            and suffix == suffix.lower() and '/' not in suffix and os.sep not in suffix)
+
+
+def _is_file_sizes(node: ast.AST) -> bool:
+    return (isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name)
+            and node.value.id == "file_info" and isinstance(node.slice, ast.Constant)
+            and node.slice.value == "file_sizes")
+
+
+def _is_method_call(node: ast.AST, method: str) -> bool:
+    return (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+            and node.func.attr == method and _is_file_sizes(node.func.value)
+            and not node.args and not node.keywords)
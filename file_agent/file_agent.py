@@ -1,25 +1,228 @@
 #!/usr/bin/env python3
 import os
+import sys
 import argparse
+import contextvars
+import heapq
 import json
-from pathlib import Path
-from typing import Dict, List, Any
-import openai
-from openai import OpenAI
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from typing import Callable, Dict, List, Any, Optional, Tuple
 import builtins
+from agent_trace import Trace, trace_count, trace_phase
+from answer_cache import FINGERPRINT_KEY, AnswerCache, scan_fingerprint
+from dir_rollup import ROLLUP_KEY
+from expression_plan import SUFFIX_STATS_KEY, add_suffix_stat, compile_plan, merge_suffix_stats, suffix_key
+from local_query import DUPLICATE_PATTERN, LocalQueryEngine
+from prompt_context import DEFAULT_MAX_PROMPT_TOKENS, build_context, estimate_tokens
+from scan_filter import add_filter_arguments, filter_from_args
+from size_index import SIZE_INDEX_KEY, size_index
+from snapshot_diff import CHANGES_KEY, format_delta
 
-class FileSystemAgent:
-    def __init__(self, api_key: str):
-        """Initialize the agent with OpenAI API key."""
-        self.client = OpenAI(api_key=api_key)
-    
-    def scan_directory(self, root_path: str) -> Dict[str, Any]:
-        """Scan directory hierarchy and collect file information."""
-        root = Path(root_path)
-        if not root.exists():
-            raise ValueError(f"Directory '{root_path}' does not exist")
+# Directory listing is I/O bound, so use more threads than cores by default
+DEFAULT_SCAN_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+# Number of largest files kept, and of sorted sample paths shown in the summary
+DEFAULT_TOP_N = 10
+DEFAULT_SAMPLE_SIZE = 20
+# Subtrees per worker process in a sharded scan, so uneven subtrees still balance
+SHARDS_PER_PROCESS = 4
+# Number of questions answered at a time in batch mode (bounded by the LLM rate limit, not the CPU)
+DEFAULT_CONCURRENCY = 8
+# Persistent scan indexes and the answer cache live here
+DEFAULT_CACHE_DIR = os.path.join(
+    os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")), "file_agent")
+# Where agent_server listens by default, and where --server sends questions
+DEFAULT_SERVER_URL = "http://127.0.0.1:8765"
+# Duplicate groups found by duplicates.DuplicateFinder, once asked for
+DUPLICATES_KEY = "duplicates"
+# Entries computed lazily from file_info and cached in it; drop them when the scan data changes
+DERIVED_KEYS = (SUFFIX_STATS_KEY, FINGERPRINT_KEY, DUPLICATES_KEY, ROLLUP_KEY, SIZE_INDEX_KEY, CHANGES_KEY)
+# System prompt additions when the scan was compared with an older snapshot (--since)
+CHANGES_HELP = """
+For questions about what changed since the previous scan, use changes (sizes in bytes):
+- changes.added_files, changes.removed_files, changes.resized_files: numbers of files
+- changes.added_bytes, changes.removed_bytes, changes.net_bytes, changes.net_files: totals
+- changes.extension('.log') or changes.extension(['.jpg', '.png']): .added, .removed, .resized, .files, .bytes
+- changes.added(n), changes.removed(n): the largest added/removed files as (path, size)
+- changes.grown(n), changes.shrunk(n): the files that grew/shrank the most as (path, old size, new size)
+"""
+CHANGES_EXAMPLES = """- How much did the folder grow since the last scan: "CALCULATE: changes.net_bytes"
+- Growth of log files since the last scan: "CALCULATE: changes.extension('.log').bytes"
+- Files that grew the most: "CALCULATE: changes.grown(5)"
+"""
+# The lock guarding the file_info of the question being answered; released around LLM calls
+_scan_lock: contextvars.ContextVar = contextvars.ContextVar("scan_lock", default=None)
+
+
+def invalidate_derived(file_info: Dict[str, Any]):
+    """Drop cached entries derived from file_info after it was modified."""
+    for key in DERIVED_KEYS:
+        file_info.pop(key, None)
+
+
+def _file_extension(name: str) -> str:
+    """Return the lowercase extension of a file name (same rules as Path.suffix)."""
+    i = name.rfind('.')
+    if 0 < i < len(name) - 1:
+        return name[i:].lower()
+    return "no_extension"
+
+
+def _list_directory(path: str, prefix: str,
+                    pruner=None) -> Tuple[List[Tuple[str, str, Optional[int]]], List[str], List[Tuple[str, str]]]:
+    """List a single directory using the cached DirEntry data from os.scandir.
+    
+    Returns the files as (relative path, extension, size) tuples, the relative
+    paths of the subdirectories, and the (path, prefix) pairs to descend into.
+    Symlinked directories are counted but not followed, like Path.rglob.
+    With a ``pruner`` (see scan_filter.ScanPruner) excluded entries are left
+    out and excluded subdirectories are not descended into.
+    """
+    if pruner is not None:
+        return pruner.list_directory(path, prefix)
+    
+    files = []
+    directories = []
+    subdirs = []
+    
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file():
+                        # Get file size (None when the stat call fails)
+                        try:
+                            size = entry.stat().st_size
+                        except (OSError, PermissionError):
+                            size = None
+                        files.append((prefix + entry.name, _file_extension(entry.name), size))
+                    
+                    elif entry.is_dir():
+                        rel_path = prefix + entry.name
+                        directories.append(rel_path)
+                        if not entry.is_symlink():
+                            subdirs.append((entry.path, rel_path + os.sep))
+                except OSError:
+                    continue
+    
+    except PermissionError as e:
+        print(f"Warning: Permission denied accessing some files: {e}", file=sys.stderr)
+    except OSError:
+        pass
+    
+    return files, directories, subdirs
+
+
+def _keep_smallest(sample: List[str], candidates: List[str], k: int) -> List[str]:
+    """Return the k smallest items of a sorted sample plus new candidates, sorted."""
+    if len(sample) >= k:
+        bound = sample[-1]
+        candidates = [c for c in candidates if c < bound]
+        if not candidates:
+            return sample
+    return heapq.nsmallest(k, sample + candidates)
+
+
+class StreamingAggregates:
+    """Aggregates that are kept up to date while a scan streams in.
+    
+    Tracks the top-N largest files in a bounded min-heap, the first k paths in
+    sorted order for the summary samples, and [count, total, max, min] of the
+    file sizes per extension, which give both the byte totals per extension
+    and the per-suffix statistics used by CALCULATE query plans, so nothing
+    has to be sorted or re-scanned after the walk.
+    Ties between equally large files are broken by path, which makes the
+    result independent of the order in which directories were listed.
+    """
+    
+    def __init__(self, top_n: int = DEFAULT_TOP_N, sample_size: int = DEFAULT_SAMPLE_SIZE):
+        self.top_n = top_n
+        self.sample_size = sample_size
+        self.largest: List[Tuple[int, str]] = []
+        self.file_sample: List[str] = []
+        self.directory_sample: List[str] = []
+        self.extension_stats: Dict[str, List[int]] = {}
+        # Extensions that are not their files' suffix key, and the suffix stats of those files
+        self._path_keyed = {"no_extension"}
+        self._path_suffix_stats: Dict[Optional[str], List[int]] = {}
+    
+    def add_listing(self, files: List[Tuple[str, str, Optional[int]]], directories: List[str]):
+        """Add the files and subdirectories found in one directory."""
+        extension_stats = self.extension_stats
+        path_keyed = self._path_keyed
+        largest = self.largest
+        top_n = self.top_n
+        # Only files at least as large as the smallest kept one need a heap comparison
+        floor = largest[0][0] if len(largest) >= top_n else -1
+        for rel_path, extension, size in files:
+            if size is None:
+                continue
+            entry = extension_stats.get(extension)
+            if entry is None:
+                extension_stats[extension] = [1, size, size, size]
+                # An ASCII extension is the suffix key; anything else is derived from the path
+                if not extension.isascii():
+                    path_keyed.add(extension)
+            else:
+                entry[0] += 1
+                entry[1] += size
+                if size > entry[2]:
+                    entry[2] = size
+                elif size < entry[3]:
+                    entry[3] = size
+            if extension in path_keyed:
+                add_suffix_stat(self._path_suffix_stats, suffix_key(rel_path), size)
+            if size >= floor:
+                item = (size, rel_path)
+                if len(largest) < top_n:
+                    heapq.heappush(largest, item)
+                elif item > largest[0]:
+                    heapq.heapreplace(largest, item)
+                floor = largest[0][0] if len(largest) >= top_n else -1
         
-        file_info = {
+        if files:
+            self.file_sample = _keep_smallest(self.file_sample, [f[0] for f in files], self.sample_size)
+        if directories:
+            self.directory_sample = _keep_smallest(self.directory_sample, directories, self.sample_size)
+    
+    def merge(self, other: "StreamingAggregates"):
+        """Fold in the aggregates of a scan of a disjoint part of the tree."""
+        merge_suffix_stats(self.extension_stats, other.extension_stats)
+        merge_suffix_stats(self._path_suffix_stats, other._path_suffix_stats)
+        self._path_keyed |= other._path_keyed
+        self.largest = heapq.nlargest(self.top_n, self.largest + other.largest)
+        heapq.heapify(self.largest)
+        self.file_sample = _keep_smallest(self.file_sample, other.file_sample, self.sample_size)
+        self.directory_sample = _keep_smallest(self.directory_sample, other.directory_sample, self.sample_size)
+    
+    def suffix_stats(self) -> Dict[Optional[str], List[int]]:
+        """Return the per-suffix statistics (see expression_plan.suffix_stats)."""
+        stats = {extension: list(entry) for extension, entry in self.extension_stats.items()
+                 if extension not in self._path_keyed}
+        merge_suffix_stats(stats, self._path_suffix_stats)
+        return stats
+    
+    def largest_files(self) -> List[Tuple[str, int]]:
+        """Return the largest files as (path, size), largest first."""
+        return [(path, size) for size, path in sorted(self.largest, key=lambda x: (-x[0], x[1]))]
+    
+    def fill(self, file_info: Dict[str, Any]):
+        """Store the aggregates in a file_info dictionary."""
+        file_info["largest_files"] = self.largest_files()
+        file_info["file_sample"] = self.file_sample
+        file_info["directory_sample"] = self.directory_sample
+        file_info["extension_sizes"] = {extension: entry[1] for extension, entry in self.extension_stats.items()}
+        file_info[SUFFIX_STATS_KEY] = self.suffix_stats()
+
+
+class ScanAccumulator:
+    """Collect directory listings into the file_info dictionary."""
+    
+    def __init__(self, top_n: int = DEFAULT_TOP_N, sample_size: int = DEFAULT_SAMPLE_SIZE):
+        self.aggregates = StreamingAggregates(top_n, sample_size)
+        self.file_info = {
             "total_files": 0,
             "total_directories": 0,
             "file_types": {},
@@ -28,65 +231,361 @@ class FileSystemAgent:
             "largest_files": [],
             "file_list": []
         }
+    
+    def add_listing(self, files: List[Tuple[str, str, Optional[int]]], directories: List[str]):
+        """Add the files and subdirectories found in one directory."""
+        file_info = self.file_info
+        file_types = file_info["file_types"]
+        file_sizes = file_info["file_sizes"]
+        file_list = file_info["file_list"]
         
-        try:
-            for item in root.rglob("*"):
-                if item.is_file():
-                    file_info["total_files"] += 1
-                    
-                    # Get file extension
-                    extension = item.suffix.lower() or "no_extension"
-                    file_info["file_types"][extension] = file_info["file_types"].get(extension, 0) + 1
-                    
-                    # Get file size
-                    try:
-                        size = item.stat().st_size
-                        file_info["file_sizes"][str(item.relative_to(root))] = size
-                        file_info["largest_files"].append((str(item.relative_to(root)), size))
-                    except (OSError, PermissionError):
-                        pass
-                    
-                    # Add to file list
-                    file_info["file_list"].append(str(item.relative_to(root)))
-                
-                elif item.is_dir():
-                    file_info["total_directories"] += 1
-                    file_info["directory_structure"].append(str(item.relative_to(root)))
-        
-        except PermissionError as e:
-            print(f"Warning: Permission denied accessing some files: {e}")
+        for rel_path, extension, size in files:
+            file_types[extension] = file_types.get(extension, 0) + 1
+            if size is not None:
+                file_sizes[rel_path] = size
+            file_list.append(rel_path)
         
-        # Sort largest files by size (descending)
-        file_info["largest_files"].sort(key=lambda x: x[1], reverse=True)
-        file_info["largest_files"] = file_info["largest_files"][:10]  # Keep top 10
+        file_info["total_files"] += len(files)
+        file_info["total_directories"] += len(directories)
+        file_info["directory_structure"].extend(directories)
+        self.aggregates.add_listing(files, directories)
+    
+    def merge(self, other: "ScanAccumulator"):
+        """Add the results of another accumulator that scanned a disjoint subtree."""
+        file_info = self.file_info
+        other_info = other.file_info
+        file_types = file_info["file_types"]
+        for extension, count in other_info["file_types"].items():
+            file_types[extension] = file_types.get(extension, 0) + count
+        file_info["file_sizes"].update(other_info["file_sizes"])
+        file_info["file_list"].extend(other_info["file_list"])
+        file_info["total_files"] += other_info["total_files"]
+        file_info["total_directories"] += other_info["total_directories"]
+        file_info["directory_structure"].extend(other_info["directory_structure"])
+        self.aggregates.merge(other.aggregates)
+    
+    def counts(self) -> Tuple[int, int]:
+        """Return the number of files and directories added so far."""
+        return self.file_info["total_files"], self.file_info["total_directories"]
+    
+    def result(self) -> Dict[str, Any]:
+        """Return the finished file_info dictionary."""
+        self.aggregates.fill(self.file_info)
+        return self.file_info
+
+
+class _ProgressAccumulator:
+    """Wrap an accumulator and report running file and directory counts."""
+    
+    def __init__(self, accumulator, progress: Callable[[int, int], None]):
+        self.accumulator = accumulator
+        self.aggregates = accumulator.aggregates
+        self.progress = progress
+        self.files = 0
+        self.directories = 0
+    
+    def add_listing(self, files: List[Tuple[str, str, Optional[int]]], directories: List[str]):
+        self.accumulator.add_listing(files, directories)
+        self.files += len(files)
+        self.directories += len(directories)
+        self.progress(self.files, self.directories)
+    
+    def merge(self, other):
+        self.accumulator.merge(other)
+        files, directories = other.counts()
+        self.files += files
+        self.directories += directories
+        self.progress(self.files, self.directories)
+    
+    def counts(self) -> Tuple[int, int]:
+        return self.accumulator.counts()
+    
+    def result(self) -> Dict[str, Any]:
+        return self.accumulator.result()
+
+
+def _walk(accumulator, path: str, prefix: str, pruner=None):
+    """List a directory tree depth-first in the calling thread."""
+    pending = [(path, prefix)]
+    while pending:
+        path, prefix = pending.pop()
+        files, directories, subdirs = _list_directory(path, prefix, pruner)
+        accumulator.add_listing(files, directories)
+        pending.extend(reversed(subdirs))
+
+
+def _scan_shard(path: str, prefix: str, compact: bool, top_n: int, sample_size: int, pruner=None):
+    """Scan one subtree in a worker process and return its accumulator for merging.
+    
+    With a ``pruner`` its counters for the subtree are returned alongside.
+    """
+    accumulator = _new_accumulator(compact, top_n, sample_size)
+    _walk(accumulator, path, prefix, pruner)
+    return accumulator, pruner.stats if pruner is not None else None
+
+
+def _new_accumulator(compact: bool = False, top_n: int = DEFAULT_TOP_N,
+                     sample_size: int = DEFAULT_SAMPLE_SIZE,
+                     progress: Optional[Callable[[int, int], None]] = None):
+    """Create the accumulator for a scan, optionally using columnar storage.
+    
+    ``progress`` is called with the number of files and directories found so
+    far after every directory listing.
+    """
+    if compact:
+        from compact_store import CompactAccumulator
+        accumulator = CompactAccumulator(top_n, sample_size)
+    else:
+        accumulator = ScanAccumulator(top_n, sample_size)
+    if progress is not None:
+        accumulator = _ProgressAccumulator(accumulator, progress)
+    return accumulator
+
+
+class FileSystemAgent:
+    def __init__(self, api_key: str, top_n: int = DEFAULT_TOP_N, sample_size: int = DEFAULT_SAMPLE_SIZE,
+                 local_answers: bool = True, answer_cache: bool = True, cache_dir: Optional[str] = None,
+                 max_prompt_tokens: int = DEFAULT_MAX_PROMPT_TOKENS):
+        """Initialize the agent with OpenAI API key.
         
+        ``top_n`` is the number of largest files kept by a scan and
+        ``sample_size`` the number of sorted paths sampled for the summary.
+        With ``local_answers`` common questions are answered from file_info
+        by LocalQueryEngine and only the rest are sent to the LLM.
+        With ``answer_cache`` the expressions the LLM returns are remembered
+        per question in ``cache_dir`` (see answer_cache.AnswerCache), which
+        also holds the file hashes of find_duplicates.
+        ``max_prompt_tokens`` bounds the scan context sent with a question
+        (see prompt_context.build_context); ``llm_stats`` counts the calls
+        made and the prompt size of each.
+        The OpenAI client is only created (and openai imported) on the first
+        LLM call, so scans, summaries and local answers start fast.
+        """
+        self.api_key = api_key
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.top_n = top_n
+        self.sample_size = sample_size
+        self.local_engine = LocalQueryEngine(self.format_size) if local_answers else None
+        self.cache_dir = cache_dir
+        self.answer_cache = None
+        if answer_cache:
+            self.answer_cache = AnswerCache(os.path.join(cache_dir or DEFAULT_CACHE_DIR, "answers.json"))
+        self.max_prompt_tokens = max_prompt_tokens
+        self.llm_stats = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_time": 0.0,
+                          "last_prompt_tokens": 0}
+        self._stats_lock = threading.Lock()
+    
+    @property
+    def client(self):
+        """The OpenAI client, created on first use."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from openai import OpenAI
+                    self._client = OpenAI(api_key=self.api_key)
+        return self._client
+    
+    @client.setter
+    def client(self, client):
+        self._client = client
+    
+    def scan_directory(self, root_path: str, workers: Optional[int] = None,
+                       use_index: bool = False, cache_dir: Optional[str] = None,
+                       compact: bool = False,
+                       progress: Optional[Callable[[int, int], None]] = None,
+                       processes: int = 1, scan_filter=None, snapshot: Optional[str] = None) -> Dict[str, Any]:
+        """Scan directory hierarchy and collect file information.
+
+        Directories are listed with os.scandir and their subdirectories are
+        spread across a bounded pool of ``workers`` threads (1 scans inline).
+        With ``use_index`` the scan goes through the persistent index in
+        ``cache_dir`` and only re-lists directories whose mtime changed.
+        With ``compact`` the results are kept in columnar storage (see
+        compact_store) and the path-keyed entries are read-only views.
+        ``progress(files, directories)`` is called from the scanning thread
+        with the running counts after every directory listing.
+        With ``processes`` > 1 subtrees are scanned in that many worker
+        processes and merged, which avoids the GIL on the per-entry work
+        (ignored with ``use_index``).
+        A ``scan_filter`` (see scan_filter.ScanFilter) prunes excluded
+        subtrees before they are listed; filtered scans bypass the index.
+        With ``snapshot`` the results are also written to that binary snapshot
+        file, which other processes can map with scan_snapshot.load_snapshot.
+        """
+        with trace_phase("scan"):
+            file_info = self._scan_directory(root_path, workers, use_index, cache_dir, compact, progress, processes,
+                                             scan_filter)
+        trace_count("files_scanned", file_info["total_files"])
+        trace_count("directories_scanned", file_info["total_directories"])
+        if snapshot is not None:
+            from scan_snapshot import write_snapshot
+            with trace_phase("snapshot"):
+                write_snapshot(file_info, snapshot, root_path)
         return file_info
     
-    def create_summary(self, file_info: Dict[str, Any], root_path: str) -> str:
-        """Create a text summary of the file system information."""
-        summary = f"File System Analysis for: {root_path}\n"
-        summary += "=" * 50 + "\n\n"
+    def _scan_directory(self, root_path: str, workers: Optional[int], use_index: bool, cache_dir: Optional[str],
+                        compact: bool, progress: Optional[Callable[[int, int], None]],
+                        processes: int, scan_filter=None) -> Dict[str, Any]:
+        root = os.path.normpath(root_path)
+        if not os.path.exists(root):
+            raise ValueError(f"Directory '{root_path}' does not exist")
         
-        summary += f"Total Files: {file_info['total_files']}\n"
-        summary += f"Total Directories: {file_info['total_directories']}\n\n"
+        pruner = None
+        if scan_filter is not None and scan_filter.active:
+            if use_index:
+                # The index stores complete listings, so a filtered scan would poison it
+                print("Warning: scan filters bypass the persistent index", file=sys.stderr)
+                use_index = False
+            pruner = scan_filter.start(root)
         
-        summary += "File Types:\n"
-        for ext, count in sorted(file_info['file_types'].items()):
-            summary += f"  {ext}: {count} files\n"
+        if use_index:
+            from scan_index import ScanIndex
+            return ScanIndex(root_path, cache_dir).scan(workers, compact=compact, top_n=self.top_n,
+                                                        sample_size=self.sample_size, progress=progress)
         
-        summary += f"\nDirectory Structure (first 20):\n"
-        for dir_path in sorted(file_info['directory_structure'])[:20]:
-            summary += f"  {dir_path}\n"
+        if workers is None:
+            workers = DEFAULT_SCAN_WORKERS
         
-        if len(file_info['largest_files']) > 0:
-            summary += f"\nLargest Files:\n"
-            for file_path, size in file_info['largest_files'][:5]:
-                summary += f"  {file_path}: {self.format_size(size)}\n"
+        accumulator = _new_accumulator(compact, self.top_n, self.sample_size, progress)
         
-        summary += f"\nSample Files (first 20):\n"
-        for file_path in sorted(file_info['file_list'])[:20]:
-            summary += f"  {file_path}\n"
+        if processes > 1:
+            self._scan_sharded(accumulator, root, processes, compact, pruner)
+        elif workers <= 1:
+            _walk(accumulator, root, "", pruner)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(_list_directory, root, "", pruner)}
+                while futures:
+                    done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        files, directories, subdirs = future.result()
+                        accumulator.add_listing(files, directories)
+                        for path, prefix in subdirs:
+                            futures.add(pool.submit(_list_directory, path, prefix, pruner))
         
+        if pruner is not None:
+            for name, value in pruner.stats.items():
+                trace_count(name, value)
+        return accumulator.result()
+    
+    def _scan_sharded(self, accumulator, root_path: str, processes: int, compact: bool, pruner=None):
+        """Scan subtrees in a pool of processes and merge their results.
+        
+        The top of the tree is listed breadth-first until there are a few
+        shards per process, so one huge top-level folder still gets split.
+        Each shard gets a copy of the pruner, including the ignore files
+        found above it.
+        """
+        shards = [(root_path, "")]
+        while shards and len(shards) < processes * SHARDS_PER_PROCESS:
+            path, prefix = shards.pop(0)
+            files, directories, subdirs = _list_directory(path, prefix, pruner)
+            accumulator.add_listing(files, directories)
+            shards.extend(subdirs)
+        
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [pool.submit(_scan_shard, path, prefix, compact, self.top_n, self.sample_size, pruner)
+                       for path, prefix in shards]
+            shard_stats = []
+            for future in as_completed(futures):
+                shard, stats = future.result()
+                accumulator.merge(shard)
+                shard_stats.append(stats)
+        
+        if pruner is not None:
+            # Each copy started from the counters of the top listing
+            baseline = dict(pruner.stats)
+            for stats in shard_stats:
+                for name, value in stats.items():
+                    pruner.stats[name] += value - baseline[name]
+    
+    def find_duplicates(self, file_info: Dict[str, Any], root_path: str,
+                        workers: Optional[int] = None, lock=None) -> Dict[str, Any]:
+        """Find groups of identical files in a scan and keep them in file_info.
+        
+        See duplicates.DuplicateFinder; hashes are cached in ``cache_dir``.
+        With ``lock`` (as for answer_question) only the file sizes are read
+        while holding it and files are hashed without it; the result is kept
+        if the scan did not change in the meantime.
+        """
+        from duplicates import DuplicateFinder
+        if lock is None:
+            duplicates = file_info.get(DUPLICATES_KEY)
+            if duplicates is None:
+                with trace_phase("duplicates"):
+                    duplicates = DuplicateFinder(root_path, self.cache_dir).find(file_info, workers)
+                file_info[DUPLICATES_KEY] = duplicates
+            return duplicates
+        
+        with lock:
+            duplicates = file_info.get(DUPLICATES_KEY)
+            if duplicates is not None:
+                return duplicates
+            fingerprint = scan_fingerprint(file_info)
+            sizes = {"file_sizes": dict(file_info["file_sizes"])}
+        with trace_phase("duplicates"):
+            duplicates = DuplicateFinder(root_path, self.cache_dir).find(sizes, workers)
+        with lock:
+            if scan_fingerprint(file_info) == fingerprint:
+                file_info[DUPLICATES_KEY] = duplicates
+        return duplicates
+    
+    def find_changes(self, file_info: Dict[str, Any], since: str, current: Optional[str] = None):
+        """Compare a scan with an older snapshot and keep the changes in file_info.
+        
+        ``current`` is a snapshot of this scan when one was already written;
+        otherwise the scan is written to a temporary one, so both sides are
+        sorted snapshots that snapshot_diff.diff_snapshots merges in one pass.
+        """
+        from scan_snapshot import Snapshot, write_snapshot
+        from snapshot_diff import diff_snapshots
+        with trace_phase("diff"), tempfile.TemporaryDirectory() as tmp:
+            if current is None:
+                current = write_snapshot(file_info, os.path.join(tmp, "current.snap"))
+            with Snapshot(since) as old, Snapshot(current) as new:
+                changes = diff_snapshots(old, new, self.top_n)
+        trace_count("files_changed", changes.added_files + changes.removed_files + changes.resized_files)
+        file_info[CHANGES_KEY] = changes
+        return changes
+    
+    def create_summary(self, file_info: Dict[str, Any], root_path: str) -> str:
+        """Create a text summary of the file system information."""
+        with trace_phase("create_summary"):
+            summary = f"File System Analysis for: {root_path}\n"
+            summary += "=" * 50 + "\n\n"
+            
+            summary += f"Total Files: {file_info['total_files']}\n"
+            summary += f"Total Directories: {file_info['total_directories']}\n\n"
+            
+            summary += "File Types:\n"
+            for ext, count in sorted(file_info['file_types'].items()):
+                summary += f"  {ext}: {count} files\n"
+            
+            directory_sample = file_info.get('directory_sample')
+            if directory_sample is None:
+                directory_sample = heapq.nsmallest(self.sample_size, file_info['directory_structure'])
+            summary += f"\nDirectory Structure (first {self.sample_size}):\n"
+            for dir_path in directory_sample[:self.sample_size]:
+                summary += f"  {dir_path}\n"
+            
+            if len(file_info['largest_files']) > 0:
+                summary += f"\nLargest Files:\n"
+                for file_path, size in file_info['largest_files'][:5]:
+                    summary += f"  {file_path}: {self.format_size(size)}\n"
+            
+            file_sample = file_info.get('file_sample')
+            if file_sample is None:
+                file_sample = heapq.nsmallest(self.sample_size, file_info['file_list'])
+            summary += f"\nSample Files (first {self.sample_size}):\n"
+            for file_path in file_sample[:self.sample_size]:
+                summary += f"  {file_path}\n"
+            
+            changes = file_info.get(CHANGES_KEY)
+            if changes is not None:
+                summary += "\n" + changes.describe(self.format_size) + "\n"
+            
         return summary
     
     def format_size(self, size_bytes: int) -> str:
@@ -97,10 +596,54 @@ class FileSystemAgent:
             size_bytes /= 1024.0
         return f"{size_bytes:.1f} TB"
     
-    def answer_question(self, question: str, file_info: Dict[str, Any], root_path: str) -> str:
-        """Use OpenAI to answer questions about the file system."""
-        summary = self.create_summary(file_info, root_path)
+    def answer_question(self, question: str, file_info: Dict[str, Any], root_path: str, lock=None) -> str:
+        """Use OpenAI to answer questions about the file system.
+        
+        With ``lock`` (e.g. the lock of a scan_watch watcher updating
+        file_info), file_info is only used while holding it; the lock is
+        released during LLM calls, so a slow model call holds up neither
+        other questions nor watcher updates.
+        """
+        if lock is None:
+            return self._answer_question(question, file_info, root_path)
+        token = _scan_lock.set(lock)
+        try:
+            with lock:
+                return self._answer_question(question, file_info, root_path)
+        finally:
+            _scan_lock.reset(token)
+    
+    def _answer_question(self, question: str, file_info: Dict[str, Any], root_path: str) -> str:
+        # Duplicates need file contents, so they are only looked for when asked about
+        if DUPLICATE_PATTERN.search(question.lower()):
+            self.find_duplicates(file_info, root_path)
+        
+        if self.local_engine is not None:
+            with trace_phase("local_answer"):
+                local_answer = self.local_engine.answer(question, file_info)
+            if local_answer is not None:
+                trace_count("local_hits")
+                return self._format_local_answer(*local_answer)
+        
+        if self.answer_cache is not None:
+            cached_answer = self.answer_cache.get_expression(question)
+            if cached_answer is not None:
+                result = self._answer_from_cache(cached_answer, file_info)
+                if result is not None:
+                    trace_count("answer_cache_hits")
+                    return result
+                # Stored for a different tree or scan: forget it and ask the LLM afresh
+                trace_count("answer_cache_drops")
+                self.answer_cache.drop_expression(question)
+        
+        with trace_phase("build_context"):
+            context = build_context(file_info, root_path, self.max_prompt_tokens, self.format_size,
+                                    self.sample_size)
         
+        changes_help = changes_examples = ""
+        if CHANGES_KEY in file_info:
+            changes_help = CHANGES_HELP
+            changes_examples = CHANGES_EXAMPLES
         system_prompt = """You are a file system analysis assistant. You MUST follow these strict rules:
 
 CRITICAL RULES FOR CALCULATE EXPRESSIONS:
@@ -117,6 +660,14 @@ The file_info dictionary contains:
 - file_info['total_files']: total number of files
 - file_info['total_directories']: total number of directories
 
+For questions about size ranges, percentiles or the N largest/smallest files, use size_index
+(sizes in bytes, None for an open bound, extensions as '.py' or a list like ['.jpg', '.png']):
+- size_index.count_between(low, high, extensions=None): number of files with low <= size <= high
+- size_index.total_between(low, high, extensions=None): their total size in bytes
+- size_index.files_between(low, high, extensions=None, limit=None): their (path, size) pairs
+- size_index.percentile(p, extensions=None), size_index.median(extensions=None): a file size
+- size_index.largest(n, extensions=None), size_index.smallest(n, extensions=None): (path, size) pairs
+{changes_help}
 RESPONSE FORMAT:
 - For COUNTING files (how many): Answer directly with the number from file_info['file_types']
 - For CALCULATING sizes (how much space): Start with "CALCULATE:" followed by a SIMPLE Python expression
@@ -135,57 +686,154 @@ SAFE EXPRESSION PATTERNS (use these exact patterns):
 - CALCULATING image file sizes: "CALCULATE: sum(size for file, size in file_info['file_sizes'].items() if file.lower().endswith('.png') or file.lower().endswith('.jpg') or file.lower().endswith('.jpeg') or file.lower().endswith('.gif') or file.lower().endswith('.bmp') or file.lower().endswith('.svg') or file.lower().endswith('.webp') or file.lower().endswith('.tiff'))"
 - CALCULATING Python file sizes: "CALCULATE: sum(size for file, size in file_info['file_sizes'].items() if file.lower().endswith('.py'))"
 - Average size: "CALCULATE: sum(file_info['file_sizes'].values()) / len(file_info['file_sizes']) if file_info['file_sizes'] else 0"
-
+- Files between 10 MB and 1 GB: "CALCULATE: size_index.count_between(10 * 1024 * 1024, 1024 * 1024 * 1024)"
+- 90th percentile of log file sizes: "CALCULATE: size_index.percentile(90, '.log')"
+{changes_examples}
 REMEMBER: Keep it SIMPLE. If in doubt, use the exact patterns above.
-"""
+""".format(changes_help=changes_help, changes_examples=changes_examples)
         
         user_prompt = f"""Here is the file system information:
 
-{summary}
-
-Raw data for precise calculations:
-- File types: {json.dumps(file_info['file_types'], indent=2)}
-- Total files: {file_info['total_files']}
-- Total directories: {file_info['total_directories']}
-
+{context}
 Question: {question}"""
 
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=500,
-                temperature=0.1
-            )
-            
-            answer = response.choices[0].message.content.strip()
+            answer = self._chat([
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ], max_tokens=500, temperature=0.1, purpose="answer")
             
             # Check if the answer contains a calculation expression
             if answer.startswith("CALCULATE:"):
                 # Validate the expression before evaluating
-                if not self._validate_expression(answer):
+                with trace_phase("validate"):
+                    valid = self._validate_expression(answer)
+                if not valid:
                     # If validation fails, try to get a corrected expression
+                    trace_count("validation_failures")
                     corrected_answer = self._get_corrected_expression(question, answer)
                     if corrected_answer and corrected_answer.startswith("CALCULATE:"):
-                        return self._evaluate_calculation(corrected_answer, file_info)
+                        answer = corrected_answer
                     else:
                         return f"Error: Generated expression does not match safe patterns. Please try a simpler question."
                 
-                return self._evaluate_calculation(answer, file_info)
+                with trace_phase("evaluate"):
+                    result, used_answer = self._run_calculation(answer, file_info)
             else:
                 # Handle direct answers (for counting questions)
-                return self._handle_direct_answer(answer, file_info)
+                with trace_phase("evaluate"):
+                    result = self._handle_direct_answer(answer, file_info)
+                # Only expressions over file_info carry over to other scans, not literal numbers
+                used_answer = answer if "file_info" in answer and result.startswith("Result:") else None
             
-            return answer
+            if used_answer is not None and self.answer_cache is not None:
+                self.answer_cache.put_expression(question, used_answer)
+                self.answer_cache.put_result(used_answer, self._result_fingerprint(used_answer, file_info), result)
+            return result
         
         except Exception as e:
             return f"Error calling OpenAI API: {str(e)}"
     
+    def answer_questions(self, questions: List[str], file_info: Dict[str, Any], root_path: str,
+                         concurrency: int = DEFAULT_CONCURRENCY, lock=None) -> List[str]:
+        """Answer several questions about one scan, in input order.
+        
+        Up to ``concurrency`` questions are answered at a time, so their LLM
+        calls overlap instead of running back to back. ``lock`` is as for
+        answer_question.
+        """
+        if concurrency <= 1 or len(questions) <= 1:
+            return [self.answer_question(question, file_info, root_path, lock) for question in questions]
+        # Run each question in a copy of this context so an active Trace sees all of them
+        contexts = [contextvars.copy_context() for _ in questions]
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(lambda context, question: context.run(self.answer_question, question,
+                                                                       file_info, root_path, lock),
+                                 contexts, questions))
+    
+    def ask(self, question: str, file_info: Dict[str, Any], root_path: str, lock=None) -> Tuple[str, Trace]:
+        """Answer a question and return the answer with the Trace of its phases and counters."""
+        with Trace() as trace:
+            answer = self.answer_question(question, file_info, root_path, lock)
+        return answer, trace
+    
+    def _answer_from_cache(self, answer: str, file_info: Dict[str, Any]) -> Optional[str]:
+        """Answer with a cached LLM expression, reusing its result while the scan is unchanged.
+        
+        Returns None when the expression fails on this scan. It is not sent
+        back to the LLM for a simpler version; the question is asked afresh.
+        """
+        fingerprint = self._result_fingerprint(answer, file_info)
+        result = self.answer_cache.get_result(answer, fingerprint)
+        if result is None:
+            if answer.startswith("CALCULATE:"):
+                with trace_phase("evaluate"):
+                    result = self._run_calculation(answer, file_info, simplify=False)[0]
+            else:
+                result = self._handle_direct_answer(answer, file_info)
+            if not result.startswith("Result:"):
+                return None
+            self.answer_cache.put_result(answer, fingerprint, result)
+        return result
+    
+    def _result_fingerprint(self, answer: str, file_info: Dict[str, Any]) -> int:
+        """Fingerprint of the data an answer depends on: the scan, and the compared snapshots if it uses changes."""
+        fingerprint = scan_fingerprint(file_info)
+        changes = file_info.get(CHANGES_KEY)
+        if changes is not None and 'changes' in answer:
+            fingerprint = hash((fingerprint, changes.key()))
+        return fingerprint
+    
+    def _chat(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float,
+              purpose: str = "answer") -> str:
+        """Send one chat completion request and record its prompt size and latency."""
+        # The request does not touch file_info, so the scan lock is not held while waiting for the model
+        lock = _scan_lock.get()
+        if lock is not None:
+            lock.release()
+        start = time.perf_counter()
+        try:
+            with trace_phase(f"llm.{purpose}"):
+                response = self.client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature
+                )
+        finally:
+            if lock is not None:
+                lock.acquire()
+        elapsed = time.perf_counter() - start
+        
+        # Prefer the token counts reported by the API and fall back to an estimate
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        if prompt_tokens is None:
+            prompt_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+        with self._stats_lock:
+            self.llm_stats["calls"] += 1
+            self.llm_stats["prompt_tokens"] += prompt_tokens
+            self.llm_stats["completion_tokens"] += getattr(usage, "completion_tokens", None) or 0
+            self.llm_stats["total_time"] += elapsed
+            self.llm_stats["last_prompt_tokens"] = prompt_tokens
+        trace_count("llm_calls")
+        trace_count("prompt_tokens", prompt_tokens)
+        trace_count("completion_tokens", getattr(usage, "completion_tokens", None) or 0)
+        
+        return response.choices[0].message.content.strip()
+    
     def _evaluate_calculation(self, answer: str, file_info: Dict[str, Any]) -> str:
         """Evaluate a CALCULATE expression with robust error handling and retry logic."""
+        with trace_phase("evaluate"):
+            return self._run_calculation(answer, file_info)[0]
+    
+    def _run_calculation(self, answer: str, file_info: Dict[str, Any],
+                         simplify: bool = True) -> Tuple[str, Optional[str]]:
+        """Evaluate a CALCULATE answer and return (result, answer that worked or None).
+        
+        With ``simplify`` a failed expression is sent back to the LLM once for
+        a simpler one.
+        """
         # Extract the Python expression
         expression = answer[10:].strip()
         
@@ -212,9 +860,25 @@ Question: {question}"""
             'reversed': reversed
         }
         
+        # The size index is sorted once per scan, so only build it for expressions that use it
+        if 'size_index' in expression:
+            safe_dict['size_index'] = size_index(file_info)
+        if CHANGES_KEY in file_info:
+            safe_dict['changes'] = file_info[CHANGES_KEY]
+        
         # Try to fix common syntax issues
         expression = self._fix_common_syntax_issues(expression)
         
+        # Run supported expression shapes as a query plan over per-suffix aggregates
+        plan = compile_plan(expression)
+        if plan is not None:
+            try:
+                result = plan.execute(file_info)
+                trace_count("plan_evaluations")
+                return self._format_result(result), f"CALCULATE: {expression}"
+            except Exception:
+                pass  # eval reports the error and retries below
+        
         # Try to execute the expression
         for attempt in range(2):
             try:
@@ -224,36 +888,50 @@ Question: {question}"""
                 except NameError:
                     result = eval(expression, safe_dict, safe_dict)
                 
-                # Format the result appropriately
-                if isinstance(result, (int, float)):
-                    if result == 0:
-                        return f"Result: {result} (no matching files found)"
-                    elif result > 1024:
-                        # Likely a size in bytes, format it
-                        formatted_result = self.format_size(result)
-                        return f"Result: {formatted_result} ({result:,} bytes)"
-                    else:
-                        return f"Result: {result}"
-                else:
-                    return f"Result: {result}"
+                trace_count("eval_evaluations")
+                return self._format_result(result), f"CALCULATE: {expression}"
                     
             except Exception as calc_error:
-                if attempt == 0:
+                if attempt == 0 and simplify:
                     # First attempt failed, try to get a simpler expression from the LLM
-                    print(f"First attempt failed: {str(calc_error)}")
-                    print(f"Generated expression: {expression}")
-                    print("Trying to get a simpler expression...")
+                    # One write to stderr: answers on stdout stay clean and concurrent questions do not interleave
+                    print(f"First attempt failed: {str(calc_error)}\n"
+                          f"Generated expression: {expression}\n"
+                          "Trying to get a simpler expression...", file=sys.stderr)
                     
                     # Ask for a simpler expression
+                    trace_count("simplify_retries")
                     simple_expression = self._get_simpler_expression(expression, str(calc_error))
                     if simple_expression:
                         expression = simple_expression
                         continue
                 
                 # If we get here, both attempts failed
-                return f"Error evaluating calculation: {str(calc_error)}\nGenerated expression: {expression}\nPlease check the expression syntax."
+                return f"Error evaluating calculation: {str(calc_error)}\nGenerated expression: {expression}\nPlease check the expression syntax.", None
         
-        return f"Failed to evaluate expression after multiple attempts: {expression}"
+        return f"Failed to evaluate expression after multiple attempts: {expression}", None
+    
+    def _format_result(self, result: Any) -> str:
+        """Format the result of a calculation appropriately."""
+        if isinstance(result, (int, float)):
+            if result == 0:
+                return f"Result: {result} (no matching files found)"
+            elif result > 1024:
+                # Likely a size in bytes, format it
+                formatted_result = self.format_size(result)
+                return f"Result: {formatted_result} ({result:,} bytes)"
+            else:
+                return f"Result: {result}"
+        else:
+            return f"Result: {result}"
+    
+    def _format_local_answer(self, kind: str, value: Any) -> str:
+        """Format a (kind, value) answer from the local query engine."""
+        if kind == "size":
+            return self._format_result(value)
+        if kind == "text":
+            return f"Result:\n{value}"
+        return f"Result: {value}"
     
     def _fix_common_syntax_issues(self, expression: str) -> str:
         """Fix common syntax issues in generated expressions."""
@@ -276,23 +954,16 @@ Question: {question}"""
     def _get_simpler_expression(self, failed_expression: str, error_msg: str) -> str:
         """Ask the LLM to generate a simpler expression when the first one fails."""
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a Python expert. Generate simple, working Python expressions."},
-                    {"role": "user", "content": f"""The following expression failed with error: {error_msg}
+            return self._chat([
+                {"role": "system", "content": "You are a Python expert. Generate simple, working Python expressions."},
+                {"role": "user", "content": f"""The following expression failed with error: {error_msg}
 
 Failed expression: {failed_expression}
 
 Please generate a simpler, working Python expression that accomplishes the same goal. 
 Use only basic Python syntax, avoid complex nested expressions, and ensure proper parentheses matching.
 Focus on readability and correctness."""}
-                ],
-                max_tokens=200,
-                temperature=0.1
-            )
-            
-            return response.choices[0].message.content.strip()
+            ], max_tokens=200, temperature=0.1, purpose="simplify")
             
         except Exception:
             return None
@@ -312,12 +983,12 @@ Focus on readability and correctness."""}
         
         for pattern in forbidden_patterns:
             if pattern in expression:
-                print(f"Validation failed: Found forbidden pattern '{pattern}' in expression")
+                print(f"Validation failed: Found forbidden pattern '{pattern}' in expression", file=sys.stderr)
                 return False
         
         # Check for balanced parentheses
         if expression.count('(') != expression.count(')'):
-            print(f"Validation failed: Unbalanced parentheses in expression")
+            print("Validation failed: Unbalanced parentheses in expression", file=sys.stderr)
             return False
         
         # Check for basic safe patterns
@@ -325,12 +996,14 @@ Focus on readability and correctness."""}
             'sum(size for file, size in file_info[\'file_sizes\'].items() if',
             'sum(file_info[\'file_sizes\'].values())',
             'len(file_info[\'file_sizes\'])',
-            'file.lower().endswith('
+            'file.lower().endswith(',
+            'size_index.',
+            'changes.'
         ]
         
         has_safe_pattern = any(pattern in expression for pattern in safe_patterns)
         if not has_safe_pattern:
-            print(f"Validation failed: Expression does not contain safe patterns")
+            print("Validation failed: Expression does not contain safe patterns", file=sys.stderr)
             return False
         
         return True
@@ -338,10 +1011,8 @@ Focus on readability and correctness."""}
     def _get_corrected_expression(self, question: str, failed_answer: str) -> str:
         """Ask the LLM to generate a corrected expression using only safe patterns."""
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": """You are a Python expert. You MUST generate ONLY simple, safe Python expressions.
+            return self._chat([
+                {"role": "system", "content": """You are a Python expert. You MUST generate ONLY simple, safe Python expressions.
 
 CRITICAL: Use ONLY these exact patterns:
 - For image files: sum(size for file, size in file_info['file_sizes'].items() if file.lower().endswith('.png') or file.lower().endswith('.jpg') or file.lower().endswith('.jpeg') or file.lower().endswith('.gif') or file.lower().endswith('.bmp') or file.lower().endswith('.svg') or file.lower().endswith('.webp') or file.lower().endswith('.tiff'))
@@ -350,20 +1021,15 @@ CRITICAL: Use ONLY these exact patterns:
 
 NEVER use: any(), all(), filter(), map(), list comprehensions, or complex logic.
 ALWAYS start with "CALCULATE:" followed by the expression."""},
-                    {"role": "user", "content": f"""The previous expression failed validation: {failed_answer}
+                {"role": "user", "content": f"""The previous expression failed validation: {failed_answer}
 
 Question: {question}
 
 Please generate a CORRECTED expression using ONLY the safe patterns listed above. Start with "CALCULATE:" """}
-                ],
-                max_tokens=150,
-                temperature=0.0  # Use 0 temperature for maximum consistency
-            )
-            
-            return response.choices[0].message.content.strip()
+            ], max_tokens=150, temperature=0.0, purpose="correct")  # Use 0 temperature for maximum consistency
             
         except Exception as e:
-            print(f"Error getting corrected expression: {e}")
+            print(f"Error getting corrected expression: {e}", file=sys.stderr)
             return None
     
     def _handle_direct_answer(self, answer: str, file_info: Dict[str, Any]) -> str:
@@ -391,6 +1057,10 @@ Please generate a CORRECTED expression using ONLY the safe patterns listed above
                 'map': map,
                 'reversed': reversed
             }
+            if 'size_index' in answer:
+                safe_dict['size_index'] = size_index(file_info)
+            if CHANGES_KEY in file_info:
+                safe_dict['changes'] = file_info[CHANGES_KEY]
             
             # Try to evaluate the answer
             try:
@@ -404,37 +1074,208 @@ Please generate a CORRECTED expression using ONLY the safe patterns listed above
             # If evaluation fails, return the answer as-is
             return f"Answer: {answer}"
 
+def _read_questions(path: str) -> List[Dict[str, Any]]:
+    """Read questions from a file with one question or one JSON object per line.
+    
+    JSON lines must have a "question" field; their other fields are copied to
+    the output record.
+    """
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                record = json.loads(line)
+                if not isinstance(record.get("question"), str):
+                    raise ValueError(f"{path}:{line_number}: JSON line has no \"question\" field")
+            else:
+                record = {"question": line}
+            records.append(record)
+    return records
+
 def main():
     parser = argparse.ArgumentParser(description="File System Analysis Agent using OpenAI")
     parser.add_argument("folder", help="Path to the folder to analyze")
-    parser.add_argument("question", help="Question to ask about the folder")
+    parser.add_argument("question", nargs="?", help="Question to ask about the folder")
     parser.add_argument("--api-key", help="OpenAI API key (or set OPENAI_API_KEY env var)")
     parser.add_argument("--verbose", "-v", action="store_true", help="Show detailed file system summary")
+    parser.add_argument("--summary-only", action="store_true",
+                        help="Only scan and print the file system summary (no question, no API key, no openai import)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help=f"Number of threads used to scan directories (default: {DEFAULT_SCAN_WORKERS})")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="Scan subtrees in this many worker processes (for many cores and fast disks)")
+    parser.add_argument("--duplicates", action="store_true",
+                        help="Find duplicate files after the scan and report the space they waste")
+    parser.add_argument("--index", action="store_true",
+                        help="Use the persistent scan index and only re-list changed directories")
+    parser.add_argument("--cache-dir",
+                        help="Directory for the persistent scan index and answer cache (default: ~/.cache/file_agent)")
+    parser.add_argument("--reindex", action="store_true", help="Discard the stored index and rescan everything")
+    parser.add_argument("--compact", action="store_true",
+                        help="Keep scan results in compact columnar storage (for very large trees)")
+    parser.add_argument("--top-n", type=int, default=DEFAULT_TOP_N,
+                        help=f"Number of largest files to keep (default: {DEFAULT_TOP_N})")
+    parser.add_argument("--no-local", action="store_true",
+                        help="Send every question to the LLM instead of answering common ones locally")
+    parser.add_argument("--sample-size", type=int, default=DEFAULT_SAMPLE_SIZE,
+                        help=f"Number of sorted sample paths in the summary (default: {DEFAULT_SAMPLE_SIZE})")
+    parser.add_argument("--no-answer-cache", action="store_true",
+                        help="Always ask the LLM instead of reusing expressions from earlier answers")
+    parser.add_argument("--questions-file",
+                        help="Answer every question in this file (one per line, or JSON lines with a "
+                             "\"question\" field) after a single scan and write JSON lines")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Number of questions answered at a time with --questions-file (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--max-prompt-tokens", type=int, default=DEFAULT_MAX_PROMPT_TOKENS,
+                        help=f"Token budget for the scan context sent to the LLM (default: {DEFAULT_MAX_PROMPT_TOKENS})")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="Write the time spent per phase and the run's counters as JSON to PATH, "
+                             "or a cProfile dump if PATH ends in .prof")
+    parser.add_argument("--output", help="Write the --questions-file results to this file instead of stdout")
+    parser.add_argument("--server", nargs="?", const=DEFAULT_SERVER_URL, metavar="URL",
+                        help="Ask a running agent_server (default: %(const)s), which keeps scans warm; "
+                             "scan options are then the server's. Falls back to a local run if it is not running")
+    parser.add_argument("--snapshot", metavar="PATH",
+                        help="Also write the scan to this binary snapshot file, which later runs can --load-snapshot")
+    parser.add_argument("--load-snapshot", metavar="PATH",
+                        help="Answer from a snapshot written with --snapshot instead of scanning the folder; "
+                             "processes loading the same snapshot share one memory-mapped copy")
+    parser.add_argument("--history", action="store_true",
+                        help="Store this scan as a timestamped snapshot in the cache directory for later --since")
+    parser.add_argument("--since", metavar="SNAPSHOT",
+                        help="Report what changed since an older snapshot: a snapshot file, 'latest' for the "
+                             "newest one stored with --history, or the start of its timestamp (e.g. 2026-10-17)")
+    add_filter_arguments(parser.add_argument_group("scan filters"))
     
     args = parser.parse_args()
+    if args.summary_only:
+        if args.question is not None or args.questions_file is not None:
+            parser.error("--summary-only takes no question")
+    elif (args.question is None) == (args.questions_file is None):
+        parser.error("give either a question or --questions-file")
     
-    # Get API key
+    if args.server:
+        status = _run_remote(args)
+        if status is not None:
+            return status
+        print(f"No agent server at {args.server}, answering locally", file=sys.stderr)
+    
+    # Get API key (a summary never calls the LLM)
     api_key = args.api_key or os.getenv("OPENAI_API_KEY")
-    if not api_key:
+    if not api_key and not args.summary_only:
         print("Error: Please provide OpenAI API key via --api-key or OPENAI_API_KEY environment variable")
         return 1
     
+    trace = Trace()
+    profiler = None
+    if args.profile and args.profile.endswith(".prof"):
+        import cProfile
+        profiler = cProfile.Profile()
+    
+    with trace:
+        if profiler is not None:
+            profiler.enable()
+        try:
+            status = _run(args, api_key)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+    
+    if args.profile:
+        if profiler is not None:
+            profiler.dump_stats(args.profile)
+        else:
+            with open(args.profile, "w", encoding="utf-8") as f:
+                json.dump(trace.to_dict(), f, indent=2)
+        print(f"Profile written to {args.profile}", file=sys.stderr)
+    return status
+
+def _run(args: argparse.Namespace, api_key: str) -> int:
+    """Scan the folder and answer the question(s) given on the command line."""
     try:
         # Initialize agent
-        agent = FileSystemAgent(api_key)
+        agent = FileSystemAgent(api_key, top_n=args.top_n, sample_size=args.sample_size,
+                                local_answers=not args.no_local, answer_cache=not args.no_answer_cache,
+                                cache_dir=args.cache_dir, max_prompt_tokens=args.max_prompt_tokens)
         
-        # Scan directory
-        print(f"Scanning directory: {args.folder}")
-        file_info = agent.scan_directory(args.folder)
+        # Read the batch up front so a bad file fails before the scan
+        records = _read_questions(args.questions_file) if args.questions_file else None
         
-        if args.verbose:
+        # Batch results go to stdout, so report progress on stderr
+        log = sys.stderr if records is not None else sys.stdout
+        
+        if args.load_snapshot:
+            from scan_snapshot import Snapshot
+            with trace_phase("scan"):
+                snapshot = Snapshot(args.load_snapshot)
+                file_info = snapshot.file_info()
+            if snapshot.root is not None and snapshot.root != os.path.abspath(args.folder):
+                print(f"Warning: snapshot {args.load_snapshot} is of {snapshot.root}", file=sys.stderr)
+        else:
+            # Scan directory
+            print(f"Scanning directory: {args.folder}", file=log)
+            if args.reindex:
+                from scan_index import ScanIndex
+                ScanIndex(args.folder, args.cache_dir).clear()
+            file_info = agent.scan_directory(args.folder, workers=args.workers,
+                                             use_index=args.index or args.reindex, cache_dir=args.cache_dir,
+                                             compact=args.compact, processes=args.processes,
+                                             scan_filter=filter_from_args(args), snapshot=args.snapshot)
+        
+        if args.since or args.history:
+            from snapshot_diff import SnapshotStore
+            store = SnapshotStore(args.folder, args.cache_dir)
+            since = None
+            if args.since:
+                # Resolved before this scan is stored, so "latest" is the previous run
+                try:
+                    since = store.resolve(args.since)
+                except ValueError as e:
+                    if not args.history:
+                        raise
+                    print(f"Warning: {e}; storing this scan without comparing", file=sys.stderr)
+            current = store.save(file_info) if args.history else args.load_snapshot or args.snapshot
+            if since is not None:
+                changes = agent.find_changes(file_info, since, current)
+                print(f"Changes since {changes.old_label}: {changes.net_files:+,} files, "
+                      f"{format_delta(changes.net_bytes, agent.format_size)}", file=log)
+        
+        if args.duplicates:
+            duplicates = agent.find_duplicates(file_info, args.folder)
+            print(f"Duplicates: {duplicates['duplicate_files']} redundant copies in {len(duplicates['groups'])} "
+                  f"groups waste {agent.format_size(duplicates['wasted_bytes'])}", file=log)
+        
+        if args.summary_only:
             print("\n" + agent.create_summary(file_info, args.folder))
-            print("\n" + "="*50 + "\n")
+            return 0
+        
+        if args.verbose:
+            print("\n" + agent.create_summary(file_info, args.folder), file=log)
+            print("\n" + "="*50 + "\n", file=log)
+        
+        if records is not None:
+            answers = agent.answer_questions([record["question"] for record in records], file_info,
+                                             args.folder, concurrency=args.concurrency)
+            out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+            try:
+                for record, answer in zip(records, answers):
+                    out.write(json.dumps({**record, "answer": answer}) + "\n")
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+            return 0
         
         # Answer question
         print(f"Question: {args.question}")
         answer = agent.answer_question(args.question, file_info, args.folder)
         print(f"Answer: {answer}")
+        if args.verbose and agent.llm_stats["calls"]:
+            stats = agent.llm_stats
+            print(f"LLM: {stats['calls']} call(s), {stats['prompt_tokens']} prompt tokens, "
+                  f"{stats['completion_tokens']} completion tokens, {stats['total_time']:.2f}s")
         
     except Exception as e:
         print(f"Error: {str(e)}")
@@ -442,5 +1283,60 @@ def main():
     
     return 0
 
+def _request_server(url: str, endpoint: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """POST a JSON request to agent_server and return its JSON reply."""
+    import urllib.error
+    import urllib.request
+    request = urllib.request.Request(url.rstrip("/") + endpoint, data=json.dumps(payload).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        raise RuntimeError(json.load(e).get("error", str(e))) from None
+
+def _run_remote(args: argparse.Namespace) -> Optional[int]:
+    """Answer through a running agent_server; None if there is no server to talk to."""
+    import urllib.error
+    folder = os.path.abspath(args.folder)
+    try:
+        records = _read_questions(args.questions_file) if args.questions_file else None
+        
+        if args.verbose or args.summary_only:
+            summary = _request_server(args.server, "/summary", {"folder": folder})["summary"]
+            print("\n" + summary, file=sys.stderr if records is not None else sys.stdout)
+            if args.summary_only:
+                return 0
+        
+        if records is not None:
+            answers = _request_server(args.server, "/ask", {"folder": folder,
+                                                            "questions": [record["question"] for record in records]})
+            out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+            try:
+                for record, answer in zip(records, answers["answers"]):
+                    out.write(json.dumps({**record, "answer": answer}) + "\n")
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+            return 0
+        
+        reply = _request_server(args.server, "/ask", {"folder": folder, "question": args.question})
+        print(f"Question: {args.question}")
+        print(f"Answer: {reply['answer']}")
+        # The trace of the server's work; a cProfile dump of the server is not available here
+        if args.profile and not args.profile.endswith(".prof"):
+            with open(args.profile, "w", encoding="utf-8") as f:
+                json.dump(reply["trace"], f, indent=2)
+    except urllib.error.URLError as e:
+        if isinstance(e.reason, ConnectionRefusedError):
+            return None
+        print(f"Error: {e.reason}")
+        return 1
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return 1
+    
+    return 0
+
 if __name__ == "__main__":
     exit(main())
@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""Deterministic local answers for common file system questions.
+
+LocalQueryEngine recognizes counts, total and average sizes, largest-N and
+most-common-type questions about all files, specific extensions or extension
+groups (images, code, docs, ...) and answers them straight from file_info.
+Questions about a subtree ("under src/app", "in the logs folder") and about
+the heaviest folders are answered from the directory rollup, and questions
+about what changed since an older snapshot from the stored diff. A question is
+only classified when every word in it is understood, so anything more
+specific ("modified last week") falls back to the LLM.
+"""
+
+import heapq
+import os
+import re
+import threading
+import time
+from typing import Dict, Any, Callable, Iterable, Optional, Set, Tuple
+
+from dir_rollup import DirectoryStats, directory_rollup, normalize_directory
+from snapshot_diff import CHANGES_KEY, format_delta
+
+IMAGE_EXTENSIONS = ['.png', '.jpg', '.jpeg', '.gif', '.bmp', '.svg', '.webp', '.tiff']
+CODE_EXTENSIONS = ['.py', '.js', '.ts', '.tsx', '.jsx', '.java', '.c', '.h', '.cpp', '.hpp', '.cs',
+                   '.go', '.rs', '.rb', '.php', '.swift', '.kt', '.scala', '.sh', '.sql']
+DOC_EXTENSIONS = ['.md', '.txt', '.rst', '.pdf', '.doc', '.docx', '.odt', '.rtf']
+VIDEO_EXTENSIONS = ['.mp4', '.mov', '.avi', '.mkv', '.webm', '.wmv']
+AUDIO_EXTENSIONS = ['.mp3', '.wav', '.flac', '.aac', '.ogg', '.m4a']
+ARCHIVE_EXTENSIONS = ['.zip', '.tar', '.gz', '.bz2', '.xz', '.7z', '.rar']
+
+EXTENSION_GROUPS = {
+    'image': IMAGE_EXTENSIONS, 'images': IMAGE_EXTENSIONS, 'picture': IMAGE_EXTENSIONS,
+    'pictures': IMAGE_EXTENSIONS, 'photo': IMAGE_EXTENSIONS, 'photos': IMAGE_EXTENSIONS,
+    'code': CODE_EXTENSIONS, 'source': CODE_EXTENSIONS,
+    'doc': DOC_EXTENSIONS, 'docs': DOC_EXTENSIONS, 'document': DOC_EXTENSIONS,
+    'documents': DOC_EXTENSIONS, 'documentation': DOC_EXTENSIONS,
+    'video': VIDEO_EXTENSIONS, 'videos': VIDEO_EXTENSIONS,
+    'audio': AUDIO_EXTENSIONS, 'music': AUDIO_EXTENSIONS,
+    'archive': ARCHIVE_EXTENSIONS, 'archives': ARCHIVE_EXTENSIONS, 'compressed': ARCHIVE_EXTENSIONS,
+    'python': ['.py'], 'javascript': ['.js'], 'typescript': ['.ts', '.tsx'], 'java': ['.java'],
+    'markdown': ['.md'], 'text': ['.txt'], 'yaml': ['.yaml', '.yml'], 'html': ['.html', '.htm'],
+    'log': ['.log'], 'logs': ['.log'], 'jpeg': ['.jpg', '.jpeg'], 'jpg': ['.jpg', '.jpeg'],
+}
+
+# Words that may appear in a question without changing its meaning
+FILLER_WORDS = {
+    'what', 'whats', 'which', 'is', 'are', 'the', 'of', 'all', 'files', 'file', 'there', 'in', 'this',
+    'these', 'that', 'directory', 'folder', 'tree', 'here', 'do', 'does', 'i', 'we', 'have', 'a', 'an',
+    'my', 'our', 'and', 'or', 'by', 'me', 'show', 'list', 'give', 'tell', 'please', 'find', 'get',
+    'total', 'combined', 'overall', 'entire', 'whole', 'together', 'on', 'disk', 'bytes', 'storage',
+    'type', 'types', 'extension', 'extensions', 'with', 'format', 'formatted', 'current',
+}
+COUNT_PATTERN = re.compile(r"\b(how many|number of|count of|count)\b")
+SIZE_PATTERN = re.compile(r"\b(size|sizes|how much space|how much disk|space used|space taken|"
+                          r"space do|space does|how big|disk usage|take up|takes up|use up|uses up|"
+                          r"consume|consumed|occupy|occupied)\b")
+AVERAGE_PATTERN = re.compile(r"\b(average|mean|avg|typical)\b")
+LARGEST_PATTERN = re.compile(r"\b(largest|biggest|top)\b")
+COMMON_TYPES_PATTERN = re.compile(r"\b(most common|most frequent|most popular)\b")
+DUPLICATE_PATTERN = re.compile(r"\b(duplicates?|duplicated|identical|redundant)\b")
+WASTE_PATTERN = re.compile(r"\b(waste|wasted|wastes|wasting|reclaim|save|saved|free)\b")
+# "top 5 file types" ranks extensions by their file count, not files by size
+TYPES_PATTERN = re.compile(r"\b(types?|extensions?|formats?)\b")
+SINGULAR_TYPE_PATTERN = re.compile(r"\b(type|extension|format)\b")
+TYPE_COUNT_PATTERN = re.compile(r"\b(how many|number of|count of)\s+(file\s+)?(types|extensions|formats)\b")
+DEFAULT_TYPE_COUNT = 5
+DIRECTORY_COUNT_PATTERN = re.compile(r"\b(how many|number of|count of|count)\s+(sub)?(directories|folders|dirs)\b")
+INTENT_WORDS = {
+    'how', 'many', 'much', 'number', 'count', 'size', 'sizes', 'space', 'used', 'use', 'uses', 'taken',
+    'take', 'takes', 'up', 'big', 'usage', 'consume', 'consumed', 'occupy', 'occupied', 'average',
+    'mean', 'avg', 'typical', 'largest', 'biggest', 'top', 'most', 'common', 'frequent', 'popular',
+    'directories', 'folders', 'dirs', 'subdirectories', 'subfolders',
+}
+# Only understood in questions about duplicates ("how much space could be saved by removing copies")
+DUPLICATE_WORDS = {
+    'duplicate', 'duplicates', 'duplicated', 'identical', 'redundant', 'copies', 'copy', 'waste',
+    'wasted', 'wastes', 'wasting', 'reclaim', 'save', 'saved', 'free', 'could', 'can', 'be',
+    'removing', 'deleting', 'groups',
+}
+NUMBER_WORDS = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7,
+                'eight': 8, 'nine': 9, 'ten': 10, 'twenty': 20}
+# Dotted words (".tar.gz", "report.pdf") stay one token so they are not read as separate extensions
+TOKEN_PATTERN = re.compile(r"\.?[a-z0-9_+\-]+(?:\.[a-z0-9_+\-]+)*")
+# "in the logs folder" restricts the question to a subtree; unless that is a scanned directory, it is left to the LLM
+SCOPE_PATTERN = re.compile(r"\b(in|under|inside|within|below|from)\s+"
+                           r"(?!(the|this|that|my|our)\s+(directory|folder|tree)\b)")
+SCOPE_PATH_PATTERN = re.compile(r"\b(?:in|under|inside|within|below|from)\s+"
+                                r"(?!(?:the|this|that|my|our)\s+(?:directory|folder|tree)\b)"
+                                r"(?:(?:the|my|our)\s+)?(?P<path>[\w.\-/\\]+)"
+                                r"(?:\s+(?:sub)?(?:folder|directory|dir)\b)?", re.IGNORECASE)
+# "how big is the logs folder" (only a scope when "logs" is a scanned directory)
+NAMED_FOLDER_PATTERN = re.compile(r"\b(?:the|my|our)\s+(?P<path>[\w.\-/\\]+)\s+(?:sub)?(?:folder|directory|dir)\b",
+                                  re.IGNORECASE)
+# "this folder" is the scanned root, not a ranking of folders
+ROOT_FOLDER_PATTERN = re.compile(r"\b(the|this|that|current|whole|entire|my|our)\s+(directory|folder|tree)\b")
+FOLDER_PATTERN = re.compile(r"\b(sub)?(folders?|directory|directories|dirs?)\b")
+SINGULAR_FOLDER_PATTERN = re.compile(r"\b(sub)?(folder|directory|dir)\b")
+RANK_PATTERN = re.compile(r"\b(largest|biggest|heaviest|top|most)\b")
+RANK_BY_FILES_PATTERN = re.compile(r"\bmost\s+(\S+\s+)?files\b")
+# Only understood in questions that rank folders ("which subfolder holds the most files")
+FOLDER_WORDS = {
+    'heaviest', 'dir', 'subfolder', 'subdirectory', 'has', 'contain', 'contains', 'containing',
+    'hold', 'holds', 'weigh', 'weighs',
+}
+DEFAULT_FOLDER_COUNT = 5
+# Questions about the changes since an older snapshot ("what changed since the last scan")
+CHANGE_PATTERN = re.compile(r"\b(changed?|changes|since|new|added|removed|deleted|grew|grown|grow|growth|"
+                            r"shrank|shrunk|shrink)\b")
+ADDED_PATTERN = re.compile(r"\b(new|added)\b")
+REMOVED_PATTERN = re.compile(r"\b(removed|deleted)\b")
+GROWN_PATTERN = re.compile(r"\b(grew|grown|grow|growth)\b")
+SHRUNK_PATTERN = re.compile(r"\b(shrank|shrunk|shrink)\b")
+# Only understood in questions about changes
+CHANGE_WORDS = {
+    'change', 'changed', 'changes', 'since', 'last', 'previous', 'earlier', 'scan', 'snapshot', 'new',
+    'added', 'removed', 'deleted', 'grew', 'grown', 'grow', 'growth', 'shrank', 'shrunk', 'shrink', 'net',
+    'did', 'has', 'have', 'been', 'was', 'were', 'got', 'get', 'gotten',
+}
+DEFAULT_CHANGE_COUNT = 5
+
+
+class LocalQueryEngine:
+    """Answer common questions from file_info without calling the LLM."""
+
+    def __init__(self, format_size: Callable[[int], str] = lambda size: f"{size:,} bytes"):
+        self.format_size = format_size
+        self.stats = {"hits": 0, "misses": 0, "total_time": 0.0}
+        self._lock = threading.Lock()
+
+    @property
+    def hit_rate(self) -> float:
+        asked = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / asked if asked else 0.0
+
+    def answer(self, question: str, file_info: Dict[str, Any]) -> Optional[Tuple[str, Any]]:
+        """Return (kind, value) for a recognized question, or None.
+
+        ``kind`` is "count" (an int), "size" (bytes) or "text" (a string).
+        """
+        start = time.perf_counter()
+        result = self._answer(question, file_info)
+        with self._lock:
+            self.stats["total_time"] += time.perf_counter() - start
+            self.stats["hits" if result is not None else "misses"] += 1
+        return result
+
+    def _answer(self, question: str, file_info: Dict[str, Any]) -> Optional[Tuple[str, Any]]:
+        scoped = self._split_scope(question.strip(" ?!."), file_info)
+        if scoped is None:
+            return None
+        question, scope = scoped
+        text = question.lower().replace("'s", "").strip(" ?!.")
+        duplicates = DUPLICATE_PATTERN.search(text)
+        changes = not duplicates and CHANGE_PATTERN.search(text)
+        ranking = (not duplicates and not changes and FOLDER_PATTERN.search(ROOT_FOLDER_PATTERN.sub(" ", text))
+                   and RANK_PATTERN.search(text) and not COMMON_TYPES_PATTERN.search(text))
+        extra_words = (DUPLICATE_WORDS if duplicates else CHANGE_WORDS if changes else
+                       FOLDER_WORDS if ranking else ())
+        extensions, number, unknown = self._parse_words(text, file_info, extra_words)
+        if unknown or SCOPE_PATTERN.search(text + " "):
+            return None
+
+        if changes:
+            # The diff has no per-directory totals
+            return None if scope is not None else self._changes(text, file_info, extensions, number)
+
+        if ranking:
+            if COUNT_PATTERN.search(text) or AVERAGE_PATTERN.search(text):
+                return None
+            return self._heaviest(text, file_info, scope, extensions, number)
+
+        if scope is not None:
+            if duplicates:
+                return None
+            return self._scoped(text, directory_rollup(file_info).nodes[scope], extensions, number)
+
+        if duplicates:
+            return self._duplicates(text, file_info, extensions, number)
+
+        if DIRECTORY_COUNT_PATTERN.search(text):
+            if extensions or SIZE_PATTERN.search(text) or LARGEST_PATTERN.search(text):
+                return None
+            return "count", file_info["total_directories"]
+
+        if self._about_types(text, extensions):
+            return self._common_types(text, file_info["file_types"], extensions, number)
+
+        if LARGEST_PATTERN.search(text):
+            if COUNT_PATTERN.search(text) or AVERAGE_PATTERN.search(text):
+                return None
+            if number is None:
+                singular = re.search(r"\bfile\b", text) and not re.search(r"\bfiles\b", text)
+                number = 1 if singular else max(1, len(file_info["largest_files"]))
+            return "text", self._largest(file_info, extensions, number)
+
+        if number is not None:
+            return None
+
+        if AVERAGE_PATTERN.search(text):
+            # Averages are over files with a known size, like the CALCULATE pattern
+            all_sized = len(file_info["file_sizes"]) == file_info["total_files"]
+            count, total = self._count_and_size(file_info, extensions, sized_only=not all_sized)
+            return "size", total / count if count else 0
+
+        if SIZE_PATTERN.search(text):
+            return "size", self._count_and_size(file_info, extensions)[1]
+
+        if COUNT_PATTERN.search(text):
+            if extensions is None:
+                return "count", file_info["total_files"]
+            return "count", sum(file_info["file_types"].get(ext, 0) for ext in extensions)
+
+        return None
+
+    def _split_scope(self, question: str, file_info: Dict[str, Any]) -> Optional[Tuple[str, Optional[str]]]:
+        """Take the subtree a question is about out of it.
+
+        Returns the rest of the question and the directory (None for the
+        whole tree), or None when the question is about something that is
+        not a scanned directory.
+        """
+        match = SCOPE_PATH_PATTERN.search(question)
+        if match is None:
+            match = NAMED_FOLDER_PATTERN.search(question)
+            if match is None or directory_rollup(file_info).get(match.group("path")) is None:
+                return question, None
+        path = normalize_directory(match.group("path"))
+        if path and path not in directory_rollup(file_info).nodes:
+            return None
+        return question[:match.start()] + " " + question[match.end():], path or None
+
+    def _scoped(self, text: str, stats: DirectoryStats, extensions: Optional[Set[str]],
+                number: Optional[int]) -> Optional[Tuple[str, Any]]:
+        """Answer a question about one subtree from its rollup totals."""
+        if DIRECTORY_COUNT_PATTERN.search(text):
+            if extensions or SIZE_PATTERN.search(text) or LARGEST_PATTERN.search(text):
+                return None
+            return "count", stats.directories
+
+        if self._about_types(text, extensions):
+            return self._common_types(text, {ext: counts[0] for ext, counts in stats.extensions.items()},
+                                      extensions, number)
+
+        # The largest files of a subtree are not part of the rollup
+        if LARGEST_PATTERN.search(text) or number is not None:
+            return None
+
+        if AVERAGE_PATTERN.search(text):
+            count = stats.sized_count(extensions)
+            return "size", stats.size(extensions) / count if count else 0
+
+        if SIZE_PATTERN.search(text):
+            return "size", stats.size(extensions)
+
+        if COUNT_PATTERN.search(text):
+            return "count", stats.count(extensions)
+
+        return None
+
+    def _about_types(self, text: str, extensions: Optional[Set[str]]) -> bool:
+        """Whether a question asks about the extensions themselves ("most common types", "top 3 extensions")."""
+        if COMMON_TYPES_PATTERN.search(text):
+            return True
+        return extensions is None and bool(TYPES_PATTERN.search(text)) and bool(
+            LARGEST_PATTERN.search(text) or TYPE_COUNT_PATTERN.search(text))
+
+    def _common_types(self, text: str, file_types: Dict[str, int], extensions: Optional[Set[str]],
+                      number: Optional[int]) -> Optional[Tuple[str, Any]]:
+        """Rank extensions by their number of files, or count them."""
+        if extensions:
+            return None
+        if TYPE_COUNT_PATTERN.search(text):
+            return None if number is not None else ("count", len(file_types))
+        if re.search(r"\b(largest|biggest)\b", text) or SIZE_PATTERN.search(text) or AVERAGE_PATTERN.search(text) \
+                or COUNT_PATTERN.search(text):
+            # By bytes or by count is ambiguous ("largest file types"), so it is left to the LLM
+            return None
+        if number is None:
+            singular = SINGULAR_TYPE_PATTERN.search(text) and not re.search(r"\b(types|extensions|formats)\b", text)
+            number = 1 if singular else DEFAULT_TYPE_COUNT
+        elif number <= 0:
+            return None
+        ranked = sorted(file_types.items(), key=lambda x: (-x[1], x[0]))[:number]
+        return "text", "\n".join(f"  {ext}: {count} files" for ext, count in ranked)
+
+    def _heaviest(self, text: str, file_info: Dict[str, Any], scope: Optional[str],
+                  extensions: Optional[Set[str]], number: Optional[int]) -> Optional[Tuple[str, Any]]:
+        """List the folders (directly under ``scope``) with the most bytes or files."""
+        if number is None:
+            folders = ROOT_FOLDER_PATTERN.sub(" ", text)
+            singular = SINGULAR_FOLDER_PATTERN.search(folders) and not re.search(r"\b(folders|directories|dirs)\b",
+                                                                                  folders)
+            number = 1 if singular else DEFAULT_FOLDER_COUNT
+        elif number <= 0:
+            return None
+        by = "files" if RANK_BY_FILES_PATTERN.search(text) else "bytes"
+        ranked = directory_rollup(file_info).heaviest(number, scope or "", by, extensions)
+        if not ranked:
+            return "text", "no subfolders found"
+        lines = []
+        for path, stats in ranked:
+            count, size = stats.count(extensions), self.format_size(stats.size(extensions))
+            lines.append(f"  {path}: {count:,} files ({size})" if by == "files" else
+                         f"  {path}: {size} ({count:,} files)")
+        return "text", "\n".join(lines)
+
+    def _duplicates(self, text: str, file_info: Dict[str, Any], extensions: Optional[Set[str]],
+                    number: Optional[int]) -> Optional[Tuple[str, Any]]:
+        """Answer from the duplicate groups the agent stored in file_info."""
+        from file_agent import DUPLICATES_KEY
+        duplicates = file_info.get(DUPLICATES_KEY)
+        if duplicates is None or extensions:
+            return None
+        if SIZE_PATTERN.search(text) or WASTE_PATTERN.search(text):
+            return None if number is not None else ("size", duplicates["wasted_bytes"])
+        if COUNT_PATTERN.search(text):
+            return None if number is not None else ("count", duplicates["duplicate_files"])
+        groups = duplicates["groups"][:number or 5]
+        if not groups:
+            return "text", "no duplicate files found"
+        return "text", "\n".join(f"  {self.format_size(size)} x {len(paths)}: {', '.join(paths)}"
+                                  for size, paths in groups)
+
+    def _changes(self, text: str, file_info: Dict[str, Any], extensions: Optional[Set[str]],
+                 number: Optional[int]) -> Optional[Tuple[str, Any]]:
+        """Answer from the snapshot diff the agent stored in file_info (see FileSystemAgent.find_changes)."""
+        changes = file_info.get(CHANGES_KEY)
+        if changes is None or number is not None and number <= 0:
+            return None
+        added, removed = ADDED_PATTERN.search(text), REMOVED_PATTERN.search(text)
+        grown, shrunk = GROWN_PATTERN.search(text), SHRUNK_PATTERN.search(text)
+        if bool(added) + bool(removed) + bool(grown) + bool(shrunk) > 1:
+            return None
+
+        if added or removed:
+            if COUNT_PATTERN.search(text):
+                if number is not None:
+                    return None
+                if extensions is not None:
+                    change = changes.extension(extensions)
+                    return "count", change.added if added else change.removed
+                return "count", changes.added_files if added else changes.removed_files
+            # Bytes and the largest files are kept for all extensions together
+            if extensions is not None:
+                return None
+            if SIZE_PATTERN.search(text):
+                return None if number is not None else ("size", changes.added_bytes if added else changes.removed_bytes)
+            entries = (changes.added if added else changes.removed)(number or DEFAULT_CHANGE_COUNT)
+            if not entries:
+                return "text", "no added files" if added else "no removed files"
+            return "text", "\n".join(f"  {path}: {self.format_size(size)}" for path, size in entries)
+
+        if grown or shrunk:
+            if COUNT_PATTERN.search(text):
+                return None
+            if RANK_PATTERN.search(text) or number is not None:
+                if extensions is not None:
+                    return None
+                entries = (changes.grown if grown else changes.shrunk)(number or DEFAULT_CHANGE_COUNT)
+                if not entries:
+                    return "text", "no files grew" if grown else "no files shrank"
+                return "text", "\n".join(f"  {path}: {self.format_size(old)} -> {self.format_size(new)} "
+                                          f"({format_delta(new - old, self.format_size)})"
+                                          for path, old, new in entries)
+            # "how much did the folder grow": the net change, which may be negative
+            delta = changes.extension(extensions).bytes if extensions is not None else changes.net_bytes
+            return "text", format_delta(delta, self.format_size)
+
+        if number is not None:
+            return None
+        if COUNT_PATTERN.search(text):
+            if extensions is not None:
+                change = changes.extension(extensions)
+                return "count", change.added + change.removed + change.resized
+            return "count", changes.added_files + changes.removed_files + changes.resized_files
+        if SIZE_PATTERN.search(text):
+            delta = changes.extension(extensions).bytes if extensions is not None else changes.net_bytes
+            return "text", format_delta(delta, self.format_size)
+        if extensions is not None:
+            return None
+        return "text", changes.describe(self.format_size)
+
+    def _parse_words(self, text: str, file_info: Dict[str, Any],
+                     extra_words: Iterable[str] = ()) -> Tuple[Optional[Set[str]], Optional[int], bool]:
+        """Split a question into extensions, an optional number and unknown words.
+
+        Bare extension names ("py files") are accepted when that extension
+        occurs in the scanned tree, and ``extra_words`` are ignored like
+        filler words.
+        """
+        extensions: Set[str] = set()
+        number = None
+        unknown = False
+        for word in TOKEN_PATTERN.findall(text):
+            if word in FILLER_WORDS or word in INTENT_WORDS or word in extra_words:
+                continue
+            if word in EXTENSION_GROUPS:
+                extensions.update(EXTENSION_GROUPS[word])
+            elif word.startswith('.') and len(word) > 1 and '.' not in word[1:]:
+                extensions.add(word)
+            elif '.' + word in file_info["file_types"]:
+                extensions.add('.' + word)
+            elif word.isdigit() or word in NUMBER_WORDS:
+                if number is not None:
+                    unknown = True
+                number = int(word) if word.isdigit() else NUMBER_WORDS[word]
+            else:
+                unknown = True
+        return extensions or None, number, unknown
+
+    def _count_and_size(self, file_info: Dict[str, Any], extensions: Optional[Iterable[str]],
+                        sized_only: bool = False) -> Tuple[int, int]:
+        """Return the number of files and their total size for some extensions."""
+        if extensions is None:
+            if sized_only:
+                count = len(file_info["file_sizes"])
+            else:
+                count = file_info["total_files"]
+            extension_sizes = file_info.get("extension_sizes")
+            if extension_sizes is not None:
+                return count, sum(extension_sizes.values())
+            return count, sum(file_info["file_sizes"].values())
+
+        extensions = set(extensions)
+        extension_sizes = file_info.get("extension_sizes")
+        if extension_sizes is not None and not sized_only:
+            count = sum(file_info["file_types"].get(ext, 0) for ext in extensions)
+            return count, sum(extension_sizes.get(ext, 0) for ext in extensions)
+
+        count = total = 0
+        for size in self._matching_sizes(file_info, extensions):
+            count += 1
+            total += size
+        return count, total
+
+    def _matching_sizes(self, file_info: Dict[str, Any], extensions: Set[str]):
+        from file_agent import _file_extension
+        for path, size in file_info["file_sizes"].items():
+            if _file_extension(os.path.basename(path)) in extensions:
+                yield size
+
+    def _largest(self, file_info: Dict[str, Any], extensions: Optional[Set[str]], n: int) -> str:
+        from file_agent import _file_extension
+        largest = file_info["largest_files"]
+        if extensions is None and (n <= len(largest) or len(largest) >= len(file_info["file_sizes"])):
+            entries = largest[:n]
+        else:
+            items = file_info["file_sizes"].items()
+            if extensions is not None:
+                items = ((path, size) for path, size in items
+                         if _file_extension(os.path.basename(path)) in extensions)
+            entries = [(path, size) for size, path in
+                       heapq.nlargest(n, ((size, path) for path, size in items))]
+        if not entries:
+            return "no matching files found"
+        return "\n".join(f"  {path}: {self.format_size(size)}" for path, size in entries)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Token-budgeted file system context for LLM prompts.
+
+build_context replaces the full create_summary text plus the indented
+file_types JSON in answer_question with one compact block that fits in a
+token budget. Sections are filled in priority order: totals, the most common
+extensions as compact JSON (the rest summed into an "other" bucket), the
+largest files, the changes since an older snapshot when the scan was compared
+with one, and the top-level folders, then sample directories and files, each
+only as far as the remaining budget allows.
+
+Tokens are estimated as one per four characters, which is close enough for
+English and paths with the OpenAI tokenizers and needs no extra dependency.
+"""
+
+import heapq
+import json
+from typing import Dict, Any, Callable, List
+
+from dir_rollup import ROLLUP_KEY
+from snapshot_diff import CHANGES_KEY
+
+DEFAULT_MAX_PROMPT_TOKENS = 1500
+OTHER_BUCKET = "other"
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a text."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def compact_file_types(file_types: Dict[str, int], max_chars: int) -> Dict[str, int]:
+    """Return the most common extensions that fit in ``max_chars`` of compact JSON.
+
+    The counts of the remaining extensions are summed under "other".
+    """
+    ranked = sorted(file_types.items(), key=lambda x: (-x[1], x[0]))
+    kept: Dict[str, int] = {}
+    # Reserve room for the braces and the "other" entry
+    used = 2 + len(f'"{OTHER_BUCKET}":{sum(file_types.values())}')
+    for i, (ext, count) in enumerate(ranked):
+        cost = len(json.dumps(ext)) + len(str(count)) + 2
+        if used + cost > max_chars and i < len(ranked) - 1:
+            kept[OTHER_BUCKET] = sum(c for _, c in ranked[i:])
+            break
+        kept[ext] = count
+        used += cost
+    return kept
+
+
+def _fit_lines(title: str, lines: List[str], budget_chars: int) -> str:
+    """Return a titled section with as many lines as fit in ``budget_chars``."""
+    section = title
+    for line in lines:
+        if len(section) + len(line) + 1 > budget_chars:
+            break
+        section += line + "\n"
+    return section if section != title else ""
+
+
+def build_context(file_info: Dict[str, Any], root_path: str, max_tokens: int = DEFAULT_MAX_PROMPT_TOKENS,
+                  format_size: Callable[[int], str] = str, sample_size: int = 20) -> str:
+    """Describe a scan in at most about ``max_tokens`` tokens."""
+    budget = max_tokens * CHARS_PER_TOKEN
+    context = (f"Folder: {root_path}\n"
+               f"Total files: {file_info['total_files']}\n"
+               f"Total directories: {file_info['total_directories']}\n")
+    duplicates = file_info.get("duplicates")
+    if duplicates is not None:
+        context += (f"Duplicate files: {duplicates['duplicate_files']} redundant copies in "
+                    f"{len(duplicates['groups'])} groups, wasting {duplicates['wasted_bytes']} bytes\n")
+
+    # Extension counts are what counting answers are read from, so they get half of the budget first
+    types_budget = max(64, (budget - len(context)) // 2)
+    file_types = compact_file_types(file_info["file_types"], types_budget)
+    context += f"File types (extension: count): {json.dumps(file_types, separators=(',', ':'))}\n"
+    if OTHER_BUCKET in file_types:
+        context += (f'"{OTHER_BUCKET}" sums {len(file_info["file_types"]) - len(file_types) + 1} rarer extensions; '
+                    "use file_info['file_types'].get(ext, 0) for them.\n")
+
+    largest = [f"  {path}: {format_size(size)}" for path, size in file_info["largest_files"][:5]]
+    context += _fit_lines("Largest files:\n", largest, budget - len(context))
+
+    changes = file_info.get(CHANGES_KEY)
+    if changes is not None:
+        title, *lines = changes.describe(format_size).split("\n")
+        context += _fit_lines(title + "\n", lines, budget - len(context))
+
+    # Only when a question already built the rollup; the context is not worth a pass over every file
+    rollup = file_info.get(ROLLUP_KEY)
+    if rollup is not None:
+        folders = [f"  {path}: {format_size(stats.bytes)} in {stats.files} files" for path, stats in rollup.heaviest(5)]
+        context += _fit_lines("Largest top-level folders:\n", folders, budget - len(context))
+
+    directories = file_info.get("directory_sample")
+    if directories is None:
+        directories = heapq.nsmallest(sample_size, file_info["directory_structure"])
+    context += _fit_lines("Sample directories:\n", [f"  {d}" for d in directories[:sample_size]],
+                          budget - len(context))
+
+    files = file_info.get("file_sample")
+    if files is None:
+        files = heapq.nsmallest(sample_size, file_info["file_list"])
+    context += _fit_lines("Sample files:\n", [f"  {f}" for f in files[:sample_size]], budget - len(context))
+    return context
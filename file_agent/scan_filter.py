@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""Scan-time filters that prune the walk before directories are listed.
+
+A ScanFilter holds the options of a scan: include and exclude globs,
+whether .gitignore/.ignore files are honoured, a maximum depth, a minimum
+file size, whether to stay on the root's file system and whether to follow
+symlinked directories. ``scan_filter.start(root)`` returns the ScanPruner
+that one walk uses: it lists directories like file_agent._list_directory but
+never reports or descends into an excluded directory, so ``.git``,
+``node_modules`` or a virtualenv cost one directory entry instead of their
+whole subtree.
+
+Globs use .gitignore syntax: a pattern without a slash ("*.pyc",
+"node_modules") matches a name at any depth, one with a slash ("docs/*.md",
+"/build") is relative to the root (or to the directory of the ignore file),
+"**" matches any number of directories, a trailing "/" matches only
+directories and a leading "!" re-includes what an earlier pattern excluded.
+All patterns of one set are compiled into a single regular expression, so
+matching an entry costs one regex call per set, not one per pattern.
+"""
+
+import os
+import re
+import sys
+import threading
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple
+
+IGNORE_FILES = (".gitignore", ".ignore")
+# Always skipped when ignore files are honoured, like git itself does
+VCS_DIRECTORIES = (".git", ".hg", ".svn")
+
+
+def _translate(pattern: str) -> str:
+    """Translate one .gitignore pattern (without "!" or trailing "/") into a regex."""
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i) and (i == 0 or pattern[i - 1] == "/"):
+            regex += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("**", i) and i + 2 == len(pattern) and (i == 0 or pattern[i - 1] == "/"):
+            regex += ".*"
+            i += 2
+        elif pattern[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += "[^/]"
+            i += 1
+        elif pattern[i] == "[":
+            end = pattern.find("]", i + 2)
+            if end < 0:
+                regex += re.escape("[")
+                i += 1
+                continue
+            members = pattern[i + 1:end]
+            if members[0] in "!^":
+                members = "^" + members[1:]
+            regex += "[" + members.replace("\\", "\\\\") + "]"
+            i = end + 1
+        elif pattern[i] == "\\" and i + 1 < len(pattern):
+            regex += re.escape(pattern[i + 1])
+            i += 2
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return regex if anchored else "(?:.*/)?" + regex
+
+
+class GlobSet:
+    """Patterns in .gitignore syntax, matched against paths relative to a base directory."""
+
+    def __init__(self, patterns: Iterable[str]):
+        rules = []
+        for line in patterns:
+            line = line.rstrip("\r\n")
+            # Trailing spaces are ignored unless escaped
+            while line.endswith(" ") and not line.endswith("\\ "):
+                line = line[:-1]
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate or line.startswith("\\!") or line.startswith("\\#"):
+                line = line[1:]
+            directory_only = line.endswith("/")
+            line = line.rstrip("/")
+            if line:
+                rules.append((_translate(line), negate, directory_only))
+        self.patterns = len(rules)
+        # Later patterns win, so they come first in the alternation; the group that matched is the rule
+        rules.reverse()
+        self._negated = {}
+        self._regexes = {}
+        for is_dir in (False, True):
+            kept = [rule for rule in rules if is_dir or not rule[2]]
+            self._negated[is_dir] = [negate for _, negate, _ in kept]
+            self._regexes[is_dir] = (re.compile("|".join(f"({regex})" for regex, _, _ in kept), re.DOTALL)
+                                     if kept else None)
+
+    def __bool__(self) -> bool:
+        return self.patterns > 0
+
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        """True if the path is matched, False if a "!" pattern re-included it, None if no pattern applies."""
+        regex = self._regexes[is_dir]
+        if regex is None:
+            return None
+        match = regex.fullmatch(rel_path)
+        if match is None:
+            return None
+        return not self._negated[is_dir][match.lastindex - 1]
+
+
+class ScanFilter:
+    """What a scan includes: the filter options given on the command line or in the web interface."""
+
+    def __init__(self, include: Sequence[str] = (), exclude: Sequence[str] = (), ignore_files: bool = False,
+                 max_depth: Optional[int] = None, min_size: Optional[int] = None,
+                 one_file_system: bool = False, follow_symlinks: bool = False):
+        self.include = tuple(include)
+        self.exclude = tuple(exclude)
+        self.ignore_files = ignore_files
+        self.max_depth = max_depth
+        self.min_size = min_size
+        self.one_file_system = one_file_system
+        self.follow_symlinks = follow_symlinks
+        self.include_globs = GlobSet(self.include)
+        self.exclude_globs = GlobSet(self.exclude)
+
+    def key(self) -> Tuple:
+        """The options as a hashable tuple, e.g. for caching scans per filter."""
+        return (self.include, self.exclude, self.ignore_files, self.max_depth, self.min_size,
+                self.one_file_system, self.follow_symlinks)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ScanFilter) and self.key() == other.key()
+
+    def __hash__(self) -> int:
+        return hash(self.key())
+
+    def __repr__(self) -> str:
+        return (f"ScanFilter(include={self.include!r}, exclude={self.exclude!r}, "
+                f"ignore_files={self.ignore_files!r}, max_depth={self.max_depth!r}, min_size={self.min_size!r}, "
+                f"one_file_system={self.one_file_system!r}, follow_symlinks={self.follow_symlinks!r})")
+
+    @property
+    def active(self) -> bool:
+        """Whether the filter changes anything compared to a plain scan."""
+        return bool(self.include or self.exclude or self.ignore_files or self.max_depth is not None or
+                    self.min_size or self.one_file_system or self.follow_symlinks)
+
+    def start(self, root_path: str) -> "ScanPruner":
+        """Return the pruner for one walk of ``root_path``."""
+        return ScanPruner(self, root_path)
+
+
+class ScanPruner:
+    """Per-walk state of a ScanFilter: ignore files seen so far, visited directories and counters.
+
+    Safe to share between the threads of one scan. A copy is pickled into
+    each worker process of a sharded scan, so symlinks that lead into another
+    shard's subtree are not recognized as already visited.
+    """
+
+    def __init__(self, scan_filter: ScanFilter, root_path: str):
+        self.filter = scan_filter
+        self.root_path = root_path
+        # Ignore files that apply in each listed directory, as (prefix, GlobSet) from the root down
+        self._rules: Dict[str, Tuple[Tuple[str, GlobSet], ...]] = {"": ()}
+        self._visited = set()
+        self._root_device = None
+        self._lock = threading.Lock()
+        self.stats = {"directories_listed": 0, "entries_seen": 0, "directories_pruned": 0, "files_skipped": 0}
+        try:
+            st = os.stat(root_path)
+            self._root_device = st.st_dev
+            self._visited.add((st.st_dev, st.st_ino))
+        except OSError:
+            pass
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _rules_for(self, prefix: str) -> Tuple[Tuple[str, GlobSet], ...]:
+        """The ignore files that apply to entries of the directory at ``prefix``."""
+        while prefix not in self._rules:
+            prefix = prefix[:-1].rpartition(os.sep)[0]
+            prefix = prefix + os.sep if prefix else ""
+        return self._rules[prefix]
+
+    def _load_rules(self, path: str, prefix: str, names: Iterable[str]):
+        rules = self._rules_for(prefix)
+        for name in IGNORE_FILES:
+            if name in names:
+                try:
+                    with open(os.path.join(path, name), encoding="utf-8", errors="replace") as f:
+                        globs = GlobSet(f)
+                except OSError:
+                    continue
+                if globs:
+                    rules = rules + ((prefix, globs),)
+        self._rules[prefix] = rules
+        return rules
+
+    def excluded(self, rel_path: str, is_dir: bool, rules=None) -> bool:
+        """Whether a path is excluded by the exclude globs or an ignore file (not by depth or size)."""
+        scan_filter = self.filter
+        name_path = rel_path if os.sep == "/" else rel_path.replace(os.sep, "/")
+        if scan_filter.exclude_globs.match(name_path, is_dir):
+            return True
+        if scan_filter.ignore_files:
+            if is_dir and name_path.rpartition("/")[2] in VCS_DIRECTORIES:
+                return True
+            if rules is None:
+                rules = self._rules_for(rel_path.rpartition(os.sep)[0] + os.sep if os.sep in rel_path else "")
+            # The deepest ignore file that has an opinion decides
+            for base, globs in reversed(rules):
+                matched = globs.match(name_path[len(base):], is_dir)
+                if matched:
+                    return True
+                if matched is not None:
+                    # Re-included with "!": not ignored, but the include globs still apply
+                    break
+        if not is_dir and scan_filter.include_globs:
+            return not scan_filter.include_globs.match(name_path, False)
+        return False
+
+    def allows(self, rel_path: str, is_dir: bool, size: Optional[int] = None) -> bool:
+        """Whether a single path would be part of the scan (used for watcher events)."""
+        max_depth = self.filter.max_depth
+        if max_depth is not None and rel_path.count(os.sep) > max_depth:
+            return False
+        if not is_dir and size is not None and self.filter.min_size and size < self.filter.min_size:
+            return False
+        return not self.excluded(rel_path, is_dir)
+
+    def descends(self, rel_path: str, is_link: bool) -> bool:
+        """Whether an included directory is listed: within max_depth, and no symlink unless following them."""
+        max_depth = self.filter.max_depth
+        if max_depth is not None and rel_path.count(os.sep) >= max_depth:
+            return False
+        return self.filter.follow_symlinks or not is_link
+
+    def _descend(self, entry: os.DirEntry, is_link: bool) -> bool:
+        """Whether to list a subdirectory: not a symlink (or a new one when following), same device."""
+        scan_filter = self.filter
+        if is_link and not scan_filter.follow_symlinks:
+            return False
+        if not (scan_filter.one_file_system or scan_filter.follow_symlinks):
+            return True
+        try:
+            st = entry.stat()
+        except OSError:
+            return False
+        if scan_filter.one_file_system and st.st_dev != self._root_device:
+            return False
+        if scan_filter.follow_symlinks:
+            # A directory reached twice (a symlink loop or a second link to it) is only listed once
+            key = (st.st_dev, st.st_ino)
+            with self._lock:
+                if key in self._visited:
+                    return False
+                self._visited.add(key)
+        return True
+
+    def list_directory(self, path: str, prefix: str) -> Tuple[List[Tuple[str, str, Optional[int]]], List[str],
+                                                                List[Tuple[str, str]]]:
+        """List a directory like file_agent._list_directory, leaving out excluded entries.
+
+        Excluded subdirectories are neither reported nor descended into, and
+        subdirectories deeper than ``max_depth`` are reported but not listed.
+        """
+        from file_agent import _file_extension
+        scan_filter = self.filter
+        files = []
+        directories = []
+        subdirs = []
+
+        try:
+            with os.scandir(path) as iterator:
+                entries = list(iterator)
+        except PermissionError as e:
+            print(f"Warning: Permission denied accessing some files: {e}", file=sys.stderr)
+            return files, directories, subdirs
+        except OSError:
+            return files, directories, subdirs
+
+        rules = None
+        if scan_filter.ignore_files:
+            rules = self._load_rules(path, prefix, {entry.name for entry in entries})
+        descend = scan_filter.max_depth is None or prefix.count(os.sep) < scan_filter.max_depth
+        min_size = scan_filter.min_size
+        pruned = skipped = 0
+
+        for entry in entries:
+            try:
+                rel_path = prefix + entry.name
+                if entry.is_file():
+                    if self.excluded(rel_path, False, rules):
+                        skipped += 1
+                        continue
+                    try:
+                        size = entry.stat().st_size
+                    except (OSError, PermissionError):
+                        size = None
+                    if min_size and size is not None and size < min_size:
+                        skipped += 1
+                        continue
+                    files.append((rel_path, _file_extension(entry.name), size))
+
+                elif entry.is_dir():
+                    if self.excluded(rel_path, True, rules):
+                        pruned += 1
+                        continue
+                    directories.append(rel_path)
+                    if descend and self._descend(entry, entry.is_symlink()):
+                        subdirs.append((entry.path, rel_path + os.sep))
+            except OSError:
+                continue
+
+        with self._lock:
+            stats = self.stats
+            stats["directories_listed"] += 1
+            stats["entries_seen"] += len(entries)
+            stats["directories_pruned"] += pruned
+            stats["files_skipped"] += skipped
+        return files, directories, subdirs
+
+
+def parse_size(text: str) -> int:
+    """Parse a size like "512", "10K", "1.5MB" or "2G" (binary units) into bytes."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?\s*", text.lower())
+    if match is None:
+        raise ValueError(f"invalid size: {text!r}")
+    number, unit = match.groups()
+    return int(float(number) * 1024 ** " kmgt".index(unit or " "))
+
+
+def add_filter_arguments(parser):
+    """Add the scan filter options to an argparse parser."""
+    parser.add_argument("--exclude", action="append", default=[], metavar="GLOB",
+                        help="Skip files and directories matching this .gitignore-style glob (repeatable); "
+                             "excluded directories are never listed")
+    parser.add_argument("--include", action="append", default=[], metavar="GLOB",
+                        help="Only count files matching this glob (repeatable)")
+    parser.add_argument("--gitignore", action="store_true",
+                        help="Honour .gitignore and .ignore files and skip .git/.hg/.svn directories")
+    parser.add_argument("--max-depth", type=int, default=None,
+                        help="Only descend this many directory levels below the root (0: the root only)")
+    parser.add_argument("--min-size", type=lambda text: parse_size(text) if text else None, default=None,
+                        help="Skip files smaller than this (e.g. 4K, 1M)")
+    parser.add_argument("--one-file-system", action="store_true",
+                        help="Do not descend into directories on other file systems (mount points)")
+    parser.add_argument("--follow-symlinks", action="store_true",
+                        help="Descend into symlinked directories, listing each directory once (skips loops)")
+    return parser
+
+
+def filter_from_args(args) -> Optional[ScanFilter]:
+    """Build the ScanFilter for parsed add_filter_arguments options, or None if none were given."""
+    scan_filter = ScanFilter(include=args.include, exclude=args.exclude, ignore_files=args.gitignore,
+                             max_depth=args.max_depth, min_size=args.min_size,
+                             one_file_system=args.one_file_system, follow_symlinks=args.follow_symlinks)
+    return scan_filter if scan_filter.active else None
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Persistent on-disk scan index for the File System Agent.
+
+The index is a SQLite database per scanned root that stores the mtime of every
+directory together with its listing (files with size and extension, and its
+subdirectories). A rescan stats each known directory once and only re-lists the
+directories whose mtime changed, rebuilding file_info from the stored rows for
+everything else.
+
+Note that changing a file's contents does not change its directory's mtime, so
+the size of a file that was modified in place is only refreshed when something
+else in its directory changes (or with a full reindex).
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+from file_agent import (DEFAULT_CACHE_DIR, DEFAULT_SAMPLE_SIZE, DEFAULT_SCAN_WORKERS, DEFAULT_TOP_N,
+                        _list_directory, _new_accumulator)
+
+# Directories modified this recently may still change within the same mtime
+# tick, so they are stored as "unknown" and re-listed on the next scan
+RACY_MTIME_WINDOW_NS = 2 * 1_000_000_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS directories (
+    prefix TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    subdirs TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    prefix TEXT NOT NULL,
+    name TEXT NOT NULL,
+    extension TEXT NOT NULL,
+    size INTEGER
+);
+CREATE INDEX IF NOT EXISTS files_prefix ON files (prefix);
+"""
+
+
+def _stat_directory(path: str, prefix: str, stored_mtime: Optional[int], now_ns: int):
+    """Stat a directory and list it again only if its mtime changed."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return prefix, None, None
+
+    if stored_mtime is not None and mtime == stored_mtime:
+        return prefix, mtime, None
+
+    listing = _list_directory(path, prefix)
+    if now_ns - mtime < RACY_MTIME_WINDOW_NS:
+        mtime = -1
+    return prefix, mtime, listing
+
+
+class ScanIndex:
+    """SQLite-backed index of one directory tree."""
+
+    def __init__(self, root_path: str, cache_dir: Optional[str] = None):
+        self.root_path = os.path.abspath(root_path)
+        cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        os.makedirs(cache_dir, exist_ok=True)
+
+        key = hashlib.sha1(self.root_path.encode("utf-8", "surrogateescape")).hexdigest()[:16]
+        self.db_path = os.path.join(cache_dir, f"index-{key}.sqlite")
+        self.stats = {"directories_listed": 0, "directories_reused": 0, "directories_removed": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def clear(self):
+        """Forget everything stored for this root so the next scan is a full one."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM files")
+            conn.execute("DELETE FROM directories")
+
+    def scan(self, workers: Optional[int] = None, compact: bool = False,
+             top_n: int = DEFAULT_TOP_N, sample_size: int = DEFAULT_SAMPLE_SIZE,
+             progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
+        """Rescan the root incrementally and return the file_info dictionary."""
+        if workers is None:
+            workers = DEFAULT_SCAN_WORKERS
+
+        self.stats = {"directories_listed": 0, "directories_reused": 0, "directories_removed": 0}
+        conn = self._connect()
+        try:
+            stored_dirs = {prefix: (mtime, json.loads(subdirs)) for prefix, mtime, subdirs
+                           in conn.execute("SELECT prefix, mtime_ns, subdirs FROM directories")}
+            stored_files: Dict[str, List[Tuple[str, str, Optional[int]]]] = {}
+            for prefix, name, extension, size in conn.execute(
+                    "SELECT prefix, name, extension, size FROM files"):
+                stored_files.setdefault(prefix, []).append((prefix + name, extension, size))
+
+            accumulator = _new_accumulator(compact, top_n, sample_size, progress)
+            visited = set()
+            now_ns = time.time_ns()
+
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                def submit(path, prefix):
+                    stored = stored_dirs.get(prefix)
+                    return pool.submit(_stat_directory, path, prefix,
+                                       stored[0] if stored else None, now_ns)
+
+                futures = {submit(self.root_path, "")}
+                while futures:
+                    done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        prefix, mtime, listing = future.result()
+                        if mtime is None:
+                            continue
+                        visited.add(prefix)
+                        path = os.path.join(self.root_path, prefix) if prefix else self.root_path
+
+                        if listing is None:
+                            # Unchanged directory: reuse the stored listing
+                            self.stats["directories_reused"] += 1
+                            subdirs = stored_dirs[prefix][1]
+                            files = stored_files.get(prefix, [])
+                            directories = [prefix + name for name, _ in subdirs]
+                            descend = [(os.path.join(path, name), prefix + name + os.sep)
+                                       for name, follow in subdirs if follow]
+                        else:
+                            self.stats["directories_listed"] += 1
+                            files, directories, descend = listing
+                            followed = {sub_prefix for _, sub_prefix in descend}
+                            subdirs = [(rel[len(prefix):], rel + os.sep in followed) for rel in directories]
+                            self._store_listing(conn, prefix, mtime, files, subdirs)
+
+                        accumulator.add_listing(files, directories)
+                        for sub_path, sub_prefix in descend:
+                            futures.add(submit(sub_path, sub_prefix))
+
+            removed = [prefix for prefix in stored_dirs if prefix not in visited]
+            for prefix in removed:
+                conn.execute("DELETE FROM files WHERE prefix = ?", (prefix,))
+                conn.execute("DELETE FROM directories WHERE prefix = ?", (prefix,))
+            self.stats["directories_removed"] = len(removed)
+            conn.commit()
+        finally:
+            conn.close()
+
+        return accumulator.result()
+
+    def _store_listing(self, conn: sqlite3.Connection, prefix: str, mtime: int,
+                       files: List[Tuple[str, str, Optional[int]]], subdirs: List[Tuple[str, bool]]):
+        """Replace the stored listing of one directory."""
+        conn.execute("DELETE FROM files WHERE prefix = ?", (prefix,))
+        conn.executemany(
+            "INSERT INTO files (prefix, name, extension, size) VALUES (?, ?, ?, ?)",
+            ((prefix, rel_path[len(prefix):], extension, size) for rel_path, extension, size in files))
+        conn.execute("INSERT OR REPLACE INTO directories (prefix, mtime_ns, subdirs) VALUES (?, ?, ?)",
+                     (prefix, mtime, json.dumps(subdirs)))
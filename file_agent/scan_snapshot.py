@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""Memory-mapped binary snapshots of scan results.
+
+write_snapshot stores a file_info in one file that readers mmap and query in
+place, so several processes analysing the same tree share one page-cached
+copy and loading it takes milliseconds instead of a rescan. The layout
+(records in the writer's byte order, which the header records and readers
+check):
+
+- a fixed header (magic, format version, counts and section offsets),
+- the file records, 16 bytes each: the end offset of the path in the string
+  heap with the extension code in the bits above END_BITS, then the size
+  (-1 when unknown),
+- the directory records, 8 bytes each: the end offset of the path,
+- the string heap of UTF-8 paths (files, then directories),
+- a small JSON section with the root, the extension table and the
+  aggregates (file types, extension sizes, largest files, samples).
+
+Files and directories are sorted by their UTF-8 path, so a key lookup is a
+binary search in the heap and two snapshots can be compared with a single
+merge pass. load_snapshot returns a file_info whose ``file_sizes``,
+``file_list`` and ``directory_structure`` are read-only views over the
+mapping, like the views of compact_store.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from collections.abc import ValuesView
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+from compact_store import UNKNOWN_SIZE, FileSizesView, PathListView
+from file_agent import _file_extension
+
+SNAPSHOT_MAGIC = b"FASNAP\0\0"
+SNAPSHOT_VERSION = 1
+# magic, version, flags, files, sized files, directories, then offset and length of
+# the file records, directory records, heap and metadata
+HEADER = struct.Struct("<8sII3Q8Q")
+FLAG_BIG_ENDIAN = 1
+# Heap offsets take the low 40 bits of a file record (1 TiB of paths); extension codes the rest
+END_BITS = 40
+END_MASK = (1 << END_BITS) - 1
+MAX_EXTENSIONS = 1 << (63 - END_BITS)
+
+
+def _encode(path: str) -> bytes:
+    return path.encode("utf-8", "surrogateescape")
+
+
+def _decode(data) -> str:
+    return str(data, "utf-8", "surrogateescape")
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def write_snapshot(file_info: Dict[str, Any], path: str, root_path: Optional[str] = None) -> str:
+    """Write a file_info (plain or compact) to a snapshot file and return its path.
+
+    The file is written next to ``path`` and renamed over it, so readers
+    that still map an older snapshot keep a consistent copy.
+    """
+    sizes = file_info["file_sizes"]
+    if not isinstance(sizes, dict):
+        # Compact views answer lookups through a path index; one pass is cheaper
+        sizes = dict(sizes.items())
+
+    extensions = []
+    extension_codes = {}
+    records = array("q")
+    heap = bytearray()
+    for encoded, rel_path in sorted((_encode(p), p) for p in file_info["file_list"]):
+        extension = _file_extension(rel_path.rpartition(os.sep)[2])
+        code = extension_codes.get(extension)
+        if code is None:
+            if len(extensions) == MAX_EXTENSIONS:
+                raise ValueError("too many distinct extensions for a snapshot")
+            code = extension_codes[extension] = len(extensions)
+            extensions.append(extension)
+        heap += encoded
+        records.append(len(heap) | code << END_BITS)
+        records.append(sizes.get(rel_path, UNKNOWN_SIZE))
+    directory_ends = array("q")
+    for encoded in sorted(map(_encode, file_info["directory_structure"])):
+        heap += encoded
+        directory_ends.append(len(heap))
+    if len(heap) > END_MASK:
+        raise ValueError("paths exceed the snapshot heap limit")
+
+    meta = json.dumps({
+        "root": os.path.abspath(root_path) if root_path is not None else None,
+        "created": time.time(),
+        "extensions": extensions,
+        "file_types": dict(file_info["file_types"]),
+        "extension_sizes": dict(file_info.get("extension_sizes") or {}),
+        "largest_files": list(file_info["largest_files"]),
+        "file_sample": list(file_info.get("file_sample") or []),
+        "directory_sample": list(file_info.get("directory_sample") or []),
+    }).encode("ascii")
+
+    sized = sum(1 for size in records[1::2] if size != UNKNOWN_SIZE)
+    records_offset = _align(HEADER.size)
+    directories_offset = records_offset + 8 * len(records)
+    heap_offset = directories_offset + 8 * len(directory_ends)
+    meta_offset = _align(heap_offset + len(heap))
+    flags = FLAG_BIG_ENDIAN if sys.byteorder == "big" else 0
+    header = HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, flags,
+                         len(records) // 2, sized, len(directory_ends),
+                         records_offset, 8 * len(records), directories_offset, 8 * len(directory_ends),
+                         heap_offset, len(heap), meta_offset, len(meta))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(header.ljust(records_offset, b"\0"))
+            records.tofile(f)
+            directory_ends.tofile(f)
+            f.write(heap)
+            f.write(b"\0" * (meta_offset - heap_offset - len(heap)))
+            f.write(meta)
+        os.replace(temporary, path)
+    except BaseException:
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+        raise
+    return path
+
+
+class _PathColumn:
+    """Paths of a snapshot as a column for compact_store.PathListView.
+
+    ``ends[i * stride]`` holds the heap end of path i in its low END_BITS bits.
+    """
+
+    def __init__(self, heap: memoryview, ends: memoryview, stride: int, start: int):
+        self._heap = heap
+        self._ends = ends
+        self._stride = stride
+        self._start = start
+
+    def __len__(self) -> int:
+        return len(self._ends) // self._stride
+
+    def span(self, i: int) -> Tuple[int, int]:
+        ends = self._ends
+        start = ends[(i - 1) * self._stride] & END_MASK if i else self._start
+        return start, ends[i * self._stride] & END_MASK
+
+    def encoded(self, i: int) -> bytes:
+        start, end = self.span(i)
+        return bytes(self._heap[start:end])
+
+    def path(self, i: int) -> str:
+        start, end = self.span(i)
+        return _decode(self._heap[start:end])
+
+    def iter_encoded(self) -> Iterator[bytes]:
+        heap = self._heap
+        start = self._start
+        for end in self._ends[::self._stride]:
+            end &= END_MASK
+            yield bytes(heap[start:end])
+            start = end
+
+    def __iter__(self) -> Iterator[str]:
+        heap = self._heap
+        start = self._start
+        for end in self._ends[::self._stride]:
+            end &= END_MASK
+            yield _decode(heap[start:end])
+            start = end
+
+    def find(self, encoded: bytes, hint: int = 0) -> int:
+        """Return the position of a path, or -1; ``hint`` is tried first (for in-order lookups)."""
+        n = len(self)
+        if 0 <= hint < n and self.encoded(hint) == encoded:
+            return hint
+        low, high = 0, n
+        while low < high:
+            middle = (low + high) // 2
+            if self.encoded(middle) < encoded:
+                low = middle + 1
+            else:
+                high = middle
+        return low if low < n and self.encoded(low) == encoded else -1
+
+
+class _SnapshotSizeValues(ValuesView):
+    def __iter__(self):
+        mapping = self._mapping
+        if mapping._count == len(mapping._sizes):
+            # No unknown sizes to skip, so the mapped column is iterated as is
+            return iter(mapping._sizes)
+        return (size for size in mapping._sizes if size != UNKNOWN_SIZE)
+
+
+class SnapshotSizesView(FileSizesView):
+    """file_sizes over a snapshot: lookups are binary searches in the sorted paths."""
+
+    def __init__(self, paths: _PathColumn, sizes: memoryview, count: int):
+        super().__init__(paths, sizes, count)
+        self._next = 0
+
+    def __getitem__(self, path: str) -> int:
+        i = self._paths.find(_encode(path), self._next)
+        if i < 0 or self._sizes[i] == UNKNOWN_SIZE:
+            raise KeyError(path)
+        # Callers often look up the paths of file_list in order
+        self._next = i + 1
+        return self._sizes[i]
+
+    def values(self):
+        return _SnapshotSizeValues(self)
+
+    def __contains__(self, path) -> bool:
+        try:
+            self[path]
+        except (KeyError, TypeError, AttributeError):
+            return False
+        return True
+
+
+class Snapshot:
+    """A snapshot file mapped into memory (see write_snapshot for the layout)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError(f"'{path}' is not a file agent snapshot") from None
+        if len(self._mmap) < HEADER.size:
+            raise ValueError(f"'{path}' is not a file agent snapshot")
+        (magic, version, flags, files, sized, directories, records_offset, records_length,
+         directories_offset, directories_length, heap_offset, heap_length,
+         meta_offset, meta_length) = HEADER.unpack_from(self._mmap)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"'{path}' is not a file agent snapshot")
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"Snapshot '{path}' has format version {version}, expected {SNAPSHOT_VERSION}")
+        if bool(flags & FLAG_BIG_ENDIAN) != (sys.byteorder == "big"):
+            raise ValueError(f"Snapshot '{path}' was written on a host with a different byte order")
+        if meta_offset + meta_length > len(self._mmap):
+            raise ValueError(f"Snapshot '{path}' is truncated")
+
+        view = self._view = memoryview(self._mmap)
+        self.records = view[records_offset:records_offset + records_length].cast("q")
+        self.directory_ends = view[directories_offset:directories_offset + directories_length].cast("q")
+        self.heap = view[heap_offset:heap_offset + heap_length]
+        meta = json.loads(bytes(view[meta_offset:meta_offset + meta_length]))
+        self.total_files = files
+        self.sized_files = sized
+        self.total_directories = directories
+        self.root = meta["root"]
+        self.created = meta["created"]
+        self.extensions = meta["extensions"]
+        self.meta = meta
+        self.files = _PathColumn(self.heap, self.records, 2, 0)
+        self.directories = _PathColumn(self.heap, self.directory_ends, 1,
+                                       self.records[-2] & END_MASK if files else 0)
+        self.sizes = self.records[1::2]
+
+    def close(self):
+        """Unmap the file; views returned by file_info() must no longer be used."""
+        for view in (self.sizes, self.records, self.directory_ends, self.heap, self._view):
+            view.release()
+        self._mmap.close()
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def extension(self, i: int) -> str:
+        """The extension of file i (as in file_types)."""
+        return self.extensions[self.records[2 * i] >> END_BITS]
+
+    def file_info(self) -> Dict[str, Any]:
+        """Return a file_info dictionary whose path-keyed entries are views over the mapping."""
+        meta = self.meta
+        return {
+            "total_files": self.total_files,
+            "total_directories": self.total_directories,
+            "file_types": dict(meta["file_types"]),
+            "file_sizes": SnapshotSizesView(self.files, self.sizes, self.sized_files),
+            "directory_structure": PathListView(self.directories),
+            "largest_files": [tuple(entry) for entry in meta["largest_files"]],
+            "file_list": PathListView(self.files),
+            "file_sample": meta["file_sample"],
+            "directory_sample": meta["directory_sample"],
+            "extension_sizes": dict(meta["extension_sizes"]),
+        }
+
+
+def load_snapshot(path: str) -> Dict[str, Any]:
+    """Map a snapshot file and return its file_info (see Snapshot.file_info)."""
+    return Snapshot(path).file_info()
@@ -0,0 +1,517 @@
+#!/usr/bin/env python3
+"""Keep a scanned file_info dictionary up to date while the tree changes.
+
+After the initial scan_directory, FileInfoWatcher subscribes to filesystem
+change events (inotify through ctypes on Linux, periodic polling elsewhere or
+when inotify is unavailable) and applies adds, deletes, renames and size
+changes to the in-memory file_info, so answering a question never needs a
+full rescan. Readers should hold ``watcher.lock`` while they use file_info.
+With a scan_filter the watcher keeps to the paths the scan included, and a
+changed .gitignore or .ignore file triggers a resync.
+"""
+
+import bisect
+import ctypes
+import ctypes.util
+import errno
+import heapq
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, Any, Optional, Set
+
+from file_agent import (DEFAULT_SAMPLE_SIZE, DEFAULT_TOP_N, ScanAccumulator,
+                        _file_extension, _list_directory, invalidate_derived)
+from scan_filter import IGNORE_FILES
+
+# inotify constants from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF |
+              IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    """Minimal ctypes binding for the Linux inotify API."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._rm_watch = libc.inotify_rm_watch
+        self._rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def add_watch(self, path: str) -> int:
+        wd = self._add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def rm_watch(self, wd: int):
+        self._rm_watch(self.fd, wd)
+
+    def read_events(self, timeout: float):
+        """Yield (wd, mask, name) tuples, waiting up to ``timeout`` seconds."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return
+        buf = os.read(self.fd, 64 * 1024)
+        offset = 0
+        while offset < len(buf):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(buf, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(buf[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            yield wd, mask, name
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FileInfoWatcher:
+    """Apply filesystem changes under ``root_path`` to a scanned file_info.
+
+    Without ``file_info`` the watches are set up right away and events queue
+    up until the scan is handed over with ``attach``, before ``start``.
+    """
+
+    def __init__(self, root_path: str, file_info: Optional[Dict[str, Any]], poll_interval: float = 5.0,
+                 use_inotify: Optional[bool] = None, top_n: int = DEFAULT_TOP_N,
+                 sample_size: int = DEFAULT_SAMPLE_SIZE, scan_filter=None):
+        self.root_path = os.path.abspath(root_path)
+        self.poll_interval = poll_interval
+        self.top_n = top_n
+        self.sample_size = sample_size
+        self.scan_filter = scan_filter if scan_filter is not None and scan_filter.active else None
+        self._pruner = self._new_pruner()
+        self.lock = threading.RLock()
+        self.file_info = None
+        if file_info is not None:
+            self.attach(file_info)
+        self.stats = {
+            "mode": None,
+            "events_received": 0,
+            "deltas_applied": 0,
+            "resyncs": 0,
+            "last_event_lag": 0.0,
+            "max_event_lag": 0.0,
+        }
+
+        if use_inotify is None:
+            use_inotify = sys.platform.startswith("linux")
+        self._inotify = None
+        self._watches: Dict[int, str] = {}
+        self._watched_prefixes: Dict[str, int] = {}
+        if use_inotify:
+            try:
+                self._inotify = _Inotify()
+                self._watch_tree(self.root_path, "")
+            except OSError as e:
+                print(f"Warning: inotify unavailable ({e}), falling back to polling")
+                if self._inotify is not None:
+                    self._inotify.close()
+                self._inotify = None
+                self._watches.clear()
+                self._watched_prefixes.clear()
+        self.stats["mode"] = "inotify" if self._inotify else "polling"
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="file-info-watcher", daemon=True)
+
+    def attach(self, file_info: Dict[str, Any]):
+        """Set the scan that events are applied to."""
+        self.file_info = file_info
+        # Files that are listed but have no size (their stat call failed)
+        self._unsized = set(file_info["file_list"]).difference(file_info["file_sizes"])
+        # Positions in file_list and directory_structure, and the entries of each
+        # directory, so an event does not have to search or rebuild those lists
+        self._file_index = {path: i for i, path in enumerate(file_info["file_list"])}
+        self._directory_index = {path: i for i, path in enumerate(file_info["directory_structure"])}
+        self._children: Dict[str, Set[str]] = {}
+        for path in file_info["file_list"]:
+            self._children.setdefault(_parent(path), set()).add(path)
+        for path in file_info["directory_structure"]:
+            self._children.setdefault(_parent(path), set()).add(path)
+        # Samples that lost an entry and are refilled once the current batch is applied
+        self._stale_samples: Set[str] = set()
+
+    def start(self) -> "FileInfoWatcher":
+        if self.file_info is None:
+            raise RuntimeError("attach a scan before starting the watcher")
+        self._thread.start()
+        return self
+
+    def stop(self, wait: bool = True):
+        """Stop watching; with ``wait`` False the thread finishes its last batch on its own."""
+        self._stop.set()
+        if self._thread.ident is None:
+            # Never started, so the thread will not close the inotify descriptor
+            if self._inotify is not None:
+                self._inotify.close()
+        elif wait:
+            self._thread.join()
+
+    # Event loops
+
+    def _run(self):
+        try:
+            if self._inotify is not None:
+                self._run_inotify()
+            else:
+                self._run_polling()
+        finally:
+            if self._inotify is not None:
+                self._inotify.close()
+
+    def _run_inotify(self):
+        while not self._stop.is_set():
+            touched: Set[str] = set()
+            overflow = False
+            received_at = None
+            for wd, mask, name in self._inotify.read_events(timeout=0.5):
+                if received_at is None:
+                    received_at = time.monotonic()
+                self.stats["events_received"] += 1
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                if mask & IN_IGNORED:
+                    prefix = self._watches.pop(wd, None)
+                    if prefix is not None and self._watched_prefixes.get(prefix) == wd:
+                        del self._watched_prefixes[prefix]
+                    continue
+                prefix = self._watches.get(wd)
+                if prefix is None:
+                    continue
+                if name:
+                    touched.add(prefix + name)
+                elif mask & (IN_DELETE_SELF | IN_MOVE_SELF) and prefix:
+                    touched.add(prefix.rstrip(os.sep))
+
+            if received_at is None:
+                continue
+            with self.lock:
+                if self.scan_filter is not None and self.scan_filter.ignore_files and any(
+                        os.path.basename(rel_path) in IGNORE_FILES for rel_path in touched):
+                    # Ignore rules changed: rescan, and watch directories that are no longer ignored
+                    self.resync()
+                    self._watch_tree(self.root_path, "")
+                elif overflow:
+                    self.resync()
+                else:
+                    for rel_path in sorted(touched):
+                        self._reconcile(rel_path)
+                    self._refill_samples()
+                invalidate_derived(self.file_info)
+            self._record_lag(received_at)
+
+    def _run_polling(self):
+        while not self._stop.wait(self.poll_interval):
+            started_at = time.monotonic()
+            fresh = self._scan()
+            with self.lock:
+                self._apply_scan(fresh)
+                invalidate_derived(self.file_info)
+            self._record_lag(started_at)
+
+    def _record_lag(self, detected_at: float):
+        lag = time.monotonic() - detected_at
+        self.stats["last_event_lag"] = lag
+        self.stats["max_event_lag"] = max(self.stats["max_event_lag"], lag)
+
+    # inotify bookkeeping
+
+    def _watch_tree(self, path: str, prefix: str):
+        """Add watches for ``path`` and every real subdirectory below it."""
+        pending = [(path, prefix)]
+        while pending:
+            path, prefix = pending.pop()
+            try:
+                wd = self._inotify.add_watch(path)
+            except OSError as e:
+                if e.errno in (errno.ENOSPC, errno.EMFILE):
+                    raise
+                continue
+            self._watches[wd] = prefix
+            self._watched_prefixes[prefix] = wd
+            _, _, subdirs = _list_directory(path, prefix, self._pruner)
+            pending.extend(subdirs)
+
+    def _unwatch_tree(self, prefix: str):
+        for watched in [p for p in self._watched_prefixes if p.startswith(prefix)]:
+            wd = self._watched_prefixes.pop(watched)
+            # A renamed directory keeps its wd, which may already be registered under the new name
+            if self._watches.get(wd) == watched:
+                del self._watches[wd]
+                self._inotify.rm_watch(wd)
+
+    def _reconcile(self, rel_path: str):
+        """Bring one path in file_info in line with what is on disk now."""
+        path = os.path.join(self.root_path, rel_path)
+        try:
+            st = os.stat(path)
+            is_dir = os.path.isdir(path)
+            is_link = os.path.islink(path)
+        except OSError:
+            st = None
+        if st is not None and self._pruner is not None and not self._pruner.allows(rel_path, is_dir, st.st_size):
+            # Excluded by the scan filter, so handled as if it was gone
+            st = None
+
+        if self._is_known_file(rel_path) and (st is None or is_dir):
+            self._remove_file(rel_path)
+        if rel_path in self._directory_index and (st is None or not is_dir):
+            self._remove_directory(rel_path)
+            if self._inotify is not None:
+                self._unwatch_tree(rel_path + os.sep)
+
+        if st is None:
+            return
+        if is_dir:
+            if rel_path not in self._directory_index:
+                self._add_directory(rel_path)
+                if (not is_link) if self._pruner is None else self._pruner.descends(rel_path, is_link):
+                    self._add_subtree(path, rel_path + os.sep)
+                    if self._inotify is not None:
+                        try:
+                            self._watch_tree(path, rel_path + os.sep)
+                        except OSError as e:
+                            print(f"Warning: cannot watch new directory {rel_path}: {e}")
+        else:
+            self._set_file(rel_path, st.st_size)
+
+    def _add_subtree(self, path: str, prefix: str):
+        pending = [(path, prefix)]
+        while pending:
+            path, prefix = pending.pop()
+            files, directories, subdirs = _list_directory(path, prefix, self._pruner)
+            for rel_path, _, size in files:
+                self._set_file(rel_path, size)
+            for rel_path in directories:
+                if rel_path not in self._directory_index:
+                    self._add_directory(rel_path)
+            pending.extend(subdirs)
+
+    # Polling
+
+    def _new_pruner(self):
+        return self.scan_filter.start(self.root_path) if self.scan_filter is not None else None
+
+    def _scan(self) -> Dict[str, Any]:
+        accumulator = ScanAccumulator(self.top_n, self.sample_size)
+        # A fresh pruner rereads the ignore files; events are then checked against them
+        pruner = self._new_pruner()
+        pending = [(self.root_path, "")]
+        while pending:
+            path, prefix = pending.pop()
+            files, directories, subdirs = _list_directory(path, prefix, pruner)
+            accumulator.add_listing(files, directories)
+            pending.extend(subdirs)
+        self._pruner = pruner
+        return accumulator.result()
+
+    def _apply_scan(self, fresh: Dict[str, Any]):
+        """Apply the differences between file_info and a fresh scan as deltas."""
+        old_sizes = self.file_info["file_sizes"]
+        new_sizes = fresh["file_sizes"]
+        old_files = self._file_index
+        new_files = set(fresh["file_list"])
+        for rel_path in [path for path in old_files if path not in new_files]:
+            self._remove_file(rel_path)
+        for rel_path in new_files:
+            size = new_sizes.get(rel_path)
+            if rel_path not in old_files or old_sizes.get(rel_path) != size:
+                self._set_file(rel_path, size)
+
+        new_dirs = set(fresh["directory_structure"])
+        for rel_path in [path for path in self._directory_index if path not in new_dirs]:
+            # May already be gone with a removed parent
+            if rel_path in self._directory_index:
+                self._remove_directory(rel_path)
+        for rel_path in new_dirs:
+            if rel_path not in self._directory_index:
+                self._add_directory(rel_path)
+        self._refill_samples()
+
+    def resync(self):
+        """Replace file_info contents with a fresh scan (e.g. after an event overflow)."""
+        self.stats["resyncs"] += 1
+        self._apply_scan(self._scan())
+        invalidate_derived(self.file_info)
+
+    # Deltas on file_info
+
+    def _is_known_file(self, rel_path: str) -> bool:
+        return rel_path in self._file_index
+
+    def _set_file(self, rel_path: str, size: Optional[int]):
+        """Add a file or update its size."""
+        file_info = self.file_info
+        sizes = file_info["file_sizes"]
+        extension = _file_extension(os.path.basename(rel_path))
+        if not self._is_known_file(rel_path):
+            file_info["total_files"] += 1
+            file_info["file_types"][extension] = file_info["file_types"].get(extension, 0) + 1
+            self._file_index[rel_path] = len(file_info["file_list"])
+            file_info["file_list"].append(rel_path)
+            self._children.setdefault(_parent(rel_path), set()).add(rel_path)
+            self._add_to_sample("file_sample", rel_path)
+        elif sizes.get(rel_path) == size:
+            return
+
+        old_size = sizes.get(rel_path)
+        if size is None:
+            sizes.pop(rel_path, None)
+            self._unsized.add(rel_path)
+        else:
+            sizes[rel_path] = size
+            self._unsized.discard(rel_path)
+        self._update_extension_size(extension, old_size, size)
+        self._update_largest(rel_path, old_size, size)
+        self.stats["deltas_applied"] += 1
+
+    def _remove_file(self, rel_path: str):
+        file_info = self.file_info
+        extension = _file_extension(os.path.basename(rel_path))
+        file_info["total_files"] -= 1
+        count = file_info["file_types"].get(extension, 0) - 1
+        if count > 0:
+            file_info["file_types"][extension] = count
+        else:
+            file_info["file_types"].pop(extension, None)
+        old_size = file_info["file_sizes"].pop(rel_path, None)
+        self._unsized.discard(rel_path)
+        _remove_indexed(file_info["file_list"], self._file_index, rel_path)
+        self._children.get(_parent(rel_path), set()).discard(rel_path)
+        self._update_extension_size(extension, old_size, None)
+        self._update_largest(rel_path, old_size, None)
+        self._remove_from_sample("file_sample", rel_path)
+        self.stats["deltas_applied"] += 1
+
+    def _add_directory(self, rel_path: str):
+        self.file_info["total_directories"] += 1
+        self._directory_index[rel_path] = len(self.file_info["directory_structure"])
+        self.file_info["directory_structure"].append(rel_path)
+        self._children.setdefault(_parent(rel_path), set()).add(rel_path)
+        self._add_to_sample("directory_sample", rel_path)
+        self.stats["deltas_applied"] += 1
+
+    def _remove_directory(self, rel_path: str):
+        """Remove a directory and everything that was below it."""
+        self._children.get(_parent(rel_path), set()).discard(rel_path)
+        pending = [rel_path]
+        while pending:
+            directory = pending.pop()
+            for path in self._children.pop(directory, ()):
+                if path in self._directory_index:
+                    pending.append(path)
+                else:
+                    self._remove_file(path)
+            _remove_indexed(self.file_info["directory_structure"], self._directory_index, directory)
+            self.file_info["total_directories"] -= 1
+            self._remove_from_sample("directory_sample", directory)
+        self.stats["deltas_applied"] += 1
+
+    def _update_extension_size(self, extension: str, old_size: Optional[int], new_size: Optional[int]):
+        extension_sizes = self.file_info["extension_sizes"]
+        if extension not in self.file_info["file_types"]:
+            extension_sizes.pop(extension, None)
+        elif new_size is not None or extension in extension_sizes:
+            extension_sizes[extension] = extension_sizes.get(extension, 0) + (new_size or 0) - (old_size or 0)
+
+    def _update_largest(self, rel_path: str, old_size: Optional[int], new_size: Optional[int]):
+        """Keep largest_files ranked by (size, path) like StreamingAggregates."""
+        largest = self.file_info["largest_files"]
+        in_top = any(path == rel_path for path, _ in largest)
+
+        if in_top and (new_size is None or new_size < (old_size or 0)):
+            # A top entry shrank or vanished, so recompute from all sizes
+            entries = heapq.nlargest(self.top_n, self.file_info["file_sizes"].items(),
+                                     key=lambda x: (x[1], x[0]))
+        elif new_size is not None and (in_top or len(largest) < self.top_n or
+                                       (new_size, rel_path) > min((size, path) for path, size in largest)):
+            entries = [item for item in largest if item[0] != rel_path]
+            entries.append((rel_path, new_size))
+        else:
+            return
+        entries.sort(key=lambda x: (-x[1], x[0]))
+        largest[:] = entries[:self.top_n]
+
+    def _add_to_sample(self, key: str, rel_path: str):
+        sample = self.file_info[key]
+        if len(sample) < self.sample_size or rel_path < sample[-1]:
+            bisect.insort(sample, rel_path)
+            del sample[self.sample_size:]
+
+    def _remove_from_sample(self, key: str, rel_path: str):
+        sample = self.file_info[key]
+        index = bisect.bisect_left(sample, rel_path)
+        if index < len(sample) and sample[index] == rel_path:
+            del sample[index]
+            self._stale_samples.add(key)
+
+    def _refill_samples(self):
+        """Refill samples that lost entries from the lists they sample."""
+        for key in self._stale_samples:
+            source_key = "file_list" if key == "file_sample" else "directory_structure"
+            self.file_info[key][:] = heapq.nsmallest(self.sample_size, self.file_info[source_key])
+        self._stale_samples.clear()
+
+
+def _parent(path: str) -> str:
+    return path.rpartition(os.sep)[0]
+
+
+def _remove_indexed(items: list, index: Dict[str, int], rel_path: str):
+    """Remove a path from a list in O(1) by moving the last entry into its slot."""
+    position = index.pop(rel_path, None)
+    if position is None:
+        return
+    last = items.pop()
+    if position < len(items):
+        items[position] = last
+        index[last] = position
+
+
+def watch(root_path: str, file_info: Dict[str, Any], **kwargs) -> FileInfoWatcher:
+    """Start a watcher that keeps ``file_info`` for ``root_path`` up to date."""
+    return FileInfoWatcher(root_path, file_info, **kwargs).start()
+
+
+def scan_and_watch(root_path: str, scan: Callable[[], Dict[str, Any]], **kwargs) -> FileInfoWatcher:
+    """Scan ``root_path`` with ``scan()`` and start a watcher that keeps the result up to date.
+
+    The watches are set up before the scan, so changes made while it runs
+    are queued and applied as soon as the watcher starts.
+    """
+    watcher = FileInfoWatcher(root_path, None, **kwargs)
+    try:
+        watcher.attach(scan())
+    except BaseException:
+        watcher.stop()
+        raise
+    return watcher.start()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Sorted index of file sizes for range, percentile and histogram queries.
+
+file_info keeps sizes in a path -> size dict and the top-N largest files, so
+"files between 10 MB and 1 GB", "the median size" or "the 500 largest
+files" are otherwise a pass over every file. SizeIndex sorts the sizes once
+per scan, keeps prefix sums next to them, and answers with binary searches:
+counts and byte totals of a range in O(log n), the files of a range or the
+top N in O(log n + k), percentiles in O(1) and a log-bucket histogram in
+O(buckets * log n).
+
+Queries can be limited to extensions; each extension gets its own sorted
+partition, built with one pass over the index the first time it is asked
+for.
+
+    index = size_index(file_info)
+    index.count_between(10 * 1024**2, 1024**3)
+    index.percentile(90, extensions=".log")
+"""
+
+import heapq
+import math
+import os
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, islice
+from operator import itemgetter
+from typing import Dict, Any, Iterable, List, Optional, Tuple, Union
+
+SIZE_INDEX_KEY = "size_index"
+# Bucket boundaries are powers of this; powers of 4 include 1 KB, 1 MB and 1 GB
+DEFAULT_HISTOGRAM_BASE = 4
+
+Extensions = Optional[Union[str, Iterable[str]]]
+
+
+class SortedSizes:
+    """Paths sorted by size (equal sizes in scan order), with prefix sums of the sizes."""
+
+    __slots__ = ("paths", "sizes", "cumulative")
+
+    def __init__(self, paths: List[str], sizes: Iterable[int]):
+        self.paths = paths
+        self.sizes = array("q", sizes)
+        self.cumulative = array("q", accumulate(self.sizes, initial=0))
+
+    def __len__(self) -> int:
+        return len(self.sizes)
+
+    def span(self, low: Optional[int], high: Optional[int]) -> Tuple[int, int]:
+        """Return the positions [i, j) of the sizes with low <= size <= high."""
+        i = 0 if low is None else bisect_left(self.sizes, low)
+        j = len(self.sizes) if high is None else bisect_right(self.sizes, high)
+        return i, max(i, j)
+
+    def total(self, i: int, j: int) -> int:
+        return self.cumulative[j] - self.cumulative[i]
+
+    def entries(self, i: int, j: int) -> List[Tuple[str, int]]:
+        return list(zip(self.paths[i:j], self.sizes[i:j]))
+
+    def largest(self, n: int) -> List[Tuple[str, int]]:
+        """Return the n largest files, largest first and ties by path like largest_files."""
+        n = min(n, len(self.sizes))
+        if n <= 0:
+            return []
+        # Files at the cut-off size are taken in path order, not from the end of the array
+        threshold = self.sizes[len(self.sizes) - n]
+        above = bisect_right(self.sizes, threshold)
+        at = bisect_left(self.sizes, threshold)
+        ties = heapq.nsmallest(n - (len(self.sizes) - above), self.paths[at:above])
+        entries = self.entries(above, len(self.sizes)) + [(path, threshold) for path in ties]
+        entries.sort(key=lambda entry: (-entry[1], entry[0]))
+        return entries
+
+
+class SizeIndex:
+    """Sorted file sizes of a scan, optionally partitioned by extension."""
+
+    def __init__(self, file_sizes: Dict[str, int]):
+        # Sorting on the size alone is about three times faster than on (size, path)
+        items = sorted(file_sizes.items(), key=itemgetter(1))
+        self.all = SortedSizes(list(map(itemgetter(0), items)), map(itemgetter(1), items))
+        self._partitions: Dict[str, SortedSizes] = {}
+
+    def __len__(self) -> int:
+        return len(self.all)
+
+    def partition(self, extension: str) -> SortedSizes:
+        """Return the sorted sizes of the files with one extension (as in file_types).
+
+        Built with one pass over the index the first time an extension is asked for.
+        """
+        partition = self._partitions.get(extension)
+        if partition is None:
+            from file_agent import _file_extension
+            entries = zip(self.all.paths, self.all.sizes)
+            if extension != "no_extension":
+                # Cheap suffix test first; _file_extension decides for the few that pass
+                n = len(extension)
+                entries = ((path, size) for path, size in entries if path[-n:].lower() == extension)
+            entries = [(path, size) for path, size in entries
+                       if _file_extension(path.rpartition(os.sep)[2]) == extension]
+            partition = self._partitions[extension] = SortedSizes(list(map(itemgetter(0), entries)),
+                                                                   map(itemgetter(1), entries))
+        return partition
+
+    def _select(self, extensions: Extensions) -> List[SortedSizes]:
+        if extensions is None:
+            return [self.all]
+        if isinstance(extensions, str):
+            extensions = [extensions]
+        return [self.partition(ext if ext == "no_extension" else ext.lower()) for ext in set(extensions)]
+
+    def count_between(self, low: Optional[int] = None, high: Optional[int] = None,
+                      extensions: Extensions = None) -> int:
+        """Number of files with low <= size <= high (either bound may be None)."""
+        return sum(j - i for i, j in (partition.span(low, high) for partition in self._select(extensions)))
+
+    def total_between(self, low: Optional[int] = None, high: Optional[int] = None,
+                      extensions: Extensions = None) -> int:
+        """Total bytes of the files with low <= size <= high."""
+        return sum(partition.total(*partition.span(low, high)) for partition in self._select(extensions))
+
+    def files_between(self, low: Optional[int] = None, high: Optional[int] = None,
+                      extensions: Extensions = None, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """(path, size) of the files with low <= size <= high, smallest first, at most ``limit``.
+
+        Files of equal size are listed in scan order.
+        """
+        ranges = []
+        for partition in self._select(extensions):
+            i, j = partition.span(low, high)
+            if limit is not None:
+                j = min(j, i + limit)
+            ranges.append(partition.entries(i, j))
+        if len(ranges) == 1:
+            return ranges[0]
+        return list(islice(heapq.merge(*ranges, key=itemgetter(1)), limit))
+
+    def largest(self, n: int = 10, extensions: Extensions = None) -> List[Tuple[str, int]]:
+        """The n largest files as (path, size), largest first."""
+        candidates = [entry for partition in self._select(extensions) for entry in partition.largest(n)]
+        return heapq.nsmallest(n, candidates, key=lambda entry: (-entry[1], entry[0]))
+
+    def smallest(self, n: int = 10, extensions: Extensions = None) -> List[Tuple[str, int]]:
+        """The n smallest files as (path, size), smallest first."""
+        return self.files_between(extensions=extensions, limit=n)
+
+    def percentile(self, p: float, extensions: Extensions = None) -> Optional[int]:
+        """The nearest-rank p-th percentile of the sizes (0 is the smallest), or None without files."""
+        partitions = self._select(extensions)
+        n = sum(len(partition) for partition in partitions)
+        if n == 0:
+            return None
+        rank = min(n, max(1, math.ceil(p / 100 * n)))
+        if len(partitions) == 1:
+            return partitions[0].sizes[rank - 1]
+        # Smallest size with at least ``rank`` files at or below it
+        low = min(partition.sizes[0] for partition in partitions if len(partition))
+        high = max(partition.sizes[-1] for partition in partitions if len(partition))
+        while low < high:
+            middle = (low + high) // 2
+            if sum(bisect_right(partition.sizes, middle) for partition in partitions) >= rank:
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def median(self, extensions: Extensions = None) -> Optional[int]:
+        return self.percentile(50, extensions)
+
+    def histogram(self, base: int = DEFAULT_HISTOGRAM_BASE,
+                  extensions: Extensions = None) -> List[Tuple[int, int, int, int]]:
+        """Log-bucket histogram as (low, high, files, bytes) with low <= size < high.
+
+        Empty files get the bucket [0, 1); the others [1, base), [base, base**2), ...
+        up to the largest file.
+        """
+        partitions = self._select(extensions)
+        largest = max((partition.sizes[-1] for partition in partitions if len(partition)), default=None)
+        if largest is None:
+            return []
+        buckets = []
+        low, high = 0, 1
+        while low <= largest:
+            files = total = 0
+            for partition in partitions:
+                i, j = partition.span(low, high - 1)
+                files += j - i
+                total += partition.total(i, j)
+            buckets.append((low, high, files, total))
+            low, high = high, high * base
+        return buckets
+
+
+def size_index(file_info: Dict[str, Any]) -> SizeIndex:
+    """Return the size index of a scan, building it on first use and caching it in file_info."""
+    index = file_info.get(SIZE_INDEX_KEY)
+    if index is None:
+        index = file_info[SIZE_INDEX_KEY] = SizeIndex(file_info["file_sizes"])
+    return index
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""Stored scan snapshots and what changed between two of them.
+
+SnapshotStore keeps timestamped snapshots (see scan_snapshot) of one root in
+the cache directory, so a daily run can save its scan and compare it with
+the one before. diff_snapshots walks the path-sorted records of two
+snapshots in a single merge pass: O(n) time and, apart from the two mapped
+files, memory bounded by the number of extensions and ``top_n``. It counts
+added, removed and resized files with their bytes, the net change per
+extension, added and removed directories, and keeps the largest additions,
+removals, growths and shrinks. iter_changes streams every changed file for
+callers that want the full sets.
+
+    diff = diff_snapshots(Snapshot(old_path), Snapshot(new_path))
+    diff.net_bytes, diff.extension('.log').bytes, diff.grown(5)
+"""
+
+import hashlib
+import heapq
+import os
+import time
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+CHANGES_KEY = "changes"
+# Snapshots kept per root by SnapshotStore.save
+DEFAULT_HISTORY_KEEP = 30
+SNAPSHOT_NAME_FORMAT = "%Y-%m-%dT%H-%M-%S"
+SNAPSHOT_SUFFIX = ".snap"
+LATEST = ("latest", "last", "previous")
+
+
+class SnapshotStore:
+    """Timestamped snapshots of one root under ``<cache_dir>/history``, oldest first."""
+
+    def __init__(self, root_path: str, cache_dir: Optional[str] = None):
+        from file_agent import DEFAULT_CACHE_DIR
+        self.root_path = os.path.abspath(root_path)
+        digest = hashlib.sha1(self.root_path.encode("utf-8", "surrogateescape")).hexdigest()[:16]
+        self.directory = os.path.join(cache_dir or DEFAULT_CACHE_DIR, "history", digest)
+
+    def names(self) -> List[str]:
+        """Names of the stored snapshots (their timestamps), oldest first."""
+        try:
+            entries = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-len(SNAPSHOT_SUFFIX)] for name in entries if name.endswith(SNAPSHOT_SUFFIX))
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name + SNAPSHOT_SUFFIX)
+
+    def save(self, file_info: Dict[str, Any], keep: int = DEFAULT_HISTORY_KEEP) -> str:
+        """Store a scan of the root as a new snapshot and return its path; only the newest ``keep`` are kept."""
+        from scan_snapshot import write_snapshot
+        name = time.strftime(SNAPSHOT_NAME_FORMAT)
+        existing = set(self.names())
+        stem, n = name, 1
+        while name in existing:
+            n += 1
+            name = f"{stem}-{n}"
+        path = write_snapshot(file_info, self.path(name), self.root_path)
+        for old in self.names()[:-keep] if keep > 0 else []:
+            try:
+                os.remove(self.path(old))
+            except OSError:
+                pass
+        return path
+
+    def resolve(self, spec: str) -> str:
+        """Return the snapshot file meant by ``spec``.
+
+        ``spec`` is a snapshot file, "latest" for the newest stored snapshot,
+        or the name of a stored one or its beginning (e.g. the date
+        "2026-10-17" for the last snapshot of that day).
+        """
+        if os.path.isfile(spec):
+            return spec
+        names = self.names()
+        if spec.lower() in LATEST:
+            matches = names
+        elif spec in names:
+            matches = [spec]
+        else:
+            matches = [name for name in names if name.startswith(spec)]
+        if not matches:
+            stored = ", ".join(names[-5:]) or "none"
+            raise ValueError(f"No snapshot '{spec}' of {self.root_path} (latest stored: {stored})")
+        return self.path(matches[-1])
+
+
+def format_delta(delta: int, format_size: Callable[[int], str]) -> str:
+    """Format a signed byte difference, e.g. "+1.5 MB" or "-200.0 B"."""
+    return ("-" if delta < 0 else "+") + format_size(abs(delta))
+
+
+class ExtensionChange:
+    """Changes to the files of one extension (or a group of them)."""
+
+    __slots__ = ("added", "removed", "resized", "bytes")
+
+    def __init__(self):
+        self.added = 0
+        self.removed = 0
+        self.resized = 0
+        # Net bytes: added minus removed plus the size changes of resized files
+        self.bytes = 0
+
+    @property
+    def files(self) -> int:
+        """Net change of the number of files."""
+        return self.added - self.removed
+
+    def __repr__(self) -> str:
+        return (f"ExtensionChange(added={self.added}, removed={self.removed}, resized={self.resized}, "
+                f"bytes={self.bytes})")
+
+
+class SnapshotDiff:
+    """What changed between an old and a new snapshot (see diff_snapshots)."""
+
+    def __init__(self, old_label: str, new_label: str, top_n: int):
+        self.old_label = old_label
+        self.new_label = new_label
+        self.top_n = top_n
+        self.added_files = 0
+        self.added_bytes = 0
+        self.removed_files = 0
+        self.removed_bytes = 0
+        self.resized_files = 0
+        # Net size change of the files in both snapshots
+        self.resized_bytes = 0
+        self.added_directories = 0
+        self.removed_directories = 0
+        self.extensions: Dict[str, ExtensionChange] = {}
+        self.largest_added: List[Tuple[str, int]] = []
+        self.largest_removed: List[Tuple[str, int]] = []
+        self.most_grown: List[Tuple[str, int, int]] = []
+        self.most_shrunk: List[Tuple[str, int, int]] = []
+
+    @property
+    def net_bytes(self) -> int:
+        return self.added_bytes - self.removed_bytes + self.resized_bytes
+
+    @property
+    def net_files(self) -> int:
+        return self.added_files - self.removed_files
+
+    def extension(self, extensions: Union[str, Iterable[str]]) -> ExtensionChange:
+        """The changes of one extension ('.log') or the sum over several."""
+        if isinstance(extensions, str):
+            extensions = [extensions]
+        total = ExtensionChange()
+        for ext in set(extensions):
+            change = self.extensions.get(ext if ext == "no_extension" else ext.lower())
+            if change is not None:
+                total.added += change.added
+                total.removed += change.removed
+                total.resized += change.resized
+                total.bytes += change.bytes
+        return total
+
+    def added(self, n: int = 10) -> List[Tuple[str, int]]:
+        """The largest added files as (path, size), at most ``top_n``."""
+        return self.largest_added[:n]
+
+    def removed(self, n: int = 10) -> List[Tuple[str, int]]:
+        """The largest removed files as (path, size), at most ``top_n``."""
+        return self.largest_removed[:n]
+
+    def grown(self, n: int = 10) -> List[Tuple[str, int, int]]:
+        """The files that grew the most as (path, old size, new size), at most ``top_n``."""
+        return self.most_grown[:n]
+
+    def shrunk(self, n: int = 10) -> List[Tuple[str, int, int]]:
+        """The files that shrank the most as (path, old size, new size), at most ``top_n``."""
+        return self.most_shrunk[:n]
+
+    def by_extension(self, n: Optional[int] = None) -> List[Tuple[str, ExtensionChange]]:
+        """Extensions ranked by their absolute net byte change."""
+        ranked = sorted(self.extensions.items(), key=lambda x: (-abs(x[1].bytes), x[0]))
+        return ranked[:n] if n is not None else ranked
+
+    def describe(self, format_size: Callable[[int], str] = str, n: int = 5) -> str:
+        """A few lines summarizing the changes, for summaries and prompts."""
+        lines = [
+            f"Changes since {self.old_label}:",
+            f"  Net: {self.net_files:+,} files, {format_delta(self.net_bytes, format_size)}",
+            f"  Added: {self.added_files:,} files ({format_size(self.added_bytes)}), "
+            f"{self.added_directories:,} directories",
+            f"  Removed: {self.removed_files:,} files ({format_size(self.removed_bytes)}), "
+            f"{self.removed_directories:,} directories",
+            f"  Resized: {self.resized_files:,} files ({format_delta(self.resized_bytes, format_size)})",
+        ]
+        ranked = [(ext, change) for ext, change in self.by_extension(n) if change.bytes or change.files]
+        if ranked:
+            lines.append("  By extension: " + ", ".join(
+                f"{ext} {format_delta(change.bytes, format_size)} ({change.files:+,} files)"
+                for ext, change in ranked))
+        if self.most_grown:
+            lines.append("  Grew most: " + ", ".join(
+                f"{path} {format_delta(new - old, format_size)}" for path, old, new in self.most_grown[:n]))
+        if self.largest_added:
+            lines.append("  Largest added: " + ", ".join(
+                f"{path} ({format_size(size)})" for path, size in self.largest_added[:n]))
+        if self.largest_removed:
+            lines.append("  Largest removed: " + ", ".join(
+                f"{path} ({format_size(size)})" for path, size in self.largest_removed[:n]))
+        return "\n".join(lines)
+
+    def key(self) -> Tuple:
+        """Identifies the compared snapshots, e.g. for caching answers that depend on the diff."""
+        return self.old_label, self.new_label, self.added_files, self.removed_files, self.resized_files, \
+            self.net_bytes
+
+
+def _changed_positions(old_paths: Iterator[bytes], new_paths: Iterator[bytes], old_sizes=None, new_sizes=None):
+    """Merge two sorted path streams; yield (old position, new position) of the entries that differ.
+
+    A position is -1 for a path that is only in the other stream. Without
+    sizes only paths in one stream are reported.
+    """
+    i = j = 0
+    a = next(old_paths, None)
+    b = next(new_paths, None)
+    while a is not None and b is not None:
+        if a == b:
+            if old_sizes is not None and old_sizes[i] != new_sizes[j]:
+                yield i, j
+            i += 1
+            j += 1
+            a = next(old_paths, None)
+            b = next(new_paths, None)
+        elif a < b:
+            yield i, -1
+            i += 1
+            a = next(old_paths, None)
+        else:
+            yield -1, j
+            j += 1
+            b = next(new_paths, None)
+    while a is not None:
+        yield i, -1
+        i += 1
+        a = next(old_paths, None)
+    while b is not None:
+        yield -1, j
+        j += 1
+        b = next(new_paths, None)
+
+
+def iter_changes(old, new) -> Iterator[Tuple[str, str, Optional[int], Optional[int]]]:
+    """Yield (kind, path, old size, new size) for every changed file of two Snapshots, in path order.
+
+    ``kind`` is "added", "removed" or "resized"; unknown sizes are None, and
+    a file whose size is unknown in either snapshot is not reported as resized.
+    """
+    from scan_snapshot import UNKNOWN_SIZE
+    for i, j in _changed_positions(old.files.iter_encoded(), new.files.iter_encoded(), old.sizes, new.sizes):
+        old_size = old.sizes[i] if i >= 0 else UNKNOWN_SIZE
+        new_size = new.sizes[j] if j >= 0 else UNKNOWN_SIZE
+        if i < 0:
+            yield "added", new.files.path(j), None, None if new_size == UNKNOWN_SIZE else new_size
+        elif j < 0:
+            yield "removed", old.files.path(i), None if old_size == UNKNOWN_SIZE else old_size, None
+        elif old_size != UNKNOWN_SIZE and new_size != UNKNOWN_SIZE:
+            yield "resized", new.files.path(j), old_size, new_size
+
+
+def _label(snapshot) -> str:
+    name = os.path.basename(snapshot.path)
+    if name.endswith(SNAPSHOT_SUFFIX):
+        name = name[:-len(SNAPSHOT_SUFFIX)]
+    return f"{name} ({time.strftime('%Y-%m-%d %H:%M', time.localtime(snapshot.created))})"
+
+
+def _keep_top(heap: list, n: int, entry: tuple):
+    if len(heap) < n:
+        heapq.heappush(heap, entry)
+    elif entry > heap[0]:
+        heapq.heapreplace(heap, entry)
+
+
+def diff_snapshots(old, new, top_n: int = 10) -> SnapshotDiff:
+    """Compare two Snapshots in one merge pass over their sorted records."""
+    from file_agent import _file_extension
+    diff = SnapshotDiff(_label(old), _label(new), top_n)
+    extensions = diff.extensions
+    # Heaps of (size or change, -order, path, ...) keep the top_n entries; paths arrive sorted,
+    # so on ties the later (larger) path is the one dropped
+    added, removed, grown, shrunk = [], [], [], []
+
+    def change_of(extension: str) -> ExtensionChange:
+        change = extensions.get(extension)
+        if change is None:
+            change = extensions[extension] = ExtensionChange()
+        return change
+
+    for order, (kind, path, old_size, new_size) in enumerate(iter_changes(old, new)):
+        change = change_of(_file_extension(path.rpartition(os.sep)[2]))
+        if kind == "added":
+            size = new_size or 0
+            diff.added_files += 1
+            diff.added_bytes += size
+            change.added += 1
+            change.bytes += size
+            _keep_top(added, top_n, (size, -order, path))
+        elif kind == "removed":
+            size = old_size or 0
+            diff.removed_files += 1
+            diff.removed_bytes += size
+            change.removed += 1
+            change.bytes -= size
+            _keep_top(removed, top_n, (size, -order, path))
+        else:
+            delta = new_size - old_size
+            diff.resized_files += 1
+            diff.resized_bytes += delta
+            change.resized += 1
+            change.bytes += delta
+            _keep_top(grown if delta > 0 else shrunk, top_n, (abs(delta), -order, path, old_size, new_size))
+
+    for i, j in _changed_positions(old.directories.iter_encoded(), new.directories.iter_encoded()):
+        if i < 0:
+            diff.added_directories += 1
+        else:
+            diff.removed_directories += 1
+
+    diff.largest_added = [(path, size) for size, _, path in sorted(added, reverse=True)]
+    diff.largest_removed = [(path, size) for size, _, path in sorted(removed, reverse=True)]
+    diff.most_grown = [entry[2:] for entry in sorted(grown, reverse=True)]
+    diff.most_shrunk = [entry[2:] for entry in sorted(shrunk, reverse=True)]
+    return diff
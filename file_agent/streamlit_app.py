@@ -1,9 +1,149 @@
 #!/usr/bin/env python3
 import streamlit as st
+import contextlib
+import hashlib
 import os
 import tempfile
-from pathlib import Path
-from file_agent import FileSystemAgent
+import threading
+import time
+import weakref
+from file_agent import DEFAULT_CACHE_DIR, FileSystemAgent
+from dir_rollup import directory_rollup
+from size_index import size_index
+from scan_filter import ScanFilter, parse_size
+from scan_snapshot import load_snapshot
+
+# Scan results kept in memory: at most this many folders, each for at most this long
+SCAN_CACHE_ENTRIES = 4
+SCAN_CACHE_TTL = 600
+# Watched folders hold a thread and inotify watches each, so keep fewer of them
+WATCH_CACHE_ENTRIES = 2
+WATCH_CACHE_TTL = 3600
+# Scans shared with other app processes and CLI runs as memory-mapped snapshots
+SNAPSHOT_DIR = os.path.join(DEFAULT_CACHE_DIR, "snapshots")
+# The folder fingerprint only sees changes one level deep, so older snapshots are rescanned anyway
+SNAPSHOT_MAX_AGE = SCAN_CACHE_TTL
+
+@st.cache_resource(show_spinner=False)
+def get_agent(api_key: str) -> FileSystemAgent:
+    """Create the agent (and its OpenAI client and answer cache) once per API key."""
+    return FileSystemAgent(api_key)
+
+def folder_fingerprint(folder_path: str) -> tuple:
+    """Cheap change marker for a folder: the mtimes of the folder and its direct subfolders."""
+    if not os.path.isdir(folder_path):
+        raise ValueError(f"Directory '{folder_path}' does not exist")
+    subfolders = []
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subfolders.append((entry.name, entry.stat(follow_symlinks=False).st_mtime_ns))
+    return os.stat(folder_path).st_mtime_ns, tuple(sorted(subfolders))
+
+def snapshot_path(folder_path: str, filter_key: tuple) -> str:
+    """Where the shared snapshot of a folder scanned with the given filters is kept."""
+    digest = hashlib.sha1(repr((folder_path, filter_key)).encode("utf-8", "surrogateescape")).hexdigest()
+    return os.path.join(SNAPSHOT_DIR, digest[:16] + ".snap")
+
+def load_fresh_snapshot(path: str, fingerprint: tuple):
+    """Load a snapshot written after the newest change in the folder fingerprint, or return None.
+    
+    Snapshots older than SNAPSHOT_MAX_AGE are not used either, as deeper changes do not show up in the fingerprint.
+    """
+    newest = max([fingerprint[0]] + [mtime for _, mtime in fingerprint[1]])
+    try:
+        written = os.stat(path).st_mtime_ns
+        if written < newest or time.time_ns() - written > SNAPSHOT_MAX_AGE * 10**9:
+            return None
+        return load_snapshot(path)
+    except (OSError, ValueError):
+        return None
+
+def clear_snapshots():
+    """Delete the shared snapshots so the next analyses scan again.
+    
+    Processes that mapped one keep their copy. Where a mapped file cannot be
+    removed (Windows) it is marked stale by resetting its mtime instead.
+    """
+    try:
+        entries = os.scandir(SNAPSHOT_DIR)
+    except OSError:
+        return
+    with entries:
+        for entry in entries:
+            if not entry.name.endswith(".snap"):
+                continue
+            try:
+                os.remove(entry.path)
+            except OSError:
+                try:
+                    os.utime(entry.path, ns=(0, 0))
+                except OSError:
+                    pass
+
+class BackgroundScan:
+    """Scan a folder in a background thread, exposing running counts while it works."""
+    
+    def __init__(self, agent: FileSystemAgent, folder_path: str, use_index: bool, scan_filter: ScanFilter = None,
+                 snapshot: str = None, fingerprint: tuple = None):
+        self.files = 0
+        self.directories = 0
+        self.file_info = None
+        self.error = None
+        self.done = threading.Event()
+        self._thread = threading.Thread(target=self._run,
+                                        args=(agent, folder_path, use_index, scan_filter, snapshot, fingerprint),
+                                        daemon=True)
+        self._thread.start()
+    
+    def _progress(self, files: int, directories: int):
+        self.files = files
+        self.directories = directories
+    
+    def _run(self, agent: FileSystemAgent, folder_path: str, use_index: bool, scan_filter: ScanFilter,
+             snapshot: str, fingerprint: tuple):
+        try:
+            if snapshot is not None:
+                self.file_info = load_fresh_snapshot(snapshot, fingerprint)
+            if self.file_info is None:
+                self.file_info = agent.scan_directory(folder_path, use_index=use_index, progress=self._progress,
+                                                      scan_filter=scan_filter, snapshot=snapshot)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done.set()
+
+@st.cache_resource(ttl=SCAN_CACHE_TTL, max_entries=SCAN_CACHE_ENTRIES, show_spinner=False)
+def start_scan(folder_path: str, fingerprint: tuple, use_index: bool, filter_key: tuple, share_snapshot: bool,
+               _agent: FileSystemAgent, _scan_filter: ScanFilter) -> BackgroundScan:
+    """Start (or reuse) the scan of a folder; reruns share it until the folder or the filters change or it expires.
+    
+    With ``share_snapshot`` a fresh snapshot left by another process is mapped
+    instead of scanning, and new scans are written as snapshots.
+    """
+    snapshot = snapshot_path(folder_path, filter_key) if share_snapshot else None
+    return BackgroundScan(_agent, folder_path, use_index, _scan_filter, snapshot, fingerprint)
+
+class WatchedFolder:
+    """The live file_info of a watched folder.
+    
+    The watcher is stopped once the handle is garbage collected, i.e. after
+    the resource cache evicted it and no rerun is still using it.
+    """
+    
+    def __init__(self, watcher):
+        self.file_info = watcher.file_info
+        self.lock = watcher.lock
+        self.stats = watcher.stats
+        weakref.finalize(self, watcher.stop, wait=False)
+
+@st.cache_resource(ttl=WATCH_CACHE_TTL, max_entries=WATCH_CACHE_ENTRIES, show_spinner=False)
+def start_watcher(folder_path: str, use_index: bool, filter_key: tuple, _agent: FileSystemAgent,
+                  _scan_filter: ScanFilter) -> WatchedFolder:
+    """Scan a folder once and keep its file_info live until it expires or other folders push it out."""
+    from scan_watch import watch
+    file_info = _agent.scan_directory(folder_path, use_index=use_index, scan_filter=_scan_filter)
+    return WatchedFolder(watch(folder_path, file_info, scan_filter=_scan_filter))
 
 def main():
     st.set_page_config(
@@ -30,6 +170,67 @@ def main():
         if not api_key:
             api_key = os.getenv("OPENAI_API_KEY")
         
+        use_index = st.checkbox(
+            "Use persistent scan index",
+            help="Keep a scan index on disk and only re-list directories that changed since the last analysis."
+        )
+        
+        watch_mode = st.checkbox(
+            "Watch folder for changes",
+            help="Scan once and keep the results live from filesystem change events instead of rescanning on every analysis."
+        )
+        
+        share_snapshot = st.checkbox(
+            "Share scans through snapshot files",
+            help="Write scans as memory-mapped snapshots that other app processes and sessions load in milliseconds "
+                 "instead of rescanning, as long as the folder has not changed since."
+        )
+        
+        find_duplicates = st.checkbox(
+            "Find duplicate files",
+            help="Hash files that share a size to find identical copies. Hashes are cached, so repeat analyses are fast."
+        )
+        
+        with st.expander("🧹 Scan filters"):
+            exclude = st.text_area(
+                "Exclude globs",
+                placeholder="node_modules\n*.pyc\nbuild/",
+                help="One .gitignore-style pattern per line. Excluded folders are skipped without being listed."
+            )
+            include = st.text_area(
+                "Include globs",
+                placeholder="*.py\n*.md",
+                help="If given, only files matching one of these patterns are counted."
+            )
+            ignore_files = st.checkbox(
+                "Honour .gitignore and .ignore files",
+                help="Skip what the ignore files in the folder exclude, and version control folders like .git."
+            )
+            limit_depth = st.checkbox("Limit depth")
+            max_depth = st.number_input("Max depth", min_value=0, value=3, disabled=not limit_depth,
+                                        help="Folder levels below the selected folder to descend into.")
+            min_size = st.text_input("Minimum file size", placeholder="e.g. 4K or 1M",
+                                     help="Skip files smaller than this.")
+            one_file_system = st.checkbox("Stay on one file system",
+                                          help="Do not descend into folders on other mounts.")
+            follow_symlinks = st.checkbox("Follow symlinked folders",
+                                          help="Each folder is still listed once, so symlink loops are skipped.")
+        try:
+            min_size = parse_size(min_size) if min_size.strip() else None
+        except ValueError as e:
+            st.sidebar.error(str(e))
+            min_size = None
+        scan_filter = ScanFilter(include=[line.strip() for line in include.splitlines() if line.strip()],
+                                 exclude=[line.strip() for line in exclude.splitlines() if line.strip()],
+                                 ignore_files=ignore_files, max_depth=int(max_depth) if limit_depth else None,
+                                 min_size=min_size, one_file_system=one_file_system,
+                                 follow_symlinks=follow_symlinks)
+        
+        if st.button("🔄 Rescan folders",
+                     help="Forget cached scan results and shared snapshots so the next analysis scans again."):
+            start_scan.clear()
+            clear_snapshots()
+        
         st.markdown("---")
         st.markdown("### How to use:")
         st.markdown("1. Enter your OpenAI API key")
@@ -103,14 +304,40 @@ def main():
             st.error("Please enter a question.")
             return
         
+        watcher = None
+        # The lock of a watched folder, held only while file_info is read, never during LLM calls or hashing
+        scan_lock = None
+        reading = contextlib.nullcontext()
         try:
-            # Initialize agent
-            with st.spinner("Initializing agent..."):
-                agent = FileSystemAgent(api_key)
+            # Initialize agent (shared across reruns)
+            agent = get_agent(api_key)
             
-            # Scan directory
-            with st.spinner(f"Scanning directory: {folder_path}"):
-                file_info = agent.scan_directory(folder_path)
+            # Scan directory (or reuse cached results, or the live results of a watched folder)
+            if watch_mode:
+                with st.spinner(f"Scanning directory: {folder_path}"):
+                    watched = start_watcher(os.path.abspath(folder_path), use_index, scan_filter.key(), agent,
+                                            scan_filter)
+                watcher = watched
+                scan_lock = reading = watched.lock
+                file_info = watcher.file_info
+            else:
+                folder_path = os.path.abspath(folder_path)
+                scan = start_scan(folder_path, folder_fingerprint(folder_path), use_index, scan_filter.key(),
+                                  share_snapshot, agent, scan_filter)
+                if not scan.done.is_set():
+                    status = st.empty()
+                    progress = st.progress(0.0)
+                    while not scan.done.wait(0.25):
+                        status.text(f"Scanning {folder_path}: {scan.files:,} files in "
+                                    f"{scan.directories:,} directories so far...")
+                        # The total is unknown until the scan ends, so the bar creeps towards full
+                        progress.progress(scan.files / (scan.files + 10_000))
+                    status.empty()
+                    progress.empty()
+                if scan.error is not None:
+                    start_scan.clear()
+                    raise scan.error
+                file_info = scan.file_info
             
             # Display results
             st.success("✅ Analysis complete!")
@@ -118,7 +345,8 @@ def main():
             # Show verbose summary if requested
             if verbose:
                 st.header("📊 Detailed File System Summary")
-                summary = agent.create_summary(file_info, folder_path)
+                with reading:
+                    summary = agent.create_summary(file_info, folder_path)
                 st.text(summary)
                 st.markdown("---")
             
@@ -127,46 +355,158 @@ def main():
             st.markdown(f"**Question:** {question}")
             
             with st.spinner("Generating answer..."):
-                answer = agent.answer_question(question, file_info, folder_path)
+                answer, trace = agent.ask(question, file_info, folder_path, lock=scan_lock)
             
             st.markdown("**Answer:**")
             st.write(answer)
             
+            # Read everything the statistics show in one go, then render without the lock
+            with reading:
+                total_files = file_info["total_files"]
+                total_directories = file_info["total_directories"]
+                total_size = sum(file_info["file_sizes"].values())
+                file_types = dict(file_info["file_types"])
+                largest_files = file_info["largest_files"][:10]
+                distribution = None
+                if file_info["file_sizes"]:
+                    index = size_index(file_info)
+                    distribution = (index.median(), index.percentile(90), index.percentile(99),
+                                    index.percentile(100), [bucket for bucket in index.histogram() if bucket[2]])
+                rollup = directory_rollup(file_info)
+                heaviest = rollup.heaviest(10)
+                total_bytes = rollup.nodes[""].bytes or 1
+            
             # Display some quick stats
             st.header("📈 Quick Statistics")
             col1, col2, col3, col4 = st.columns(4)
             
             with col1:
-                st.metric("Total Files", file_info["total_files"])
+                st.metric("Total Files", total_files)
             
             with col2:
-                st.metric("Total Directories", file_info["total_directories"])
+                st.metric("Total Directories", total_directories)
             
             with col3:
-                total_size = sum(file_info["file_sizes"].values())
                 st.metric("Total Size", agent.format_size(total_size))
             
             with col4:
-                unique_types = len(file_info["file_types"])
-                st.metric("File Types", unique_types)
+                st.metric("File Types", len(file_types))
             
             # Show file type breakdown
-            if file_info["file_types"]:
+            if file_types:
                 st.header("📋 File Types")
                 file_types_df = {
-                    "Extension": list(file_info["file_types"].keys()),
-                    "Count": list(file_info["file_types"].values())
+                    "Extension": list(file_types.keys()),
+                    "Count": list(file_types.values())
                 }
                 st.dataframe(file_types_df, use_container_width=True)
             
             # Show largest files
-            if file_info["largest_files"]:
+            if largest_files:
                 st.header("📦 Largest Files")
                 largest_files_df = {
-                    "File": [item[0] for item in file_info["largest_files"][:10]],
-                    "Size": [agent.format_size(item[1]) for item in file_info["largest_files"][:10]]
+                    "File": [item[0] for item in largest_files],
+                    "Size": [agent.format_size(item[1]) for item in largest_files]
                 }
                 st.dataframe(largest_files_df, use_container_width=True)
+            
+            # Show how file sizes are distributed, from the sorted size index
+            if distribution is not None:
+                median, p90, p99, largest, histogram = distribution
+                st.header("📐 Size Distribution")
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("Median", agent.format_size(median))
+                with col2:
+                    st.metric("90th Percentile", agent.format_size(p90))
+                with col3:
+                    st.metric("99th Percentile", agent.format_size(p99))
+                with col4:
+                    st.metric("Largest", agent.format_size(largest))
+                size_distribution_df = {
+                    "Size Range": [f"{agent.format_size(low)} – {agent.format_size(high)}" if low else "Empty"
+                                   for low, high, _, _ in histogram],
+                    "Files": [files for _, _, files, _ in histogram],
+                    "Total Size": [agent.format_size(total) for _, _, _, total in histogram]
+                }
+                st.dataframe(size_distribution_df, use_container_width=True)
+            
+            # Show the top-level folders that hold the most bytes
+            if heaviest:
+                st.header("🏋️ Heaviest Folders")
+                heaviest_df = {
+                    "Folder": [path for path, _ in heaviest],
+                    "Size": [agent.format_size(stats.bytes) for _, stats in heaviest],
+                    "Share": [f"{stats.bytes / total_bytes:.1%}" for _, stats in heaviest],
+                    "Files": [stats.files for _, stats in heaviest],
+                    "Subfolders": [stats.directories for _, stats in heaviest]
+                }
+                st.dataframe(heaviest_df, use_container_width=True)
+            
+            # Show duplicate files
+            if find_duplicates:
+                with st.spinner("Looking for duplicate files..."):
+                    duplicates = agent.find_duplicates(file_info, folder_path, lock=scan_lock)
+                st.header("🧬 Duplicate Files")
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Redundant Copies", duplicates["duplicate_files"])
+                with col2:
+                    st.metric("Duplicate Groups", len(duplicates["groups"]))
+                with col3:
+                    st.metric("Wasted Space", agent.format_size(duplicates["wasted_bytes"]))
+                if duplicates["groups"]:
+                    duplicates_df = {
+                        "Size": [agent.format_size(size) for size, _ in duplicates["groups"][:20]],
+                        "Copies": [len(paths) for _, paths in duplicates["groups"][:20]],
+                        "Files": [", ".join(paths) for _, paths in duplicates["groups"][:20]]
+                    }
+                    st.dataframe(duplicates_df, use_container_width=True)
+            
+            # Show where the time of this answer went
+            timings = trace.to_dict()
+            st.header("⏱️ Timings")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Answer Time", f"{timings['total_seconds'] * 1000:.1f} ms")
+            with col2:
+                st.metric("LLM Calls", timings["counters"].get("llm_calls", 0),
+                          help=f"Validation failures: {timings['counters'].get('validation_failures', 0)}, "
+                               f"retries: {timings['counters'].get('simplify_retries', 0)}")
+            with col3:
+                st.metric("Prompt Tokens", timings["counters"].get("prompt_tokens", 0),
+                          help=f"Completion tokens: {timings['counters'].get('completion_tokens', 0)}")
+            if timings["phases"]:
+                phases_df = {
+                    "Phase": list(timings["phases"]),
+                    "Time (ms)": [round(p["seconds"] * 1000, 2) for p in timings["phases"].values()],
+                    "Calls": [p["calls"] for p in timings["phases"].values()]
+                }
+                st.dataframe(phases_df, use_container_width=True)
+            
+            # Show answer cache counters
+            cache_stats = agent.answer_cache.stats
+            st.header("⚡ Answer Cache")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Expression Hits", cache_stats["expression_hits"],
+                          help=f"Misses: {cache_stats['expression_misses']}, "
+                               f"dropped as stale: {cache_stats['expression_drops']}")
+            with col2:
+                st.metric("Result Hits", cache_stats["result_hits"],
+                          help=f"Misses: {cache_stats['result_misses']}")
+            
+            # Show watch mode counters
+            if watcher:
+                st.header("👀 Watch Mode")
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("Mode", watcher.stats["mode"])
+                with col2:
+                    st.metric("Deltas Applied", watcher.stats["deltas_applied"])
+                with col3:
+                    st.metric("Event Lag", f"{watcher.stats['last_event_lag'] * 1000:.1f} ms",
+                              help=f"Max: {watcher.stats['max_event_lag'] * 1000:.1f} ms")
                 
         except Exception as e:
             st.error(f"❌ Error during analysis: {str(e)}")
@@ -0,0 +1,51 @@
+"""Tests for answering from the expression cache of file_agent.FileSystemAgent."""
+
+import pytest
+
+from answer_cache import AnswerCache
+from benchmarks.stub_llm import DEFAULT_ANSWER, StubClient
+from file_agent import FileSystemAgent, ScanAccumulator
+
+QUESTION = "What is the total size of all files?"
+
+
+@pytest.fixture
+def file_info():
+    accumulator = ScanAccumulator()
+    accumulator.add_listing([("a.py", ".py", 1000), ("b.md", ".md", 3000)], [])
+    return accumulator.result()
+
+
+@pytest.fixture
+def agent(tmp_path):
+    agent = FileSystemAgent("test-key", local_answers=False, cache_dir=str(tmp_path))
+    agent.client = StubClient(latency=0)
+    return agent
+
+
+def test_cached_expression_is_reused(agent, file_info):
+    first = agent.answer_question(QUESTION, file_info, ".")
+    assert first == agent.answer_question(QUESTION, file_info, ".")
+    assert first.startswith("Result:")
+    assert agent.client.calls == 1
+
+
+def test_failing_cached_expression_is_dropped(agent, file_info, tmp_path):
+    # E.g. stored while asking about another tree, or before the scan format changed
+    agent.answer_cache.put_expression(QUESTION, "CALCULATE: file_info['no_such_key']")
+
+    answer = agent.answer_question(QUESTION, file_info, ".")
+
+    assert answer.startswith("Result:") and "4,000 bytes" in answer
+    # One fresh question, no request for a simpler version of the stale expression
+    assert agent.client.calls == 1
+    assert agent.answer_cache.stats["expression_drops"] == 1
+    assert AnswerCache(agent.answer_cache.path).get_expression(QUESTION) == DEFAULT_ANSWER
+
+
+def test_failing_cached_expression_is_dropped_when_the_llm_fails(agent, file_info):
+    agent.answer_cache.put_expression(QUESTION, "CALCULATE: file_info['no_such_key']")
+    agent.client.answer = "I don't know"
+
+    assert not agent.answer_question(QUESTION, file_info, ".").startswith("Result:")
+    assert agent.answer_cache.get_expression(QUESTION) is None
@@ -0,0 +1,97 @@
+"""Tests for duplicates.DuplicateFinder."""
+
+import os
+import threading
+
+import pytest
+
+from duplicates import DuplicateFinder
+from file_agent import DUPLICATES_KEY, FileSystemAgent, invalidate_derived
+
+
+@pytest.fixture
+def root(tmp_path):
+    root = tmp_path / "tree"
+    root.mkdir()
+    (root / "a.txt").write_bytes(b"same content")
+    (root / "copy.txt").write_bytes(b"same content")
+    (root / "other.txt").write_bytes(b"diff content")
+    (root / "empty1").write_bytes(b"")
+    (root / "empty2").write_bytes(b"")
+    (root / "solo.bin").write_bytes(b"only one of these")
+    return root
+
+
+def find(root, tmp_path):
+    file_info = FileSystemAgent("test-key", answer_cache=False).scan_directory(str(root), workers=1)
+    finder = DuplicateFinder(str(root), cache_dir=str(tmp_path / "cache"))
+    return finder.find(file_info, workers=2), finder.stats
+
+
+def test_finds_copies(root, tmp_path):
+    result, _ = find(root, tmp_path)
+    assert result["groups"] == [(12, ["a.txt", "copy.txt"])]
+    assert result["duplicate_files"] == 1
+    assert result["wasted_bytes"] == 12
+
+
+def test_repeat_run_uses_the_hash_cache(root, tmp_path):
+    find(root, tmp_path)
+    result, stats = find(root, tmp_path)
+    assert result["groups"] == [(12, ["a.txt", "copy.txt"])]
+    assert stats["cache_hits"] == 3 and stats["partial_hashes"] == 0
+
+
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="needs symlinks")
+def test_symlink_is_not_a_duplicate_of_its_target(root, tmp_path):
+    (root / "copy.txt").unlink()
+    (root / "other.txt").unlink()
+    (root / "solo-link.bin").symlink_to(root / "solo.bin")
+    (root / "a-link.txt").symlink_to("a.txt")
+    result, stats = find(root, tmp_path)
+    assert result["groups"] == []
+    assert stats["symlinks"] == 2
+    # Each target is left without another file of its size, so nothing is read
+    assert stats["partial_hashes"] == 0
+
+
+@pytest.mark.skipif(not hasattr(os, "link"), reason="needs hard links")
+def test_hard_links_to_one_file_are_not_duplicates(root, tmp_path):
+    os.link(root / "a.txt", root / "b-hardlink.txt")
+    result, stats = find(root, tmp_path)
+    assert result["groups"] == [(12, ["a.txt", "copy.txt"])]
+    assert stats["hard_links"] == 1
+
+
+def test_hashes_without_holding_the_scan_lock(root, tmp_path, monkeypatch):
+    agent = FileSystemAgent("test-key", answer_cache=False, cache_dir=str(tmp_path / "cache"))
+    file_info = agent.scan_directory(str(root), workers=1)
+    lock = threading.Lock()
+    find = DuplicateFinder.find
+    held = []
+
+    def watched_find(self, scan, workers=None):
+        held.append(lock.locked())
+        return find(self, scan, workers)
+
+    monkeypatch.setattr(DuplicateFinder, "find", watched_find)
+    result = agent.find_duplicates(file_info, str(root), lock=lock)
+    assert held == [False]
+    assert result["groups"] == [(12, ["a.txt", "copy.txt"])]
+    assert agent.find_duplicates(file_info, str(root), lock=lock) is result
+
+
+def test_result_is_not_kept_when_the_scan_changed_while_hashing(root, tmp_path, monkeypatch):
+    agent = FileSystemAgent("test-key", answer_cache=False, cache_dir=str(tmp_path / "cache"))
+    file_info = agent.scan_directory(str(root), workers=1)
+    find = DuplicateFinder.find
+
+    def changing_find(self, scan, workers=None):
+        # A watcher applying a change and dropping the derived entries
+        file_info["file_sizes"]["copy.txt"] = 13
+        invalidate_derived(file_info)
+        return find(self, scan, workers)
+
+    monkeypatch.setattr(DuplicateFinder, "find", changing_find)
+    agent.find_duplicates(file_info, str(root), lock=threading.Lock())
+    assert DUPLICATES_KEY not in file_info
@@ -0,0 +1,83 @@
+"""Tests for the local answers of local_query.LocalQueryEngine."""
+
+import os
+
+import pytest
+
+from file_agent import ScanAccumulator, _file_extension
+from local_query import LocalQueryEngine
+
+# .py is the most common extension, then .md, .log, .json and .gz
+FILES = {
+    "src/a.py": 100, "src/b.py": 200, "src/c.py": 300, "src/d.py": 400,
+    "docs/one.md": 50, "docs/two.md": 60, "docs/three.md": 70,
+    "logs/app.log": 5000, "logs/old.log": 9000,
+    "data/big.json": 100000,
+    "data/backup.tar.gz": 200000,
+}
+
+
+@pytest.fixture
+def file_info():
+    accumulator = ScanAccumulator()
+    listings = {}
+    for path, size in FILES.items():
+        path = path.replace("/", os.sep)
+        directory = path.rpartition(os.sep)[0]
+        listings.setdefault(directory, []).append((path, _file_extension(os.path.basename(path)), size))
+    for directory, files in listings.items():
+        accumulator.add_listing(files, [directory])
+    return accumulator.result()
+
+
+@pytest.fixture
+def engine():
+    return LocalQueryEngine()
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("What are the top 5 file types?", [".py", ".md", ".log", ".gz", ".json"]),
+    ("top 3 extensions", [".py", ".md", ".log"]),
+    ("What are the most common file types?", [".py", ".md", ".log", ".gz", ".json"]),
+    ("What is the most common file type?", [".py"]),
+    ("What is the most common extension?", [".py"]),
+    ("What are the 2 most common extensions?", [".py", ".md"]),
+])
+def test_ranks_file_types_by_count(engine, file_info, question, expected):
+    kind, value = engine.answer(question, file_info)
+    assert kind == "text"
+    assert [line.split(":")[0].strip() for line in value.splitlines()] == expected
+
+
+def test_top_file_types_are_not_largest_files(engine, file_info):
+    _, value = engine.answer("What are the top 5 file types?", file_info)
+    assert "backup.tar.gz" not in value
+
+
+def test_counts_file_types(engine, file_info):
+    assert engine.answer("How many file types are there?", file_info) == ("count", 5)
+
+
+@pytest.mark.parametrize("question", [
+    # By bytes or by count?
+    "What are the largest file types?",
+    "biggest extensions",
+    # Compound extensions are not file_types keys
+    "How many .tar.gz files are there?",
+    "What is the total size of .tar.gz files?",
+])
+def test_ambiguous_questions_go_to_the_llm(engine, file_info, question):
+    assert engine.answer(question, file_info) is None
+
+
+def test_top_files_still_lists_largest_files(engine, file_info):
+    kind, value = engine.answer("top 2 files", file_info)
+    assert kind == "text"
+    assert [line.split(":")[0].strip() for line in value.splitlines()] == [
+        os.path.join("data", "backup.tar.gz"), os.path.join("data", "big.json")]
+
+
+def test_extension_questions(engine, file_info):
+    assert engine.answer("How many .py files are there?", file_info) == ("count", 4)
+    assert engine.answer("How many gz files?", file_info) == ("count", 1)
+    assert engine.answer("What is the total size of log files?", file_info) == ("size", 14000)
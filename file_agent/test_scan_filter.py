@@ -0,0 +1,37 @@
+"""Tests for how scan_filter.ScanFilter combines include globs and ignore files."""
+
+import os
+
+import pytest
+
+from file_agent import FileSystemAgent
+from scan_filter import ScanFilter
+
+
+@pytest.fixture
+def root(tmp_path):
+    root = tmp_path / "tree"
+    (root / "src").mkdir(parents=True)
+    (root / ".gitignore").write_text("*.log\n!keep.log\n")
+    for name in ("main.py", "debug.log", "keep.log", "notes.txt"):
+        (root / "src" / name).write_text("x")
+    return root
+
+
+def scanned(root, scan_filter):
+    file_info = FileSystemAgent("test-key", answer_cache=False).scan_directory(str(root), workers=1,
+                                                                                scan_filter=scan_filter)
+    return sorted(path.replace(os.sep, "/") for path in file_info["file_list"])
+
+
+def test_ignore_file_with_reinclusion(root):
+    assert scanned(root, ScanFilter(ignore_files=True)) == [".gitignore", "src/keep.log", "src/main.py",
+                                                            "src/notes.txt"]
+
+
+def test_reincluded_path_must_still_match_include_globs(root):
+    scan_filter = ScanFilter(include=["*.py"], ignore_files=True)
+    assert scanned(root, scan_filter) == ["src/main.py"]
+    pruner = scan_filter.start(str(root))
+    assert not pruner.allows(os.path.join("src", "keep.log"), False)
+    assert pruner.allows(os.path.join("src", "main.py"), False)
@@ -0,0 +1,129 @@
+"""Tests that scan_watch.FileInfoWatcher keeps file_info equal to a fresh scan."""
+
+import shutil
+import sys
+import time
+
+import pytest
+
+from file_agent import DERIVED_KEYS, FileSystemAgent
+from scan_watch import FileInfoWatcher, scan_and_watch
+
+# Sorted before comparing, their order depends on the order of the changes
+UNORDERED_KEYS = ("file_list", "directory_structure")
+
+
+def scan(root):
+    return FileSystemAgent("test-key", top_n=3, sample_size=3, answer_cache=False).scan_directory(str(root), workers=1)
+
+
+def comparable(file_info):
+    result = {key: value for key, value in file_info.items() if key not in DERIVED_KEYS}
+    for key in UNORDERED_KEYS:
+        result[key] = sorted(result[key])
+    return result
+
+
+def write(path, size):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+
+
+@pytest.fixture(params=["polling", "inotify"])
+def watched(request, tmp_path):
+    if request.param == "inotify" and not sys.platform.startswith("linux"):
+        pytest.skip("inotify is Linux only")
+    root = tmp_path / "tree"
+    write(root / "README.md", 10)
+    write(root / "src" / "main.py", 200)
+    write(root / "src" / "util.py", 300)
+    write(root / "src" / "pkg" / "mod.py", 400)
+    write(root / "docs" / "guide.md", 50)
+    (root / "empty").mkdir()
+    watcher = FileInfoWatcher(str(root), scan(root), poll_interval=0.05,
+                              use_inotify=request.param == "inotify", sample_size=3, top_n=3)
+    assert watcher.stats["mode"] == request.param
+    watcher.start()
+    yield root, watcher
+    watcher.stop()
+
+
+def assert_converges(root, watcher, timeout=10.0):
+    expected = comparable(scan(root))
+    deadline = time.monotonic() + timeout
+    while True:
+        with watcher.lock:
+            actual = comparable(watcher.file_info)
+        if actual == expected or time.monotonic() > deadline:
+            break
+        time.sleep(0.05)
+    assert actual == expected
+
+
+def test_watched_file_info_matches_fresh_scan(watched):
+    root, watcher = watched
+
+    write(root / "src" / "new.py", 1000)
+    write(root / "logs" / "2024" / "app.log", 5000)
+    assert_converges(root, watcher)
+
+    write(root / "src" / "main.py", 20)
+    write(root / "README.md", 9000)
+    assert_converges(root, watcher)
+
+    (root / "src" / "util.py").rename(root / "src" / "helpers.py")
+    (root / "src" / "pkg").rename(root / "lib")
+    assert_converges(root, watcher)
+
+    (root / "docs" / "guide.md").unlink()
+    shutil.rmtree(root / "logs")
+    (root / "empty").rmdir()
+    assert_converges(root, watcher)
+
+    # A file replaced by a directory of the same name, and the other way around
+    (root / "README.md").unlink()
+    write(root / "README.md" / "index.md", 70)
+    shutil.rmtree(root / "lib")
+    write(root / "lib", 30)
+    assert_converges(root, watcher)
+
+
+def test_renamed_directory_is_still_watched(watched):
+    root, watcher = watched
+    write(root / "src" / "zz" / "old.py", 10)
+    assert_converges(root, watcher)
+
+    # Renamed to a name that sorts first, so the new path is reconciled before the old one
+    (root / "src" / "zz").rename(root / "src" / "aa")
+    assert_converges(root, watcher)
+    write(root / "src" / "aa" / "new.py", 20)
+    write(root / "src" / "aa" / "deeper" / "more.py", 30)
+    assert_converges(root, watcher)
+
+    (root / "src" / "aa").rename(root / "src" / "zz")
+    assert_converges(root, watcher)
+    write(root / "src" / "zz" / "last.py", 40)
+    assert_converges(root, watcher)
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")
+def test_changes_made_during_the_scan_are_applied(tmp_path):
+    root = tmp_path / "tree"
+    write(root / "src" / "main.py", 200)
+    write(root / "docs" / "guide.md", 50)
+
+    def slow_scan():
+        file_info = scan(root)
+        # Changes after the directories were listed but before the scan returned
+        write(root / "src" / "late.py", 300)
+        write(root / "src" / "main.py", 5)
+        (root / "docs" / "guide.md").unlink()
+        write(root / "new" / "dir" / "file.txt", 70)
+        return file_info
+
+    # A long poll interval, so only inotify events can bring file_info up to date
+    watcher = scan_and_watch(str(root), slow_scan, use_inotify=True, poll_interval=3600, sample_size=3, top_n=3)
+    try:
+        assert_converges(root, watcher)
+    finally:
+        watcher.stop()
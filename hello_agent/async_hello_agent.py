@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Async Hello Agent - the Hello Agent for high fan-out
+
+Same pattern as HelloAgent, but on asyncio and aiohttp, so thousands of cities
+can be in flight on one thread:
+
+- a token bucket keeps the request rate within the upstream API quota,
+- 429 and 5xx responses (and connection errors) are retried with jittered
+  exponential backoff, honouring Retry-After,
+- every lookup has a deadline that covers all of its retries,
+- ``stream()`` yields formatted results as they complete:
+
+    async with AsyncHelloAgent(rate=50) as agent:
+        async for city, result in agent.stream(cities):
+            print(result)
+"""
+
+import asyncio
+import random
+import sys
+import time
+from typing import Dict, Any, AsyncIterator, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+from hello_agent import HelloAgent, DEFAULT_API_URL, DEMO_API_KEY
+
+# The free OpenWeatherMap plan allows 60 calls per minute
+DEFAULT_RATE = 1.0
+DEFAULT_BURST = 10
+DEFAULT_MAX_CONCURRENCY = 100
+# Seconds per attempt, and for a whole lookup including retries
+DEFAULT_REQUEST_TIMEOUT = 10.0
+DEFAULT_DEADLINE = 30.0
+DEFAULT_MAX_RETRIES = 5
+BACKOFF_BASE = 0.25
+BACKOFF_CAP = 8.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Allow ``rate`` acquisitions per second on average, with bursts of up to ``burst``.
+
+    Implemented as the equivalent virtual-scheduling form: every caller
+    reserves the next free slot and sleeps until it, so waiters are served in
+    order and sleep concurrently instead of one after another behind a lock.
+    """
+
+    def __init__(self, rate: float, burst: int = DEFAULT_BURST):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._interval = 1.0 / rate
+        # When the bucket would be full again if nobody else acquired
+        self._full_at = time.monotonic()
+
+    async def acquire(self, timeout: Optional[float] = None):
+        """Wait for a slot.
+
+        Raises asyncio.TimeoutError at once, without taking a slot, when the
+        wait would exceed ``timeout``; a caller cancelled while waiting gives
+        its slot back, so callers that give up do not delay the others.
+        """
+        now = time.monotonic()
+        full_at = max(self._full_at, now)
+        wait = full_at - now - (self.burst - 1) * self._interval
+        if timeout is not None and wait > timeout:
+            raise asyncio.TimeoutError
+        self._full_at = full_at + self._interval
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self._full_at -= self._interval
+                raise
+
+
+class AsyncHelloAgent:
+    """Asyncio weather agent with rate limiting, retries and deadlines."""
+
+    # Formatting is the same as the synchronous agent's
+    process_weather_data = HelloAgent.process_weather_data
+
+    def __init__(self, api_base_url: str = DEFAULT_API_URL, rate: Optional[float] = DEFAULT_RATE,
+                 burst: int = DEFAULT_BURST, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 request_timeout: float = DEFAULT_REQUEST_TIMEOUT, deadline: float = DEFAULT_DEADLINE,
+                 max_retries: int = DEFAULT_MAX_RETRIES):
+        """Initialize the agent; ``rate=None`` disables rate limiting."""
+        self.api_base_url = api_base_url
+        self.api_key = DEMO_API_KEY
+        self.units = "metric"
+        self.request_timeout = request_timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.stats = {"requests": 0, "retries": 0, "rate_limited": 0, "server_errors": 0, "timeouts": 0,
+                      "deadline_exceeded": 0}
+
+    async def __aenter__(self) -> "AsyncHelloAgent":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def open(self):
+        """Create the HTTP session; must run inside the event loop that uses it."""
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            self.session = aiohttp.ClientSession(connector=connector)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def get_weather(self, city: str) -> Dict[str, Any]:
+        """Fetch weather data for a city, retrying within the deadline."""
+        await self.open()
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + self.deadline
+        params = {'q': city, 'appid': self.api_key, 'units': self.units}
+        error = "no attempt was made"
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                if self.bucket is not None:
+                    await self.bucket.acquire(deadline_at - loop.time())
+                remaining = deadline_at - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+            except asyncio.TimeoutError:
+                self.stats["deadline_exceeded"] += 1
+                break
+
+            retry_after = None
+            try:
+                self.stats["requests"] += 1
+                timeout = aiohttp.ClientTimeout(total=min(self.request_timeout, remaining))
+                async with self.session.get(self.api_base_url, params=params, timeout=timeout) as response:
+                    if response.status not in RETRY_STATUSES:
+                        response.raise_for_status()
+                        return await response.json()
+                    if response.status == 429:
+                        self.stats["rate_limited"] += 1
+                    else:
+                        self.stats["server_errors"] += 1
+                    error = f"HTTP {response.status} {response.reason}"
+                    retry_after = _retry_after(response.headers.get("Retry-After"))
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                error = "request timed out"
+            except aiohttp.ClientResponseError as e:
+                # Other 4xx responses (unknown city, bad key) will not improve on retry
+                return {"error": f"Failed to fetch weather data: {e.status} {e.message}"}
+            except aiohttp.ClientError as e:
+                error = str(e) or type(e).__name__
+
+            if attempt == self.max_retries:
+                break
+            # Full jitter: spread retries out so throttled clients do not retry in lockstep
+            delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            if loop.time() + delay >= deadline_at:
+                self.stats["deadline_exceeded"] += 1
+                break
+            self.stats["retries"] += 1
+            await asyncio.sleep(delay)
+
+        return {"error": f"Failed to fetch weather data: {error}"}
+
+    async def run(self, city: str) -> str:
+        """Fetch and format the weather for one city."""
+        return self.process_weather_data(await self.get_weather(city))
+
+    async def stream(self, cities: Iterable[str]) -> AsyncIterator[Tuple[str, str]]:
+        """Yield (city, formatted result) pairs in completion order.
+
+        At most ``max_concurrency`` lookups are in flight; new ones start as
+        others finish, so an arbitrarily long iterable of cities is fine.
+        """
+        async for _, city, result in self._run_all(cities):
+            yield city, result
+
+    async def run_many(self, cities: Iterable[str]) -> List[str]:
+        """Fetch and format several cities concurrently; results are in input order."""
+        cities = list(cities)
+        results: List[Optional[str]] = [None] * len(cities)
+        async for index, _, result in self._run_all(cities):
+            results[index] = result
+        return results
+
+    async def _run_all(self, cities: Iterable[str]) -> AsyncIterator[Tuple[int, str, str]]:
+        """Run the cities with bounded concurrency, yielding (index, city, result) as they finish."""
+        cities = enumerate(cities)
+        pending: Dict[asyncio.Task, Tuple[int, str]] = {}
+
+        def start_next() -> bool:
+            item = next(cities, None)
+            if item is None:
+                return False
+            pending[asyncio.create_task(self.run(item[1]))] = item
+            return True
+
+        try:
+            while len(pending) < self.max_concurrency and start_next():
+                pass
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index, city = pending.pop(task)
+                    start_next()
+                    yield index, city, task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header (the HTTP-date form is ignored)."""
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+async def _demo(cities: List[str]):
+    async with AsyncHelloAgent() as agent:
+        print(f"🤖 Async Hello Agent is fetching weather data for {len(cities)} cities")
+        async for city, result in agent.stream(cities):
+            print(f"\n📍 {city}")
+            print(result)
+        print(f"\n📊 {agent.stats}")
+
+
+def main():
+    """Fetch the cities given on the command line, or the demo cities."""
+    asyncio.run(_demo(sys.argv[1:] or ["London", "New York", "Tokyo"]))
+
+
+if __name__ == "__main__":
+    main()
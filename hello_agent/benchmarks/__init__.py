@@ -0,0 +1,4 @@
+"""Benchmarks for the Hello Agent.
+
+Run from the ``hello_agent`` directory, e.g. ``python -m benchmarks.bench_session``.
+"""
@@ -0,0 +1,92 @@
+"""Weather cache: hit rate, request coalescing, expiry and persistence.
+
+Runs a skewed workload (a few hundred cities, popular ones asked far more
+often) from many threads against a local stub weather server and compares
+the upstream calls the server saw with and without the cache. Then checks
+that concurrent lookups of one city make a single upstream call, that
+entries expire after the TTL, and that a persisted cache answers after a
+restart without any upstream call.
+Usage: python -m benchmarks.bench_cache [--cities N] [--lookups N] [--threads N] [--latency SECONDS]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from hello_agent import HelloAgent
+from benchmarks.stub_weather import StubWeatherServer
+
+
+def workload(cities: int, lookups: int, seed: int = 0) -> list:
+    """Zipf-like city names: the k-th most popular city is asked about ~1/k as often."""
+    rng = random.Random(seed)
+    names = [f"City {i}" for i in range(cities)]
+    return rng.choices(names, weights=[1 / (k + 1) for k in range(cities)], k=lookups)
+
+
+def run(server: StubWeatherServer, agent: HelloAgent, lookups: list, threads: int) -> float:
+    server.reset()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(agent.get_weather, lookups))
+    elapsed = time.perf_counter() - start
+    assert [result["name"] for result in results] == lookups
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the HelloAgent weather cache")
+    parser.add_argument("--cities", type=int, default=300)
+    parser.add_argument("--lookups", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.02, help="Stub server latency in seconds")
+    args = parser.parse_args()
+
+    lookups = workload(args.cities, args.lookups)
+    with StubWeatherServer(latency=args.latency) as server:
+        for label, ttl in (("no cache", None), ("TTL cache", 300)):
+            with HelloAgent(api_base_url=server.url, max_workers=args.threads, cache_ttl=ttl) as agent:
+                elapsed = run(server, agent, lookups, args.threads)
+                print(f"{label:<10} {elapsed:8.3f}s  {len(lookups) / elapsed:9.1f} lookups/s  "
+                      f"{server.requests:6,} upstream calls")
+                if agent.cache is not None:
+                    print(f"  {agent.cache.stats}")
+                    assert server.requests == len(set(lookups)), "one upstream call per distinct city"
+
+        # Coalescing: many threads ask for the same cold city at once
+        with HelloAgent(api_base_url=server.url, max_workers=args.threads) as agent:
+            server.reset()
+            run(server, agent, ["Paris"] * args.threads * 4, args.threads)
+            print(f"coalescing: {args.threads * 4} concurrent lookups of one city -> "
+                  f"{server.requests} upstream call ({agent.cache.stats['coalesced']} coalesced)")
+            assert server.requests == 1
+
+        # Expiry: a short TTL sends the next lookup upstream again
+        with HelloAgent(api_base_url=server.url, cache_ttl=0.2) as agent:
+            server.reset()
+            agent.get_weather("Oslo")
+            agent.get_weather("oslo ")
+            time.sleep(0.3)
+            agent.get_weather("Oslo")
+            print(f"expiry: 3 lookups around the TTL -> {server.requests} upstream calls {agent.cache.stats}")
+            assert server.requests == 2
+
+        # Persistence: a new agent loads the saved entries
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "weather_cache.json")
+            with HelloAgent(api_base_url=server.url, cache_path=path) as agent:
+                agent.run_many(lookups[:200])
+            server.reset()
+            with HelloAgent(api_base_url=server.url, cache_path=path) as agent:
+                start = time.perf_counter()
+                run(server, agent, lookups[:200], args.threads)
+                print(f"persisted: {len(agent.cache)} entries loaded, 200 lookups after a restart in "
+                      f"{time.perf_counter() - start:.3f}s -> {server.requests} upstream calls")
+                assert server.requests == 0
+
+
+if __name__ == "__main__":
+    main()
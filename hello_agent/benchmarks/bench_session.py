@@ -0,0 +1,74 @@
+"""Pooled session and run_many vs. a new connection per lookup.
+
+Fetches the same cities from a local stub weather server three ways:
+
+- one ``requests.get`` per city (a fresh connection each time, the old behaviour),
+- ``HelloAgent.get_weather`` one after another over the pooled session,
+- ``HelloAgent.run_many`` with a bounded worker pool,
+
+and reports per-request latency, throughput and how many TCP connections the
+server saw.
+Usage: python -m benchmarks.bench_session [--cities N] [--latency SECONDS] [--workers N]
+"""
+
+import argparse
+import statistics
+import time
+
+import requests
+
+from hello_agent import HelloAgent
+from benchmarks.stub_weather import StubWeatherServer
+
+
+def timed_lookups(fetch, cities):
+    """Run ``fetch`` for every city in turn and return the per-request latencies."""
+    latencies = []
+    for city in cities:
+        start = time.perf_counter()
+        fetch(city)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(label: str, server: StubWeatherServer, elapsed: float, count: int, latencies=None):
+    line = f"{label:<22} {elapsed:8.3f}s  {count / elapsed:8.1f} req/s  {server.connections:4d} connections"
+    if latencies:
+        latencies = sorted(latencies)
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) >= 20 else latencies[-1]
+        line += f"  mean {statistics.mean(latencies) * 1000:7.2f} ms  p95 {p95 * 1000:7.2f} ms"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HelloAgent HTTP connection reuse and run_many")
+    parser.add_argument("--cities", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.005, help="Stub server latency in seconds")
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    cities = [f"City {i}" for i in range(args.cities)]
+    with StubWeatherServer(latency=args.latency) as server, \
+            HelloAgent(api_base_url=server.url, max_workers=args.workers, cache_ttl=None) as agent:
+        params = {"appid": agent.api_key, "units": "metric"}
+
+        start = time.perf_counter()
+        latencies = timed_lookups(lambda city: requests.get(server.url, params={"q": city, **params},
+                                                            timeout=agent.timeout).json(), cities)
+        report("requests.get", server, time.perf_counter() - start, len(cities), latencies)
+
+        server.reset()
+        start = time.perf_counter()
+        latencies = timed_lookups(agent.get_weather, cities)
+        report("session, sequential", server, time.perf_counter() - start, len(cities), latencies)
+
+        server.reset()
+        start = time.perf_counter()
+        results = agent.run_many(cities)
+        report(f"run_many ({args.workers} workers)", server, time.perf_counter() - start, len(cities))
+        assert [result.splitlines()[0] for result in results] == [f"🌍 Weather in {city}, XX:" for city in cities]
+        print(f"  at most {server.max_in_flight} requests in flight")
+
+
+if __name__ == "__main__":
+    main()
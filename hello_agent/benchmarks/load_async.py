@@ -0,0 +1,99 @@
+"""Load test for AsyncHelloAgent: throughput and tail latency at thousands of cities.
+
+Runs against a local stub weather server:
+
+1. the synchronous HelloAgent.run, one city at a time, on a sample,
+2. AsyncHelloAgent.stream without a rate limit,
+3. the same with a fraction of requests failing with 503 (retries),
+4. the agent's token bucket set just under the server's quota, which should see
+   (next to) no 429s.
+
+Latency is per lookup, including rate limiting and retries.
+Usage: python -m benchmarks.load_async [--cities N] [--concurrency N] [--latency SECONDS] [--quota RPS]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from async_hello_agent import AsyncHelloAgent
+from hello_agent import HelloAgent
+from benchmarks.stub_weather import StubWeatherServer
+
+
+class TimedAgent(AsyncHelloAgent):
+    """Records how long every lookup took."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies = []
+
+    async def run(self, city: str) -> str:
+        start = time.perf_counter()
+        try:
+            return await super().run(city)
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+
+
+def percentile(values: list, fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def report(label: str, elapsed: float, latencies: list, extra: str = ""):
+    latencies = sorted(latencies)
+    print(f"{label:<24} {len(latencies) / elapsed:9.1f} lookups/s  "
+          f"p50 {percentile(latencies, 0.50) * 1000:7.1f}  p95 {percentile(latencies, 0.95) * 1000:7.1f}  "
+          f"p99 {percentile(latencies, 0.99) * 1000:7.1f}  max {latencies[-1] * 1000:7.1f} ms{extra}")
+
+
+async def load(server: StubWeatherServer, cities: list, **kwargs) -> TimedAgent:
+    server.reset()
+    async with TimedAgent(api_base_url=server.url, **kwargs) as agent:
+        start = time.perf_counter()
+        failures = 0
+        async for city, result in agent.stream(cities):
+            failures += result.startswith("❌")
+        agent.elapsed = time.perf_counter() - start
+        agent.failures = failures
+    return agent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test AsyncHelloAgent against a stub server")
+    parser.add_argument("--cities", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub server latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="Fraction of 503s in the retry run")
+    parser.add_argument("--quota", type=float, default=500, help="Server quota in requests/s for the last run")
+    parser.add_argument("--sample", type=int, default=50, help="Cities for the synchronous baseline")
+    args = parser.parse_args()
+
+    cities = [f"City {i}" for i in range(args.cities)]
+    with StubWeatherServer(latency=args.latency) as server:
+        with HelloAgent(api_base_url=server.url, cache_ttl=None) as agent:
+            latencies = []
+            start = time.perf_counter()
+            for city in cities[:args.sample]:
+                lookup_start = time.perf_counter()
+                agent.process_weather_data(agent.get_weather(city))
+                latencies.append(time.perf_counter() - lookup_start)
+            report("sync, sequential", time.perf_counter() - start, latencies)
+
+        runs = [
+            ("async", {}, {}),
+            (f"async, {args.error_rate:.0%} errors", {"error_rate": args.error_rate}, {}),
+            (f"async, quota {args.quota:g}/s", {"quota": args.quota}, {"rate": args.quota * 0.95, "burst": 1}),
+        ]
+        for label, server_settings, agent_settings in runs:
+            server.error_rate, server.quota = server_settings.get("error_rate", 0.0), server_settings.get("quota")
+            agent = asyncio.run(load(server, cities, rate=agent_settings.get("rate"),
+                                     burst=agent_settings.get("burst", 1), max_concurrency=args.concurrency))
+            report(label, agent.elapsed, agent.latencies,
+                   f"  {agent.failures} failed, {agent.stats['retries']} retries, "
+                   f"{server.rejected[429]} x 429, {server.rejected[503]} x 503")
+
+
+if __name__ == "__main__":
+    main()
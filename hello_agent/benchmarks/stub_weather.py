@@ -0,0 +1,150 @@
+"""Local HTTP server that answers like the OpenWeatherMap current weather API.
+
+Each request waits ``latency`` seconds and returns a canned payload for the
+requested city, so benchmarks measure the client rather than the network.
+The server counts requests and the TCP connections they arrived on, which
+shows whether a client reuses keep-alive connections. It can also fail a
+fraction of requests with 503 and enforce a requests-per-second quota with
+429 responses, to exercise retries and rate limiting.
+
+    with StubWeatherServer(latency=0.05) as server:
+        agent = HelloAgent(api_base_url=server.url)
+"""
+
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+
+def weather_payload(city: str) -> dict:
+    """A minimal current-weather response for ``city``."""
+    return {
+        "name": city,
+        "sys": {"country": "XX"},
+        "main": {"temp": 15.0 + len(city) % 10, "humidity": 60},
+        "weather": [{"description": "partly cloudy"}],
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, Nagle and delayed
+    # ACKs add ~40 ms to every request on a reused connection
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        # One handler instance serves every request of a connection
+        super().setup()
+        with self.server.stub.lock:
+            self.server.stub.connections += 1
+
+    def do_GET(self):
+        server = self.server.stub
+        status = server.admit()
+        if status != 200:
+            self.send_response(status)
+            if status == 429:
+                self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(server.latency)
+            city = parse_qs(urlparse(self.path).query).get("q", ["Unknown"])[0]
+            payload = json.dumps(weather_payload(city)).encode("utf-8")
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    # A load test opens hundreds of connections at once; the default backlog of
+    # 5 drops SYNs and shows up as one-second latency outliers
+    request_queue_size = 1024
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients that give up on a request close the connection mid-response
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubWeatherServer:
+    """Threaded weather API stub on localhost, run in a background thread."""
+
+    def __init__(self, latency: float = 0.05, port: int = 0, error_rate: float = 0.0,
+                 quota: Optional[float] = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        # Requests per second before answering 429
+        self.quota = quota
+        self.requests = 0
+        self.connections = 0
+        self.rejected = {429: 0, 503: 0}
+        self._window = (0, 0)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self._httpd = _Server(("127.0.0.1", port), _Handler)
+        self._httpd.stub = self
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/data/2.5/weather"
+
+    def admit(self) -> int:
+        """Return the status for the next request: 200, or 429/503 to reject it."""
+        with self.lock:
+            if self.quota is not None:
+                second, count = self._window
+                now = int(time.monotonic())
+                if now != second:
+                    second, count = now, 0
+                self._window = (second, count + 1)
+                if count >= self.quota:
+                    self.rejected[429] += 1
+                    return 429
+            if self.error_rate and random.random() < self.error_rate:
+                self.rejected[503] += 1
+                return 503
+        return 200
+
+    def reset(self):
+        with self.lock:
+            self.requests = self.connections = self.max_in_flight = 0
+            self.rejected = {429: 0, 503: 0}
+
+    def start(self) -> "StubWeatherServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StubWeatherServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
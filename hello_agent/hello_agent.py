@@ -12,25 +12,71 @@ For this example, we'll use the OpenWeatherMap API to get weather data.
 
 import requests
 import json
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Iterable
+from requests.adapters import HTTPAdapter
+
+from weather_cache import WeatherCache, DEFAULT_TTL
+
+DEFAULT_API_URL = "http://api.openweathermap.org/data/2.5/weather"
+# Using a free API key for demonstration (you can replace with your own)
+DEMO_API_KEY = "b1b15e88fa797225412429c1c50c122a1"
+# (connect, read) timeouts in seconds, so a stalled upstream cannot hang a lookup
+DEFAULT_TIMEOUT = (3.05, 10)
+# Parallel lookups in run_many, also the size of the connection pool
+DEFAULT_MAX_WORKERS = 8
 
 class HelloAgent:
-    def __init__(self):
-        """Initialize the agent with basic configuration."""
-        self.api_base_url = "http://api.openweathermap.org/data/2.5/weather"
-        # Using a free API key for demonstration (you can replace with your own)
-        self.api_key = "b1b15e88fa797225412429c1c50c122a1"  # Demo key
+    def __init__(self, api_base_url: str = DEFAULT_API_URL, timeout=DEFAULT_TIMEOUT,
+                 max_workers: int = DEFAULT_MAX_WORKERS, cache_ttl: Optional[float] = DEFAULT_TTL,
+                 cache_path: Optional[str] = None):
+        """Initialize the agent with basic configuration.
+        
+        Responses are cached for ``cache_ttl`` seconds (None or 0 disables the
+        cache) and persisted to ``cache_path`` as JSON when one is given.
+        """
+        self.api_base_url = api_base_url
+        self.api_key = DEMO_API_KEY
+        self.units = "metric"  # Use Celsius
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.cache = WeatherCache(ttl=cache_ttl, path=cache_path) if cache_ttl else None
+        
+        # One pooled session: lookups reuse keep-alive connections instead of
+        # opening a new TCP (and TLS) connection per request
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
+    def close(self):
+        """Save the cache and close the pooled connections."""
+        if self.cache is not None:
+            self.cache.save()
+        self.session.close()
+    
+    def __enter__(self) -> "HelloAgent":
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
         
     def get_weather(self, city: str) -> Dict[str, Any]:
-        """Fetch weather data for a given city."""
+        """Get weather data for a given city, from the cache while it is fresh."""
+        if self.cache is None:
+            return self._fetch_weather(city)
+        return self.cache.get_or_fetch(city, self.units, lambda: self._fetch_weather(city))
+    
+    def _fetch_weather(self, city: str) -> Dict[str, Any]:
+        """Fetch weather data for a given city from the API."""
         try:
             params = {
                 'q': city,
                 'appid': self.api_key,
-                'units': 'metric'  # Use Celsius
+                'units': self.units
             }
             
-            response = requests.get(self.api_base_url, params=params)
+            response = self.session.get(self.api_base_url, params=params, timeout=self.timeout)
             response.raise_for_status()  # Raise exception for bad status codes
             
             return response.json()
@@ -71,6 +117,20 @@ class HelloAgent:
         result = self.process_weather_data(weather_data)
         
         return result
+    
+    def run_many(self, cities: Iterable[str], max_workers: Optional[int] = None) -> List[str]:
+        """Fetch and process several cities in parallel; results are in input order."""
+        cities = list(cities)
+        if max_workers is None:
+            max_workers = self.max_workers
+        print(f"🤖 Hello Agent is fetching weather data for {len(cities)} cities")
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(cities) or 1))) as pool:
+            results = list(pool.map(lambda city: self.process_weather_data(self.get_weather(city)), cities))
+        
+        if self.cache is not None:
+            self.cache.save()
+        return results
 
 def main():
     """Main function to demonstrate the agent."""
@@ -84,9 +144,8 @@ def main():
     # Example usage
     cities = ["London", "New York", "Tokyo"]
     
-    for city in cities:
-        print(f"\n📍 Querying weather for: {city}")
-        result = agent.run(city)
+    print(f"\n📍 Querying weather for: {', '.join(cities)}")
+    for result in agent.run_many(cities):
         print(result)
         print("-" * 30)
     
@@ -100,6 +159,8 @@ def main():
         if user_city:
             result = agent.run(user_city)
             print(f"\n{result}")
+    
+    agent.close()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
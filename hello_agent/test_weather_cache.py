@@ -0,0 +1,96 @@
+"""Tests for weather_cache.WeatherCache."""
+
+import threading
+import time
+
+from weather_cache import WeatherCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Fetcher:
+    """Counts calls and returns a distinct response for each one."""
+
+    def __init__(self, city: str):
+        self.city = city
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {"city": self.city, "call": self.calls}
+
+
+def test_entry_expires_after_ttl():
+    clock = FakeClock()
+    cache = WeatherCache(ttl=60, clock=clock)
+    fetch = Fetcher("Paris")
+
+    assert cache.get_or_fetch("Paris", "metric", fetch)["call"] == 1
+    clock.now += 59
+    assert cache.get_or_fetch(" paris ", "metric", fetch)["call"] == 1
+    clock.now += 1
+    assert cache.get_or_fetch("Paris", "metric", fetch)["call"] == 2
+    assert fetch.calls == 2
+    assert cache.stats["expirations"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = WeatherCache(max_entries=2, clock=FakeClock())
+    fetches = {city: Fetcher(city) for city in ("Oslo", "Rome", "Lima")}
+
+    cache.get_or_fetch("Oslo", "metric", fetches["Oslo"])
+    cache.get_or_fetch("Rome", "metric", fetches["Rome"])
+    # Using Oslo makes Rome the least recently used entry
+    cache.get_or_fetch("Oslo", "metric", fetches["Oslo"])
+    cache.get_or_fetch("Lima", "metric", fetches["Lima"])
+
+    assert len(cache) == 2
+    assert cache.stats["evictions"] == 1
+    cache.get_or_fetch("Oslo", "metric", fetches["Oslo"])
+    cache.get_or_fetch("Rome", "metric", fetches["Rome"])
+    assert fetches["Oslo"].calls == 1
+    assert fetches["Rome"].calls == 2
+
+
+def test_concurrent_lookups_of_one_key_call_upstream_once():
+    cache = WeatherCache(clock=FakeClock())
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(threading.current_thread().name)
+        release.wait(5)
+        return {"city": "Tokyo"}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch("Tokyo", "metric", fetch)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while cache.stats["coalesced"] < len(threads) - 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"city": "Tokyo"}] * len(threads)
+    assert cache.stats["misses"] == 1
+
+
+def test_errors_are_not_cached():
+    cache = WeatherCache(clock=FakeClock())
+    fetch = Fetcher("Nowhere")
+    error = lambda: {"error": "city not found", **fetch()}
+
+    cache.get_or_fetch("Nowhere", "metric", error)
+    cache.get_or_fetch("Nowhere", "metric", error)
+    assert fetch.calls == 2
+    assert len(cache) == 0
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""TTL + LRU cache for weather lookups.
+
+Weather data only changes every few minutes, so responses are kept for
+``ttl`` seconds, keyed on the normalized city name and units. The cache is
+LRU bounded, can be persisted as JSON across restarts, and coalesces
+concurrent lookups: while one thread fetches a city, other threads asking for
+the same city wait for that result instead of calling the API again.
+
+Error responses are never cached.
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Optional, Tuple
+
+# Seconds a response stays fresh
+DEFAULT_TTL = 300.0
+DEFAULT_MAX_ENTRIES = 1024
+CACHE_VERSION = 1
+
+
+def cache_key(city: str, units: str) -> str:
+    """Case-fold a city name, collapse whitespace and prefix the units."""
+    city = re.sub(r"\s+", " ", city.casefold()).strip()
+    return f"{units}:{city}"
+
+
+class _Call:
+    """A fetch in flight that other threads can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+
+
+class WeatherCache:
+    """Thread-safe TTL + LRU cache of weather responses with request coalescing."""
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 path: Optional[str] = None, clock: Callable[[], float] = time.time):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        # Wall-clock time by default, so expiry times stay valid after a restart
+        self.clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._in_flight: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "expirations": 0, "evictions": 0}
+        if path:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_or_fetch(self, city: str, units: str, fetch: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Return the cached response for a city, calling ``fetch`` at most once per key at a time."""
+        key = cache_key(city, units)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > self.clock():
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry[1]
+                del self._entries[key]
+                self.stats["expirations"] += 1
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _Call()
+                self.stats["misses"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fetch()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+                if call.result is not None and "error" not in call.result:
+                    self._store(key, call.result)
+            call.done.set()
+        return call.result
+
+    def _store(self, key: str, result: Dict[str, Any]):
+        """Insert a fresh entry and evict the least recently used ones (lock held)."""
+        self._entries[key] = (self.clock() + self.ttl, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+        self._dirty = True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._dirty = True
+
+    def save(self):
+        """Write the unexpired entries atomically, oldest first, if anything changed."""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            now = self.clock()
+            entries = [[key, expires, result] for key, (expires, result) in self._entries.items() if expires > now]
+            self._dirty = False
+        try:
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "entries": entries}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Warning: could not save weather cache: {e}")
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != CACHE_VERSION:
+            return
+        now = self.clock()
+        for key, expires, result in data.get("entries", [])[-self.max_entries:]:
+            if expires > now:
+                self._entries[key] = (expires, result)